@@ -0,0 +1,16 @@
+"""numba's njit and prange, with stand-ins for when numba is not installed.
+
+Modules with compiled kernels import them from here; without numba the
+kernels run as plain Python functions.
+"""
+
+try:
+    from numba import njit, prange
+except ImportError:
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Fallback when numba is not installed: run the plain Python function."""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
@@ -1,20 +1,65 @@
 """Process depth camera data for 3D reconstruction."""
 
+import os
+import threading
 import numpy as np
 import open3d as o3d
+import cv2
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict
+from scipy.spatial import cKDTree
 from ..config import settings
 
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
 logger = logging.getLogger(__name__)
 
+# Two-stage voxel filter: a fine pass per frame, then a coarser pass on the
+# merged cloud before statistical outlier removal (voxel -> SOR order keeps
+# the k-NN queries of the outlier filter on the reduced cloud)
+FRAME_VOXEL_SIZE = 0.005
+MERGED_VOXEL_SIZE = 0.01
+
+# TSDF fusion parameters (meters)
+TSDF_VOXEL_LENGTH = 0.004
+TSDF_SDF_TRUNC = 0.02
+
+# Depth conversion parameters
+DEPTH_SCALE = 1000.0  # Depth is in millimeters
+DEPTH_TRUNC = 3.0     # Truncate depths beyond 3 meters
+
+# Resolution of raw .bin depth frames (rows, columns)
+DEPTH_SHAPE = (480, 640)
+
+# Per-thread scratch buffers reused across frames by load_depth_image
+_frame_buffers = threading.local()
+
+# Default camera intrinsics and the flip that aligns camera space with the
+# conventional coordinate system, built once and shared by every frame
+_DEFAULT_INTRINSICS = o3d.camera.PinholeCameraIntrinsic(
+    o3d.camera.PinholeCameraIntrinsicParameters.PrimeSenseDefault)
+_FLIP_TRANSFORM = np.array([[1, 0, 0, 0], [0, -1, 0, 0], [0, 0, -1, 0], [0, 0, 0, 1]],
+                           dtype=np.float64)
+
 
 class DepthProcessingError(Exception):
     """Exception raised for errors in depth processing."""
     pass
 
 
+def _get_frame_buffers() -> Tuple[np.ndarray, np.ndarray]:
+    """Return this thread's (float32 scratch, uint16 depth) frame buffers."""
+    if not hasattr(_frame_buffers, "depth"):
+        _frame_buffers.scratch = np.empty(DEPTH_SHAPE, dtype=np.float32)
+        _frame_buffers.depth = np.empty(DEPTH_SHAPE, dtype=np.uint16)
+    return _frame_buffers.scratch, _frame_buffers.depth
+
+
 def load_depth_image(depth_path: Path, color_path: Optional[Path] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
     """Load a depth image and corresponding color image.
     
@@ -30,15 +75,25 @@ def load_depth_image(depth_path: Path, color_path: Optional[Path] = None) -> Tup
     try:
         # Load depth image based on file extension
         if depth_path.suffix.lower() in ('.png', '.jpg', '.jpeg'):
-            # Load as a regular image and convert
-            depth_img = o3d.io.read_image(str(depth_path))
+            # OpenCV decodes 16-bit depth PNGs faster than Open3D's loader
+            depth_data = cv2.imread(str(depth_path), cv2.IMREAD_UNCHANGED)
+            if depth_data is None:
+                raise DepthProcessingError(f"Could not read depth image: {depth_path}")
+            depth_img = o3d.geometry.Image(np.ascontiguousarray(depth_data))
         elif depth_path.suffix.lower() == '.bin':
-            # Load as binary file
-            depth_data = np.fromfile(str(depth_path), dtype=np.float32)
+            # Map the binary file so pages are read on demand
             # Reshape based on expected dimensions (this may need adjustment)
-            depth_img = depth_data.reshape(480, 640)  # Typical depth dimensions
+            depth_data = np.memmap(str(depth_path), dtype=np.float32, mode='r',
+                                   shape=DEPTH_SHAPE)  # Typical depth dimensions
+            # Quantize to uint16 millimeters (the unit DEPTH_SCALE assumes),
+            # halving the depth buffer compared to float32; the buffers are
+            # reused by this thread since Image() copies the data
+            scratch, depth_mm = _get_frame_buffers()
+            np.rint(depth_data, out=scratch)
+            np.clip(scratch, 0, np.iinfo(np.uint16).max, out=scratch)
+            np.copyto(depth_mm, scratch, casting='unsafe')
             # Convert to open3d image
-            depth_img = o3d.geometry.Image(depth_img)
+            depth_img = o3d.geometry.Image(depth_mm)
         else:
             raise DepthProcessingError(f"Unsupported depth image format: {depth_path.suffix}")
         
@@ -68,19 +123,15 @@ def create_rgbd_image(depth_img: np.ndarray, color_img: Optional[np.ndarray] = N
     logger.debug("Creating RGBD image from depth and color data")
     
     try:
-        # Set default parameters for depth conversion
-        depth_scale = 1000.0  # Depth is in millimeters
-        depth_trunc = 3.0     # Truncate depths beyond 3 meters
-        
         # Create RGBD image
         if color_img is not None:
             rgbd_image = o3d.geometry.RGBDImage.create_from_color_and_depth(
-                color_img, depth_img, depth_scale=depth_scale, depth_trunc=depth_trunc,
+                color_img, depth_img, depth_scale=DEPTH_SCALE, depth_trunc=DEPTH_TRUNC,
                 convert_rgb_to_intensity=False)
         else:
             # Create a grayscale image if no color is provided
             rgbd_image = o3d.geometry.RGBDImage.create_from_color_and_depth(
-                depth_img, depth_img, depth_scale=depth_scale, depth_trunc=depth_trunc,
+                depth_img, depth_img, depth_scale=DEPTH_SCALE, depth_trunc=DEPTH_TRUNC,
                 convert_rgb_to_intensity=True)
             
         return rgbd_image
@@ -106,15 +157,14 @@ def create_point_cloud_from_rgbd(rgbd_image: o3d.geometry.RGBDImage,
     try:
         # Use default intrinsics if not provided
         if intrinsics is None:
-            intrinsics = o3d.camera.PinholeCameraIntrinsic(
-                o3d.camera.PinholeCameraIntrinsicParameters.PrimeSenseDefault)
+            intrinsics = _DEFAULT_INTRINSICS
             
         # Create point cloud
         pcd = o3d.geometry.PointCloud.create_from_rgbd_image(
             rgbd_image, intrinsics)
             
         # Flip the orientation to align with conventional coordinate system
-        pcd.transform([[1, 0, 0, 0], [0, -1, 0, 0], [0, 0, -1, 0], [0, 0, 0, 1]])
+        pcd.transform(_FLIP_TRANSFORM)
         
         return pcd
         
@@ -123,50 +173,315 @@ def create_point_cloud_from_rgbd(rgbd_image: o3d.geometry.RGBDImage,
         raise DepthProcessingError(f"Failed to create point cloud: {str(e)}")
 
 
+def fast_voxel_down_sample(points: np.ndarray, voxel_size: float,
+                           colors: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Downsample points to voxel centroids using an integer voxel hash.
+    
+    Voxel coordinates are packed into a single int64 key (21 bits per axis),
+    so grouping is one ``np.unique`` over integers instead of Open3D's
+    float64 hash map.
+    
+    Args:
+        points: (N, 3) array of point coordinates
+        voxel_size: Edge length of a voxel
+        colors: Optional (N, 3) array of per-point colors
+        
+    Returns:
+        Tuple of (downsampled_points, downsampled_colors)
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if len(points) == 0:
+        return points, colors
+    
+    grid = np.floor(points / voxel_size).astype(np.int64)
+    keys = (grid[:, 0] << 42) | ((grid[:, 1] & 0x1FFFFF) << 21) | (grid[:, 2] & 0x1FFFFF)
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+    
+    def centroids(values: np.ndarray) -> np.ndarray:
+        sums = np.stack([np.bincount(inverse, weights=values[:, k], minlength=len(counts))
+                         for k in range(3)], axis=1)
+        return sums / counts[:, None]
+    
+    down_points = centroids(points)
+    down_colors = centroids(np.asarray(colors, dtype=np.float64)) if colors is not None and len(colors) else None
+    return down_points, down_colors
+
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _outlier_mask(distances: np.ndarray, std_ratio: float) -> np.ndarray:
+        n, k = distances.shape
+        mean_d = np.empty(n)
+        for i in prange(n):
+            acc = 0.0
+            for j in range(1, k):  # column 0 is the point itself
+                acc += distances[i, j]
+            mean_d[i] = acc / (k - 1)
+        return mean_d < mean_d.mean() + std_ratio * mean_d.std()
+else:
+    def _outlier_mask(distances: np.ndarray, std_ratio: float) -> np.ndarray:
+        mean_d = distances[:, 1:].mean(axis=1)  # column 0 is the point itself
+        return mean_d < mean_d.mean() + std_ratio * mean_d.std()
+
+
+def statistical_outlier_mask(points: np.ndarray, nb_neighbors: int = 20,
+                             std_ratio: float = 2.0) -> np.ndarray:
+    """Compute an inlier mask using statistical outlier removal.
+    
+    A point is an outlier if its mean distance to its ``nb_neighbors``
+    nearest neighbours exceeds the global mean by ``std_ratio`` standard
+    deviations. Neighbour queries use all cores through scipy's cKDTree.
+    
+    Args:
+        points: (N, 3) array of point coordinates
+        nb_neighbors: Number of neighbours used for the mean distance
+        std_ratio: Standard deviation multiplier for the threshold
+        
+    Returns:
+        Boolean mask of inlier points
+    """
+    if len(points) <= nb_neighbors:
+        return np.ones(len(points), dtype=bool)
+    
+    distances, _ = cKDTree(points).query(points, k=nb_neighbors + 1, workers=-1)
+    return _outlier_mask(distances, std_ratio)
+
+
+def _load_one(depth_path: Path, color_path: Optional[Path] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Run the load -> RGBD -> point cloud pipeline for a single frame.
+    
+    Args:
+        depth_path: Path to the depth image
+        color_path: Optional path to the corresponding color image
+        
+    Returns:
+        Tuple of (points, colors) arrays for the frame, voxel-downsampled
+    """
+    depth_img, color_img = load_depth_image(depth_path, color_path)
+    rgbd_image = create_rgbd_image(depth_img, color_img)
+    pcd = create_point_cloud_from_rgbd(rgbd_image)
+    
+    # Fine per-frame downsample so the merge and outlier filter see far fewer points
+    colors = np.asarray(pcd.colors) if pcd.has_colors() else None
+    return fast_voxel_down_sample(np.asarray(pcd.points), FRAME_VOXEL_SIZE, colors)
+
+
+def _resolve_device(device: Optional[str]) -> Optional["o3d.core.Device"]:
+    """Resolve a device string to an Open3D device, or None for the legacy CPU path.
+    
+    Args:
+        device: Device string such as "CUDA:0", or None
+        
+    Returns:
+        Open3D device, or None if the legacy CPU pipeline should be used
+    """
+    if device is None:
+        return None
+    
+    resolved = o3d.core.Device(device)
+    if resolved.get_type() == o3d.core.Device.DeviceType.CUDA and not o3d.core.cuda.is_available():
+        logger.warning("CUDA is not available, falling back to CPU for depth processing")
+        return None
+    return resolved
+
+
+def _load_one_tensor(depth_path: Path, color_path: Optional[Path],
+                     device: "o3d.core.Device") -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Run the single-frame pipeline on the Open3D tensor API.
+    
+    Reprojection and the per-frame voxel downsample run on ``device``; the
+    cloud is copied back to host memory once, after downsampling.
+    
+    Args:
+        depth_path: Path to the depth image
+        color_path: Optional path to the corresponding color image
+        device: Open3D device to run on
+        
+    Returns:
+        Tuple of (points, colors) arrays for the frame, voxel-downsampled
+    """
+    depth_img, color_img = load_depth_image(depth_path, color_path)
+    depth_t = o3d.t.geometry.Image.from_legacy(depth_img).to(device)
+    intrinsics = o3d.core.Tensor(_DEFAULT_INTRINSICS.intrinsic_matrix)
+    
+    if color_img is not None:
+        color_t = o3d.t.geometry.Image.from_legacy(color_img).to(device)
+        pcd = o3d.t.geometry.PointCloud.create_from_rgbd_image(
+            o3d.t.geometry.RGBDImage(color_t, depth_t), intrinsics,
+            depth_scale=DEPTH_SCALE, depth_max=DEPTH_TRUNC)
+    else:
+        pcd = o3d.t.geometry.PointCloud.create_from_depth_image(
+            depth_t, intrinsics, depth_scale=DEPTH_SCALE, depth_max=DEPTH_TRUNC)
+    
+    # Flip the orientation to align with conventional coordinate system
+    pcd = pcd.transform(o3d.core.Tensor(_FLIP_TRANSFORM))
+    pcd = pcd.voxel_down_sample(voxel_size=FRAME_VOXEL_SIZE).cpu()
+    
+    points = pcd.point.positions.numpy().astype(np.float64)
+    colors = pcd.point.colors.numpy().astype(np.float64) if "colors" in pcd.point else None
+    return points, colors
+
+
+def _load_rgbd(depth_path: Path, color_path: Optional[Path] = None) -> o3d.geometry.RGBDImage:
+    """Load a depth/color pair as an RGBD image."""
+    depth_img, color_img = load_depth_image(depth_path, color_path)
+    return create_rgbd_image(depth_img, color_img)
+
+
+def fuse_depth_images_tsdf(depth_paths: List[Path],
+                           color_paths: Optional[List[Path]] = None,
+                           output_path: Optional[Path] = None,
+                           extrinsics: Optional[List[np.ndarray]] = None,
+                           max_workers: Optional[int] = None,
+                           voxel_length: float = TSDF_VOXEL_LENGTH,
+                           sdf_trunc: float = TSDF_SDF_TRUNC) -> o3d.geometry.PointCloud:
+    """Fuse multiple depth images into a point cloud through a TSDF volume.
+    
+    Each frame is integrated into a truncated signed distance grid, so
+    overlapping views are averaged per voxel instead of accumulating
+    duplicate surface points; no outlier removal pass is needed afterwards.
+    
+    Args:
+        depth_paths: List of paths to depth images
+        color_paths: Optional list of paths to corresponding color images
+        output_path: Optional path to save the output point cloud
+        extrinsics: Optional 4x4 world-to-camera pose per frame (identity if omitted)
+        max_workers: Number of worker threads used to load frames
+        voxel_length: TSDF voxel edge length in meters
+        sdf_trunc: TSDF truncation distance in meters
+        
+    Returns:
+        Fused point cloud
+    """
+    logger.info(f"Fusing {len(depth_paths)} depth images into a TSDF volume")
+    
+    try:
+        frame_color_paths = [
+            color_paths[i] if color_paths and i < len(color_paths) else None
+            for i in range(len(depth_paths))
+        ]
+        with_color = all(c is not None for c in frame_color_paths)
+        if not with_color:
+            # A Gray32 volume only accepts depth-only frames, so ignore the
+            # color images of frames that have them
+            frame_color_paths = [None] * len(depth_paths)
+        
+        volume = o3d.pipelines.integration.ScalableTSDFVolume(
+            voxel_length=voxel_length,
+            sdf_trunc=sdf_trunc,
+            color_type=(o3d.pipelines.integration.TSDFVolumeColorType.RGB8 if with_color
+                        else o3d.pipelines.integration.TSDFVolumeColorType.Gray32))
+        intrinsics = _DEFAULT_INTRINSICS
+        
+        # Frames load in parallel; integration into the volume is sequential
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            rgbd_images = executor.map(_load_rgbd, depth_paths, frame_color_paths)
+            
+            for i, rgbd_image in enumerate(rgbd_images):
+                pose = extrinsics[i] if extrinsics is not None else np.eye(4)
+                volume.integrate(rgbd_image, intrinsics, pose)
+                logger.debug(f"Integrated depth image {i+1}/{len(depth_paths)}")
+        
+        fused_pcd = volume.extract_point_cloud()
+        
+        # Flip the orientation to align with conventional coordinate system
+        fused_pcd.transform(_FLIP_TRANSFORM)
+        
+        if output_path:
+            # Create output directory if it doesn't exist
+            output_path.parent.mkdir(exist_ok=True, parents=True)
+            
+            # Save the point cloud
+            o3d.io.write_point_cloud(str(output_path), fused_pcd)
+            logger.info(f"Saved point cloud to {output_path}")
+        
+        return fused_pcd
+        
+    except Exception as e:
+        logger.error(f"Failed to fuse depth images: {str(e)}")
+        raise DepthProcessingError(f"TSDF depth fusion failed: {str(e)}")
+
+
 def process_depth_images(depth_paths: List[Path], 
                        color_paths: Optional[List[Path]] = None,
-                       output_path: Optional[Path] = None) -> o3d.geometry.PointCloud:
+                       output_path: Optional[Path] = None,
+                       max_workers: Optional[int] = None,
+                       device: Optional[str] = None,
+                       fusion: str = "points") -> o3d.geometry.PointCloud:
     """Process multiple depth images to create a consolidated point cloud.
     
+    Frames are loaded and reprojected concurrently; Open3D releases the GIL
+    during image I/O and RGBD reprojection, so disk reads overlap with compute.
+    With ``fusion="tsdf"`` the frames are fused through a TSDF volume instead
+    (see ``fuse_depth_images_tsdf``).
+    
     Args:
         depth_paths: List of paths to depth images
         color_paths: Optional list of paths to corresponding color images
         output_path: Optional path to save the output point cloud
+        max_workers: Number of worker threads (defaults to the CPU count)
+        device: Optional Open3D device (e.g. "CUDA:0") for GPU reprojection;
+            falls back to the CPU pipeline if the device is unavailable
+        fusion: "points" to concatenate per-frame point clouds, or "tsdf"
+            to integrate frames into a TSDF volume
         
     Returns:
         Consolidated point cloud
     """
+    if fusion == "tsdf":
+        return fuse_depth_images_tsdf(depth_paths, color_paths, output_path,
+                                      max_workers=max_workers)
+    if fusion != "points":
+        raise DepthProcessingError(f"Unsupported fusion method: {fusion}")
+    
     logger.info(f"Processing {len(depth_paths)} depth images")
     
     try:
-        combined_pcd = o3d.geometry.PointCloud()
+        points_list, colors_list = [], []
         
-        # Process each depth image
-        for i, depth_path in enumerate(depth_paths):
-            # Get corresponding color image if available
-            color_path = color_paths[i] if color_paths and i < len(color_paths) else None
-            
-            # Load images
-            depth_img, color_img = load_depth_image(depth_path, color_path)
+        # Pair each depth image with its color image if available
+        frame_color_paths = [
+            color_paths[i] if color_paths and i < len(color_paths) else None
+            for i in range(len(depth_paths))
+        ]
+        
+        o3d_device = _resolve_device(device)
+        if o3d_device is not None:
+            load_frame = lambda d, c: _load_one_tensor(d, c, o3d_device)
+        else:
+            load_frame = _load_one
+        
+        # Process each depth image in parallel; map() keeps frame order stable
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            frames = executor.map(load_frame, depth_paths, frame_color_paths)
             
-            # Create RGBD image
-            rgbd_image = create_rgbd_image(depth_img, color_img)
+            for i, (points, colors) in enumerate(frames):
+                # Collect raw buffers; merging with += would reallocate the
+                # whole accumulated cloud on every frame
+                points_list.append(points)
+                colors_list.append(colors)
+                
+                logger.debug(f"Processed depth image {i+1}/{len(depth_paths)}")
+        
+        # Combine point clouds in a single concatenation
+        # For accurate registration, we should perform point cloud registration here
+        # This is a simple concatenation for demonstration
+        combined_pcd = o3d.geometry.PointCloud()
+        if points_list:
+            has_colors = all(c is not None for c in colors_list)
             
-            # Create point cloud
-            pcd = create_point_cloud_from_rgbd(rgbd_image)
+            # Downsample to reduce point count
+            points, colors = fast_voxel_down_sample(
+                np.concatenate(points_list), MERGED_VOXEL_SIZE,
+                np.concatenate(colors_list) if has_colors else None)
             
-            # Combine point clouds
-            # For accurate registration, we should perform point cloud registration here
-            # This is a simple concatenation for demonstration
-            combined_pcd += pcd
+            # Remove outliers on the downsampled cloud
+            inliers = statistical_outlier_mask(points, nb_neighbors=20, std_ratio=2.0)
             
-            logger.debug(f"Processed depth image {i+1}/{len(depth_paths)}")
-        
-        # Downsample to reduce point count
-        combined_pcd = combined_pcd.voxel_down_sample(voxel_size=0.01)
-        
-        # Remove outliers
-        combined_pcd, _ = combined_pcd.remove_statistical_outlier(nb_neighbors=20, std_ratio=2.0)
+            combined_pcd.points = o3d.utility.Vector3dVector(points[inliers])
+            if colors is not None:
+                combined_pcd.colors = o3d.utility.Vector3dVector(colors[inliers])
         
         if output_path:
             # Create output directory if it doesn't exist
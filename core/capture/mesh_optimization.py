@@ -11,11 +11,58 @@ from ..config import settings
 logger = logging.getLogger(__name__)
 
 
+# Optimization parameters per quality level
+_QUALITY_PARAMS = {
+    "low": {
+        "simplify_target_ratio": 0.25,
+        "smoothing_iterations": 1
+    },
+    "medium": {
+        "simplify_target_ratio": 0.5,
+        "smoothing_iterations": 3
+    },
+    "high": {
+        "simplify_target_ratio": 0.75,
+        "smoothing_iterations": 5
+    }
+}
+
+
 class MeshOptimizationError(Exception):
     """Exception raised for errors in mesh optimization."""
     pass
 
 
+def _simplify(mesh: o3d.geometry.TriangleMesh, target_triangles: int) -> o3d.geometry.TriangleMesh:
+    """Simplify a mesh to a target triangle count.
+    
+    Large reductions first run O(N) vertex clustering to get near the
+    target, so quadric decimation only works on the much smaller mesh.
+    
+    Args:
+        mesh: Input triangle mesh
+        target_triangles: Target number of triangles
+        
+    Returns:
+        Simplified mesh
+    """
+    if len(mesh.triangles) > 4 * target_triangles:
+        # Surface cell count grows with (extent / voxel)^2; size the grid to
+        # leave roughly 2-4x the target vertex count for quadric decimation
+        target_vertices = max(target_triangles // 2, 1)
+        bbox_diag = np.linalg.norm(mesh.get_axis_aligned_bounding_box().get_extent())
+        voxel_size = bbox_diag / (2.0 * np.sqrt(target_vertices))
+        clustered = mesh.simplify_vertex_clustering(
+            voxel_size=voxel_size,
+            contraction=o3d.geometry.SimplificationContraction.Average)
+        
+        # Only keep the coarse pass if it did not overshoot the target
+        if len(clustered.triangles) >= target_triangles:
+            mesh = clustered
+    
+    return mesh.simplify_quadric_decimation(target_number_of_triangles=target_triangles)
+
+
 def optimize_mesh(mesh: o3d.geometry.TriangleMesh, 
                 quality_level: str = "medium") -> o3d.geometry.TriangleMesh:
     """Optimize a mesh for packaging design.
@@ -33,36 +80,21 @@ def optimize_mesh(mesh: o3d.geometry.TriangleMesh,
     
     try:
         # Set parameters based on quality level
-        params = {
-            "low": {
-                "simplify_target_ratio": 0.25,
-                "smoothing_iterations": 1
-            },
-            "medium": {
-                "simplify_target_ratio": 0.5,
-                "smoothing_iterations": 3
-            },
-            "high": {
-                "simplify_target_ratio": 0.75,
-                "smoothing_iterations": 5
-            }
-        }.get(quality_level.lower(), {
-            "simplify_target_ratio": 0.5,
-            "smoothing_iterations": 3
-        })
+        params = _QUALITY_PARAMS.get(quality_level.lower(), _QUALITY_PARAMS["medium"])
         
         # Compute vertex normals
         mesh = mesh.compute_vertex_normals()
         
-        # Fill holes
-        mesh = fill_holes(mesh)
+        # Fill holes; closed meshes skip the trimesh round-trip
+        if not mesh.is_edge_manifold() or not mesh.is_watertight():
+            mesh = fill_holes(mesh)
         
         # Smooth the mesh
         mesh = mesh.filter_smooth_taubin(number_of_iterations=params["smoothing_iterations"])
         
         # Simplify the mesh
         target_triangles = int(len(mesh.triangles) * params["simplify_target_ratio"])
-        mesh = mesh.simplify_quadric_decimation(target_number_of_triangles=target_triangles)
+        mesh = _simplify(mesh, target_triangles)
         
         # Remove degenerate triangles
         mesh.remove_degenerate_triangles()
@@ -70,8 +102,10 @@ def optimize_mesh(mesh: o3d.geometry.TriangleMesh,
         # Remove duplicate vertices
         mesh.remove_duplicated_vertices()
         
-        # Recompute normals
-        mesh = mesh.compute_vertex_normals()
+        # Normals computed above are carried through smoothing and
+        # simplification; only compute them if a step dropped them
+        if not mesh.has_vertex_normals():
+            mesh = mesh.compute_vertex_normals()
         
         logger.info(f"Mesh optimization complete: {len(mesh.vertices)} vertices, {len(mesh.triangles)} triangles")
         return mesh
@@ -84,6 +118,10 @@ def optimize_mesh(mesh: o3d.geometry.TriangleMesh,
 def fill_holes(mesh: o3d.geometry.TriangleMesh) -> o3d.geometry.TriangleMesh:
     """Fill holes in a mesh.
     
+    The input mesh is updated in place: only the buffers that trimesh
+    changed are written back, and normals/colors that no longer match
+    them are dropped.
+    
     Args:
         mesh: Input triangle mesh
         
@@ -93,7 +131,7 @@ def fill_holes(mesh: o3d.geometry.TriangleMesh) -> o3d.geometry.TriangleMesh:
     logger.debug("Filling holes in mesh")
     
     try:
-        # Convert to trimesh for hole filling
+        # Convert to trimesh for hole filling (views, no copy)
         vertices = np.asarray(mesh.vertices)
         triangles = np.asarray(mesh.triangles)
         
@@ -102,18 +140,26 @@ def fill_holes(mesh: o3d.geometry.TriangleMesh) -> o3d.geometry.TriangleMesh:
             logger.warning("Empty mesh, cannot fill holes")
             return mesh
         
-        # Create trimesh object
+        # Create trimesh object; its processing pass welds duplicate
+        # vertices, which hole detection on triangle soups relies on
         tri_mesh = trimesh.Trimesh(vertices=vertices, faces=triangles)
         
         # Fill holes
         tri_mesh.fill_holes()
         
-        # Convert back to Open3D mesh
-        result_mesh = o3d.geometry.TriangleMesh()
-        result_mesh.vertices = o3d.utility.Vector3dVector(np.asarray(tri_mesh.vertices))
-        result_mesh.triangles = o3d.utility.Vector3iVector(np.asarray(tri_mesh.faces))
+        # Write back only what changed
+        vertices_changed = not np.array_equal(tri_mesh.vertices, vertices)
+        if vertices_changed:
+            mesh.vertices = o3d.utility.Vector3dVector(
+                np.ascontiguousarray(tri_mesh.vertices, dtype=np.float64))
+            mesh.vertex_normals = o3d.utility.Vector3dVector()
+            mesh.vertex_colors = o3d.utility.Vector3dVector()
+        if vertices_changed or not np.array_equal(tri_mesh.faces, triangles):
+            mesh.triangles = o3d.utility.Vector3iVector(
+                np.ascontiguousarray(tri_mesh.faces, dtype=np.int32))
+            mesh.triangle_normals = o3d.utility.Vector3dVector()
         
-        return result_mesh
+        return mesh
         
     except Exception as e:
         logger.error(f"Hole filling failed: {str(e)}")
@@ -145,11 +191,13 @@ def reduce_vertices(mesh: o3d.geometry.TriangleMesh, target_count: int) -> o3d.g
         # This is a rough approximation; for most meshes triangles ≈ 2 * vertices
         target_triangles = int(target_count * 2)
         
-        # Simplify mesh
-        simplified_mesh = mesh.simplify_quadric_decimation(target_number_of_triangles=target_triangles)
+        # Compute normals once on the input; simplification carries them
+        # over to the surviving vertices
+        if not mesh.has_vertex_normals():
+            mesh.compute_vertex_normals()
         
-        # Recompute normals
-        simplified_mesh = simplified_mesh.compute_vertex_normals()
+        # Simplify mesh
+        simplified_mesh = _simplify(mesh, target_triangles)
         
         logger.info(f"Mesh reduction complete: {len(simplified_mesh.vertices)} vertices, {len(simplified_mesh.triangles)} triangles")
         return simplified_mesh
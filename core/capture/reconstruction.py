@@ -1,21 +1,44 @@
 """3D Reconstruction algorithms from multiple 2D images."""
 
+import os
+import threading
 import numpy as np
 import open3d as o3d
 import cv2
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Tuple, Dict, Optional, Union
+from PIL import Image
 from ..config import settings
 
 logger = logging.getLogger(__name__)
 
+# Maximum width or height of images used for reconstruction
+MAX_IMAGE_DIMENSION = 1024
+
+# Grayscale decode flags by downscale factor; JPEGs are scaled in the DCT domain
+_REDUCED_GRAYSCALE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
 
 class ReconstructionError(Exception):
     """Exception raised for errors in the reconstruction process."""
     pass
 
 
+def _cuda_available() -> bool:
+    """Check whether OpenCV was built with CUDA and a device is present."""
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
+
+
 def preprocess_images(image_paths: List[Path]) -> List[np.ndarray]:
     """Preprocess input images for 3D reconstruction.
     
@@ -23,28 +46,40 @@ def preprocess_images(image_paths: List[Path]) -> List[np.ndarray]:
         image_paths: List of paths to input images
         
     Returns:
-        List of preprocessed images as numpy arrays
+        List of preprocessed grayscale (uint8) images as numpy arrays
     """
     logger.info(f"Preprocessing {len(image_paths)} images for reconstruction")
     processed_images = []
     
     for img_path in image_paths:
         try:
-            # Read image
-            img = cv2.imread(str(img_path))
+            # Read the image size from the header only
+            factor = 1
+            try:
+                with Image.open(img_path) as header:
+                    largest = max(header.size)
+            except (OSError, ValueError):
+                # Pillow cannot read this format (e.g. EXR), but OpenCV may:
+                # decode at full resolution and resize below
+                largest = 0
+            
+            # Largest power-of-two reduction that stays at or above the target size
+            while factor < 8 and largest / (factor * 2) >= MAX_IMAGE_DIMENSION:
+                factor *= 2
+            
+            # Read image; feature detection only needs intensity
+            img = cv2.imread(str(img_path), _REDUCED_GRAYSCALE_FLAGS[factor])
             if img is None:
                 logger.warning(f"Could not read image: {img_path}")
                 continue
-                
-            # Convert to RGB (OpenCV uses BGR)
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
             
-            # Resize if needed
-            max_dimension = 1024  # Maximum width or height
+            # Resize the remainder if needed
+            max_dimension = MAX_IMAGE_DIMENSION
             height, width = img.shape[:2]
             if max(height, width) > max_dimension:
                 scale = max_dimension / max(height, width)
-                img = cv2.resize(img, (int(width * scale), int(height * scale)))
+                img = cv2.resize(img, (int(width * scale), int(height * scale)),
+                                 interpolation=cv2.INTER_AREA)
             
             # Apply preprocessing (optional enhancements)
             # - Enhance contrast
@@ -63,8 +98,8 @@ def preprocess_images(image_paths: List[Path]) -> List[np.ndarray]:
     return processed_images
 
 
-def extract_features(images: List[np.ndarray]) -> Tuple[List[np.ndarray], List[np.ndarray]]:
-    """Extract features from preprocessed images.
+def _extract_features_cuda_orb(images: List[np.ndarray]) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """Extract ORB features on the GPU.
     
     Args:
         images: List of preprocessed images
@@ -72,18 +107,63 @@ def extract_features(images: List[np.ndarray]) -> Tuple[List[np.ndarray], List[n
     Returns:
         Tuple of (keypoints, descriptors) for all images
     """
-    logger.info("Extracting features from images")
     keypoints_list = []
     descriptors_list = []
     
-    # Use SIFT for feature detection
-    sift = cv2.SIFT_create()
+    orb = cv2.cuda.ORB_create(nfeatures=5000)
+    gpu_img = cv2.cuda_GpuMat()
     
     for img in images:
-        keypoints, descriptors = sift.detectAndCompute(img, None)
+        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY) if img.ndim == 3 else img
+        gpu_img.upload(gray)
+        gpu_keypoints, gpu_descriptors = orb.detectAndComputeAsync(gpu_img, None)
+        keypoints = orb.convert(gpu_keypoints)
+        descriptors = gpu_descriptors.download() if not gpu_descriptors.empty() else None
         keypoints_list.append(keypoints)
         descriptors_list.append(descriptors)
-        logger.debug(f"Extracted {len(keypoints)} features from image")
+        logger.debug(f"Extracted {len(keypoints)} ORB features from image")
+    
+    return keypoints_list, descriptors_list
+
+
+def extract_features(images: List[np.ndarray],
+                     use_gpu: bool = False) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """Extract features from preprocessed images.
+    
+    Args:
+        images: List of preprocessed images
+        use_gpu: Use CUDA ORB (binary descriptors) instead of CPU SIFT when
+            OpenCV has CUDA support; trades sub-pixel accuracy for speed
+        
+    Returns:
+        Tuple of (keypoints, descriptors) for all images
+    """
+    logger.info("Extracting features from images")
+    
+    if use_gpu:
+        if _cuda_available():
+            keypoints_list, descriptors_list = _extract_features_cuda_orb(images)
+            logger.info(f"Feature extraction complete for {len(images)} images")
+            return keypoints_list, descriptors_list
+        logger.warning("OpenCV CUDA support not available, falling back to CPU SIFT")
+    
+    keypoints_list = []
+    descriptors_list = []
+    
+    # Use SIFT for feature detection, one detector per worker thread
+    local = threading.local()
+    
+    def detect(img: np.ndarray):
+        if not hasattr(local, "sift"):
+            local.sift = cv2.SIFT_create()
+        return local.sift.detectAndCompute(img, None)
+    
+    # OpenCV releases the GIL inside detectAndCompute, so images run in parallel
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for keypoints, descriptors in executor.map(detect, images):
+            keypoints_list.append(keypoints)
+            descriptors_list.append(descriptors)
+            logger.debug(f"Extracted {len(keypoints)} features from image")
     
     logger.info(f"Feature extraction complete for {len(images)} images")
     return keypoints_list, descriptors_list
@@ -103,32 +183,74 @@ def match_features(keypoints_list: List[np.ndarray],
     logger.info("Matching features between images")
     matches_dict = {}
     
-    # FLANN parameters for fast matching
-    FLANN_INDEX_KDTREE = 1
-    index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
-    search_params = dict(checks=50)
-    flann = cv2.FlannBasedMatcher(index_params, search_params)
-    
-    # Match features between all image pairs
     num_images = len(descriptors_list)
+    valid_images = []
     for i in range(num_images):
-        for j in range(i+1, num_images):
-            if descriptors_list[i] is None or descriptors_list[j] is None:
-                logger.warning(f"Cannot match images {i} and {j} - missing descriptors")
-                continue
-                
+        if descriptors_list[i] is None:
+            logger.warning(f"Cannot match image {i} - missing descriptors")
+        else:
+            valid_images.append(i)
+    
+    # Each train_matcher(j) returns a function matching image i against
+    # image j (k=2), with whatever per-image setup done once for image j
+    binary = any(d is not None and d.dtype == np.uint8 for d in descriptors_list)
+    if binary and _cuda_available():
+        matcher = cv2.cuda.DescriptorMatcher_createBFMatcher(cv2.NORM_HAMMING)
+        # Upload each image's descriptors once rather than once per pair
+        gpu_descriptors = {i: cv2.cuda_GpuMat(descriptors_list[i]) for i in valid_images}
+        
+        def train_matcher(j):
+            def knn_match(i):
+                return matcher.knnMatch(gpu_descriptors[i], gpu_descriptors[j], k=2)
+            return knn_match
+    elif binary:
+        # Binary descriptors (ORB) are uint8 and need Hamming distance
+        matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+        
+        def train_matcher(j):
+            def knn_match(i):
+                return matcher.knnMatch(descriptors_list[i], descriptors_list[j], k=2)
+            return knn_match
+    else:
+        # FLANN parameters for fast matching
+        FLANN_INDEX_KDTREE = 1
+        index_params = dict(algorithm=FLANN_INDEX_KDTREE, trees=5)
+        search_params = dict(checks=50)
+        
+        def train_matcher(j):
+            # Build image j's k-d trees once and query every earlier image against them
+            matcher = cv2.FlannBasedMatcher(index_params, search_params)
+            matcher.add([descriptors_list[j]])
+            matcher.train()
+            
+            def knn_match(i):
+                return matcher.knnMatch(descriptors_list[i], k=2)
+            return knn_match
+    
+    # Match features between all image pairs (i, j) with i < j
+    for j in valid_images:
+        knn_match = train_matcher(j)
+        for i in valid_images:
+            if i >= j:
+                break
+            
             # Match descriptors
-            matches = flann.knnMatch(descriptors_list[i], descriptors_list[j], k=2)
+            matches = knn_match(i)
             
-            # Apply ratio test to filter good matches
+            # Apply ratio test to filter good matches, as one array comparison
+            pairs = [pair for pair in matches if len(pair) >= 2]
             good_matches = []
-            for m, n in matches:
-                if m.distance < 0.7 * n.distance:
-                    good_matches.append(m)
+            if pairs:
+                distances = np.array([(pair[0].distance, pair[1].distance) for pair in pairs])
+                good = np.nonzero(distances[:, 0] < 0.7 * distances[:, 1])[0]
+                good_matches = [pairs[k][0] for k in good.tolist()]
             
             matches_dict[(i, j)] = good_matches
             logger.debug(f"Found {len(good_matches)} good matches between images {i} and {j}")
     
+    # Same pair order as matching image i against each later image
+    matches_dict = dict(sorted(matches_dict.items()))
+    
     logger.info(f"Feature matching complete with {len(matches_dict)} image pairs")
     return matches_dict
 
@@ -176,9 +298,17 @@ def reconstruct_from_images(image_paths: List[Path], output_path: Path) -> o3d.g
         points = np.random.rand(1000, 3)
         point_cloud.points = o3d.utility.Vector3dVector(points)
         
-        # Generate mesh from point cloud
-        mesh = o3d.geometry.TriangleMesh.create_from_point_cloud_alpha_shape(
-            point_cloud, alpha=0.05)
+        # Generate a watertight mesh from the point cloud with Poisson
+        # reconstruction, which needs oriented normals
+        point_cloud.estimate_normals(
+            search_param=o3d.geometry.KDTreeSearchParamHybrid(radius=0.1, max_nn=30))
+        point_cloud.orient_normals_consistent_tangent_plane(k=15)
+        mesh, densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(
+            point_cloud, depth=9)
+        
+        # Trim poorly supported surface extrapolated far from the input points
+        densities = np.asarray(densities)
+        mesh.remove_vertices_by_mask(densities < np.quantile(densities, 0.01))
         
         # Save the mesh
         o3d.io.write_triangle_mesh(str(output_path), mesh)
@@ -5,6 +5,6 @@ based on 3D product models, including internal structure for product stabilizati
 external box design, and customization options.
 """
 
-from .box_generator import generate_box, optimize_box_dimensions
-from .internal_structure import generate_holder_structure
+from .box_generator import generate_box, generate_boxes_batch, optimize_box_dimensions
+from .internal_structure import generate_holder_structure, generate_holders_batch
 from .design_optimization import optimize_design
\ No newline at end of file
@@ -1,13 +1,19 @@
 """Generate packaging boxes based on product 3D models."""
 
+from __future__ import annotations
+
+import functools
 import numpy as np
-import open3d as o3d
-import trimesh
 import logging
 from pathlib import Path
-from typing import Tuple, Dict, List, Optional, Any
+from typing import Tuple, Dict, List, Optional, Any, TYPE_CHECKING
 from enum import Enum
 from ..config import settings
+from .mesh_utils import (MeshInfoCache, HOLLOW_BOX_VERTS, HOLLOW_BOX_TRIS, HOLLOW_BOX_SCALE_INDEX,
+                         HOLLOW_BOX_INNER, as_o3d_verts, as_o3d_tris, get_open3d)
+
+if TYPE_CHECKING:
+    import open3d as o3d
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +32,54 @@ class BoxGeneratorError(Exception):
     pass
 
 
+@functools.lru_cache(maxsize=None)
+def _aabb_kernel():
+    """Compile the bounding box kernel on first use.
+    
+    A numba gufunc over (n, 3) vertex arrays that finds min, max and extent
+    in a single pass; stacked (k, n, 3) input is split across cores one mesh
+    per task. Built lazily so importing this module stays cheap.
+    
+    Returns:
+        The gufunc, or None if numba is not installed
+    """
+    try:
+        from numba import guvectorize
+    except ImportError:
+        return None
+    
+    @guvectorize(['void(f8[:,:], f8[:], f8[:], f8[:])'], '(n,m)->(m),(m),(m)',
+                 target='parallel', nopython=True)
+    def aabb_dims(vertices, min_bound, max_bound, dimensions):
+        for j in range(vertices.shape[1]):
+            min_bound[j] = vertices[0, j]
+            max_bound[j] = vertices[0, j]
+        for i in range(1, vertices.shape[0]):
+            for j in range(vertices.shape[1]):
+                x = vertices[i, j]
+                if x < min_bound[j]:
+                    min_bound[j] = x
+                elif x > max_bound[j]:
+                    max_bound[j] = x
+        for j in range(vertices.shape[1]):
+            dimensions[j] = max_bound[j] - min_bound[j]
+    
+    return aabb_dims
+
+
+def _aabb(vertices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Min corner, max corner and extent of (..., n, 3) vertex arrays."""
+    if vertices.shape[-2] == 0:
+        raise ValueError("mesh has no vertices")
+    
+    kernel = _aabb_kernel()
+    if kernel is None:
+        min_bound = vertices.min(axis=-2)
+        max_bound = vertices.max(axis=-2)
+        return min_bound, max_bound, max_bound - min_bound
+    return kernel(np.ascontiguousarray(vertices, dtype=np.float64))
+
+
 def calculate_bounding_box(mesh: o3d.geometry.TriangleMesh) -> Tuple[np.ndarray, np.ndarray]:
     """Calculate the axis-aligned bounding box of a mesh.
     
@@ -38,21 +92,52 @@ def calculate_bounding_box(mesh: o3d.geometry.TriangleMesh) -> Tuple[np.ndarray,
     logger.debug("Calculating bounding box for mesh")
     
     try:
-        # Get the axis-aligned bounding box
-        aabb = mesh.get_axis_aligned_bounding_box()
-        min_bound = np.asarray(aabb.min_bound)
-        max_bound = np.asarray(aabb.max_bound)
-        
-        dimensions = max_bound - min_bound
-        logger.debug(f"Bounding box dimensions: {dimensions}")
+        # Get the axis-aligned bounding box and its extent in one pass
+        min_bound, max_bound, dimensions = _aabb(np.asarray(mesh.vertices))
+        logger.debug("Bounding box dimensions: %s", dimensions)
         
         return min_bound, max_bound
         
     except Exception as e:
-        logger.error(f"Error calculating bounding box: {str(e)}")
+        logger.error("Error calculating bounding box: %s", e)
         raise BoxGeneratorError(f"Failed to calculate bounding box: {str(e)}")
 
 
+def calculate_bounding_boxes_batch(vertex_arrays: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Calculate axis-aligned bounding boxes for many meshes at once.
+    
+    The vertex arrays are stacked into one (k, n, 3) block, shorter ones
+    padded by repeating their first vertex (which leaves their bounds
+    unchanged), and reduced with one parallel kernel call, one mesh per core.
+    
+    Args:
+        vertex_arrays: List of (n_i, 3) vertex arrays, e.g. np.asarray(mesh.vertices)
+        
+    Returns:
+        Tuple of (min_bounds, max_bounds) as (k, 3) arrays
+    """
+    logger.debug("Calculating bounding boxes for %s meshes", len(vertex_arrays))
+    
+    try:
+        if not vertex_arrays:
+            return np.empty((0, 3)), np.empty((0, 3))
+        
+        n = max(len(v) for v in vertex_arrays)
+        stacked = np.empty((len(vertex_arrays), n, 3), dtype=np.float64)
+        for k, vertices in enumerate(vertex_arrays):
+            if len(vertices) == 0:
+                raise ValueError(f"mesh {k} has no vertices")
+            stacked[k, :len(vertices)] = vertices
+            stacked[k, len(vertices):] = vertices[0]
+        
+        min_bounds, max_bounds, _ = _aabb(stacked)
+        return min_bounds, max_bounds
+        
+    except Exception as e:
+        logger.error("Error calculating bounding boxes: %s", e)
+        raise BoxGeneratorError(f"Failed to calculate bounding boxes: {str(e)}")
+
+
 def add_padding(min_bound: np.ndarray, max_bound: np.ndarray, padding: float = 10.0) -> Tuple[np.ndarray, np.ndarray]:
     """Add padding to a bounding box.
     
@@ -64,13 +149,13 @@ def add_padding(min_bound: np.ndarray, max_bound: np.ndarray, padding: float = 1
     Returns:
         Tuple of (padded_min_bound, padded_max_bound)
     """
-    logger.debug(f"Adding {padding}mm padding to bounding box")
+    logger.debug("Adding %smm padding to bounding box", padding)
     
     padded_min = min_bound - padding
     padded_max = max_bound + padding
     
     dimensions = padded_max - padded_min
-    logger.debug(f"Padded box dimensions: {dimensions}")
+    logger.debug("Padded box dimensions: %s", dimensions)
     
     return padded_min, padded_max
 
@@ -78,7 +163,9 @@ def add_padding(min_bound: np.ndarray, max_bound: np.ndarray, padding: float = 1
 def generate_box(product_mesh: o3d.geometry.TriangleMesh, 
                 box_type: BoxType = BoxType.STANDARD,
                 padding: float = 10.0,
-                wall_thickness: float = 2.0) -> o3d.geometry.TriangleMesh:
+                wall_thickness: float = 2.0,
+                mesh_info: Optional[MeshInfoCache] = None,
+                compute_normals: bool = True) -> o3d.geometry.TriangleMesh:
     """Generate a packaging box for a product.
     
     Args:
@@ -86,15 +173,20 @@ def generate_box(product_mesh: o3d.geometry.TriangleMesh,
         box_type: Type of box to generate
         padding: Padding between product and box walls (mm)
         wall_thickness: Thickness of box walls (mm)
+        mesh_info: Precomputed summary of product_mesh (computed if omitted)
+        compute_normals: Compute vertex normals (skip if only exporting or
+            feeding another boolean)
         
     Returns:
         3D mesh of the generated box
     """
-    logger.info(f"Generating {box_type.value} box with {padding}mm padding")
+    logger.info("Generating %s box with %smm padding", box_type.value, padding)
     
     try:
         # Calculate product bounding box
-        min_bound, max_bound = calculate_bounding_box(product_mesh)
+        if mesh_info is None:
+            mesh_info = MeshInfoCache.from_mesh(product_mesh)
+        min_bound, max_bound = mesh_info.min_bound, mesh_info.max_bound
         
         # Add padding
         padded_min, padded_max = add_padding(min_bound, max_bound, padding)
@@ -105,36 +197,64 @@ def generate_box(product_mesh: o3d.geometry.TriangleMesh,
         
         # Generate box based on type
         if box_type == BoxType.STANDARD:
-            box_mesh = generate_standard_box(padded_min, padded_max, wall_thickness)
+            box_mesh = generate_standard_box(padded_min, padded_max, wall_thickness, compute_normals)
         elif box_type == BoxType.SLEEVE:
-            box_mesh = generate_sleeve_box(padded_min, padded_max, wall_thickness)
+            box_mesh = generate_sleeve_box(padded_min, padded_max, wall_thickness, compute_normals)
         elif box_type == BoxType.CLAMSHELL:
-            box_mesh = generate_clamshell_box(padded_min, padded_max, wall_thickness)
+            box_mesh = generate_clamshell_box(padded_min, padded_max, wall_thickness, compute_normals)
         elif box_type == BoxType.TRAY:
-            box_mesh = generate_tray_box(padded_min, padded_max, wall_thickness)
+            box_mesh = generate_tray_box(padded_min, padded_max, wall_thickness, compute_normals)
         elif box_type == BoxType.CUSTOM:
             # Custom boxes would require more parameters and logic
-            box_mesh = generate_standard_box(padded_min, padded_max, wall_thickness)
+            box_mesh = generate_standard_box(padded_min, padded_max, wall_thickness, compute_normals)
         else:
             # Default to standard box
-            box_mesh = generate_standard_box(padded_min, padded_max, wall_thickness)
+            box_mesh = generate_standard_box(padded_min, padded_max, wall_thickness, compute_normals)
         
-        logger.info(f"Box generation complete: {len(box_mesh.vertices)} vertices, {len(box_mesh.triangles)} triangles")
+        logger.info("Box generation complete: %s vertices, %s triangles", len(box_mesh.vertices), len(box_mesh.triangles))
         return box_mesh
         
     except Exception as e:
-        logger.error(f"Box generation failed: {str(e)}")
+        logger.error("Box generation failed: %s", e)
         raise BoxGeneratorError(f"Failed to generate box: {str(e)}")
 
 
+def generate_boxes_batch(product_meshes: List[o3d.geometry.TriangleMesh],
+                         box_type: BoxType = BoxType.STANDARD,
+                         padding: float = 10.0,
+                         wall_thickness: float = 2.0,
+                         compute_normals: bool = True) -> List[o3d.geometry.TriangleMesh]:
+    """Generate packaging boxes for many products.
+    
+    A box only depends on the product bounds and is filled in from a fixed
+    template, so the boxes are built in-process; shipping the product meshes
+    to worker processes would cost more than generating the boxes.
+    See internal_structure.generate_holders_batch for the parallel holder path.
+    
+    Args:
+        product_meshes: 3D meshes of the products
+        box_type: Type of box to generate
+        padding: Padding between product and box walls (mm)
+        wall_thickness: Thickness of box walls (mm)
+        compute_normals: Compute vertex normals for each box
+        
+    Returns:
+        Box meshes in the same order as product_meshes
+    """
+    return [generate_box(mesh, box_type, padding, wall_thickness, compute_normals=compute_normals)
+            for mesh in product_meshes]
+
+
 def generate_standard_box(min_bound: np.ndarray, max_bound: np.ndarray, 
-                        wall_thickness: float) -> o3d.geometry.TriangleMesh:
+                        wall_thickness: float,
+                        compute_normals: bool = True) -> o3d.geometry.TriangleMesh:
     """Generate a standard rectangular box.
     
     Args:
         min_bound: Minimum corner of the bounding box
         max_bound: Maximum corner of the bounding box
         wall_thickness: Thickness of box walls
+        compute_normals: Compute vertex normals
         
     Returns:
         3D mesh of the box
@@ -144,68 +264,43 @@ def generate_standard_box(min_bound: np.ndarray, max_bound: np.ndarray,
     try:
         # Calculate dimensions
         dimensions = max_bound - min_bound
-        width, height, depth = dimensions
         
-        # Create outer box
-        outer_box = o3d.geometry.TriangleMesh.create_box(
-            width=width + (2 * wall_thickness),
-            height=height + (2 * wall_thickness),
-            depth=depth + (2 * wall_thickness)
-        )
-        
-        # Create inner box (cavity)
-        inner_box = o3d.geometry.TriangleMesh.create_box(
-            width=width,
-            height=height,
-            depth=depth
-        )
-        
-        # Position inner box correctly
-        inner_box = inner_box.translate([wall_thickness, wall_thickness, wall_thickness])
-        
-        # Boolean difference to create hollow box
-        # Note: Open3D doesn't directly support boolean operations
-        # Convert to trimesh for boolean operation
-        outer_trimesh = trimesh.Trimesh(
-            vertices=np.asarray(outer_box.vertices),
-            faces=np.asarray(outer_box.triangles)
-        )
-        inner_trimesh = trimesh.Trimesh(
-            vertices=np.asarray(inner_box.vertices),
-            faces=np.asarray(inner_box.triangles)
-        )
-        
-        # Perform boolean difference
-        hollow_box_trimesh = outer_trimesh.difference(inner_trimesh)
-        
-        # Convert back to Open3D mesh
-        hollow_box = o3d.geometry.TriangleMesh()
-        hollow_box.vertices = o3d.utility.Vector3dVector(hollow_box_trimesh.vertices)
-        hollow_box.triangles = o3d.utility.Vector3iVector(hollow_box_trimesh.faces)
+        # Outer box spans [0, dimensions + 2t]; the cavity is inset by the wall thickness.
+        # The two boxes are axis-aligned and nested, so the hollow box is filled
+        # in from the hollow box template instead of through a mesh boolean difference.
+        extents = np.concatenate([dimensions + 2 * wall_thickness, dimensions])
+        vertices = HOLLOW_BOX_VERTS * extents[HOLLOW_BOX_SCALE_INDEX]
+        vertices += HOLLOW_BOX_INNER * wall_thickness
         
         # Position box centered on the origin
-        center = (min_bound + max_bound) / 2
-        translation = -center
-        hollow_box = hollow_box.translate(translation)
+        vertices -= (min_bound + max_bound) / 2
+        
+        o3d = get_open3d()
+        hollow_box = o3d.geometry.TriangleMesh(
+            o3d.utility.Vector3dVector(as_o3d_verts(vertices)),
+            o3d.utility.Vector3iVector(as_o3d_tris(HOLLOW_BOX_TRIS)))
         
         # Compute normals
-        hollow_box = hollow_box.compute_vertex_normals()
+        if compute_normals:
+            hollow_box = hollow_box.compute_vertex_normals()
         
         return hollow_box
         
     except Exception as e:
-        logger.error(f"Error generating standard box: {str(e)}")
+        logger.error("Error generating standard box: %s", e)
         raise BoxGeneratorError(f"Failed to generate standard box: {str(e)}")
 
 
 def generate_sleeve_box(min_bound: np.ndarray, max_bound: np.ndarray, 
-                      wall_thickness: float) -> o3d.geometry.TriangleMesh:
+                      wall_thickness: float,
+                      compute_normals: bool = True) -> o3d.geometry.TriangleMesh:
     """Generate a box with a sliding sleeve.
     
     Args:
         min_bound: Minimum corner of the bounding box
         max_bound: Maximum corner of the bounding box
         wall_thickness: Thickness of box walls
+        compute_normals: Compute vertex normals
         
     Returns:
         3D mesh of the box
@@ -215,17 +310,19 @@ def generate_sleeve_box(min_bound: np.ndarray, max_bound: np.ndarray,
     # Simplified implementation - in a real-world scenario, this would be more complex
     # For now, we'll just return a standard box as a placeholder
     # TODO: Implement actual sleeve box generation
-    return generate_standard_box(min_bound, max_bound, wall_thickness)
+    return generate_standard_box(min_bound, max_bound, wall_thickness, compute_normals)
 
 
 def generate_clamshell_box(min_bound: np.ndarray, max_bound: np.ndarray, 
-                         wall_thickness: float) -> o3d.geometry.TriangleMesh:
+                         wall_thickness: float,
+                         compute_normals: bool = True) -> o3d.geometry.TriangleMesh:
     """Generate a hinged clamshell box.
     
     Args:
         min_bound: Minimum corner of the bounding box
         max_bound: Maximum corner of the bounding box
         wall_thickness: Thickness of box walls
+        compute_normals: Compute vertex normals
         
     Returns:
         3D mesh of the box
@@ -234,17 +331,19 @@ def generate_clamshell_box(min_bound: np.ndarray, max_bound: np.ndarray,
     
     # Simplified implementation - placeholder
     # TODO: Implement actual clamshell box generation
-    return generate_standard_box(min_bound, max_bound, wall_thickness)
+    return generate_standard_box(min_bound, max_bound, wall_thickness, compute_normals)
 
 
 def generate_tray_box(min_bound: np.ndarray, max_bound: np.ndarray, 
-                    wall_thickness: float) -> o3d.geometry.TriangleMesh:
+                    wall_thickness: float,
+                    compute_normals: bool = True) -> o3d.geometry.TriangleMesh:
     """Generate a tray with a lid.
     
     Args:
         min_bound: Minimum corner of the bounding box
         max_bound: Maximum corner of the bounding box
         wall_thickness: Thickness of box walls
+        compute_normals: Compute vertex normals
         
     Returns:
         3D mesh of the box
@@ -253,18 +352,20 @@ def generate_tray_box(min_bound: np.ndarray, max_bound: np.ndarray,
     
     # Simplified implementation - placeholder
     # TODO: Implement actual tray box generation
-    return generate_standard_box(min_bound, max_bound, wall_thickness)
+    return generate_standard_box(min_bound, max_bound, wall_thickness, compute_normals)
 
 
 def optimize_box_dimensions(product_mesh: o3d.geometry.TriangleMesh,
                           padding: float = 10.0,
-                          constraints: Optional[Dict[str, float]] = None) -> Tuple[float, float, float]:
+                          constraints: Optional[Dict[str, float]] = None,
+                          mesh_info: Optional[MeshInfoCache] = None) -> Tuple[float, float, float]:
     """Optimize box dimensions based on product mesh and constraints.
     
     Args:
         product_mesh: 3D mesh of the product
         padding: Padding between product and box walls (mm)
         constraints: Dict with optional constraints (max_width, max_height, max_depth, max_volume)
+        mesh_info: Precomputed summary of product_mesh (computed if omitted)
         
     Returns:
         Tuple of optimized (width, height, depth)
@@ -277,56 +378,35 @@ def optimize_box_dimensions(product_mesh: o3d.geometry.TriangleMesh,
             constraints = {}
         
         # Calculate product bounding box
-        min_bound, max_bound = calculate_bounding_box(product_mesh)
+        if mesh_info is None:
+            mesh_info = MeshInfoCache.from_mesh(product_mesh)
+        min_bound, max_bound = mesh_info.min_bound, mesh_info.max_bound
         
         # Add padding
         padded_min, padded_max = add_padding(min_bound, max_bound, padding)
         
         # Get initial dimensions
         dimensions = padded_max - padded_min
-        width, height, depth = dimensions
         
-        # Check constraints
-        max_width = constraints.get('max_width')
-        max_height = constraints.get('max_height')
-        max_depth = constraints.get('max_depth')
-        max_volume = constraints.get('max_volume')
-        
-        # Apply constraints if specified
-        if max_width and width > max_width:
-            scale = max_width / width
-            width = max_width
-            height *= scale
-            depth *= scale
-            logger.debug(f"Scaled dimensions to meet max_width constraint: {width, height, depth}")
-        
-        if max_height and height > max_height:
-            scale = max_height / height
-            height = max_height
-            width *= scale
-            depth *= scale
-            logger.debug(f"Scaled dimensions to meet max_height constraint: {width, height, depth}")
-        
-        if max_depth and depth > max_depth:
-            scale = max_depth / depth
-            depth = max_depth
-            width *= scale
-            height *= scale
-            logger.debug(f"Scaled dimensions to meet max_depth constraint: {width, height, depth}")
-        
-        # Check volume constraint
-        if max_volume:
-            volume = width * height * depth
-            if volume > max_volume:
-                scale = (max_volume / volume) ** (1/3)  # Cubic root to maintain proportions
-                width *= scale
-                height *= scale
-                depth *= scale
-                logger.debug(f"Scaled dimensions to meet max_volume constraint: {width, height, depth}")
-        
-        logger.info(f"Optimized box dimensions: {width:.2f} x {height:.2f} x {depth:.2f} mm")
+        # Check constraints; a missing (or zero) limit means unconstrained
+        axis_limits = np.array([
+            constraints.get('max_width') or np.inf,
+            constraints.get('max_height') or np.inf,
+            constraints.get('max_depth') or np.inf,
+        ])
+        max_volume = constraints.get('max_volume') or np.inf
+        
+        # Apply constraints with one uniform scale that satisfies all of them
+        # at once (cubic root for volume to maintain proportions)
+        with np.errstate(divide='ignore'):
+            scale = min(1.0,
+                        float((axis_limits / dimensions).min()),
+                        float((max_volume / dimensions.prod()) ** (1 / 3)))
+        width, height, depth = (dimensions * scale).tolist()
+        
+        logger.info("Optimized box dimensions: %.2f x %.2f x %.2f mm", width, height, depth)
         return width, height, depth
         
     except Exception as e:
-        logger.error(f"Box dimension optimization failed: {str(e)}")
+        logger.error("Box dimension optimization failed: %s", e)
         raise BoxGeneratorError(f"Failed to optimize box dimensions: {str(e)}")
\ No newline at end of file
@@ -1,15 +1,53 @@
 """Generate internal support structures for product stabilization in packaging."""
 
+from __future__ import annotations
+
+import functools
 import numpy as np
-import open3d as o3d
-import trimesh
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Tuple, Dict, List, Optional, Any
+from typing import Tuple, Dict, List, Optional, Any, TYPE_CHECKING
 from ..config import settings
+from .mesh_utils import (MeshInfoCache, UNIT_CUBE_VERTS, UNIT_CUBE_TRIS, as_o3d_verts, as_o3d_tris,
+                         get_open3d, get_trimesh, weld_vertices)
+
+if TYPE_CHECKING:
+    import open3d as o3d
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on voxels along the longest block axis for the fast holder path
+MAX_VOXEL_GRID_DIM = 256
+
+
+@functools.lru_cache(maxsize=None)
+def _boolean_engine() -> Optional[str]:
+    """Pick the fastest mesh boolean engine trimesh can use here.
+    
+    The native manifold engine runs in-process; blender and scad each start
+    a subprocess per call, so they are only used when nothing better exists.
+    Selected on first use and cached.
+    
+    Returns:
+        Engine name, or None to leave the choice to trimesh
+    """
+    available = getattr(get_trimesh().boolean, "engines_available", set())
+    for engine in ("manifold", "blender", "scad"):
+        if engine in available:
+            return engine
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _marching_cubes():
+    """Return skimage's marching_cubes, or None if scikit-image is not installed."""
+    try:
+        from skimage.measure import marching_cubes
+    except ImportError:
+        return None
+    return marching_cubes
+
 
 class HolderGenerationError(Exception):
     """Exception raised for errors in holder structure generation."""
@@ -19,7 +57,10 @@ class HolderGenerationError(Exception):
 def generate_holder_structure(product_mesh: o3d.geometry.TriangleMesh,
                             holder_type: str = "negative",
                             padding: float = 2.0,
-                            base_thickness: float = 5.0) -> o3d.geometry.TriangleMesh:
+                            base_thickness: float = 5.0,
+                            mesh_info: Optional[MeshInfoCache] = None,
+                            fast: bool = False,
+                            compute_normals: bool = True) -> o3d.geometry.TriangleMesh:
     """Generate an internal holder structure to stabilize a product in packaging.
     
     Args:
@@ -27,31 +68,42 @@ def generate_holder_structure(product_mesh: o3d.geometry.TriangleMesh,
         holder_type: Type of holder structure ("negative", "cradle", "clip")
         padding: Padding between product and holder (mm)
         base_thickness: Thickness of the holder base (mm)
+        mesh_info: Precomputed summary of product_mesh (computed if omitted)
+        fast: Carve the cavity on a voxel grid instead of an exact mesh boolean
+        compute_normals: Compute vertex normals (skip if only exporting or
+            feeding another boolean)
         
     Returns:
         3D mesh of the holder structure
     """
-    logger.info(f"Generating {holder_type} holder structure with {padding}mm padding")
+    logger.info("Generating %s holder structure with %smm padding", holder_type, padding)
     
     try:
         if holder_type == "negative":
-            return generate_negative_holder(product_mesh, padding, base_thickness)
+            return generate_negative_holder(product_mesh, padding, base_thickness, mesh_info,
+                                            fast, compute_normals)
         elif holder_type == "cradle":
-            return generate_cradle_holder(product_mesh, padding, base_thickness)
+            return generate_cradle_holder(product_mesh, padding, base_thickness, mesh_info,
+                                          fast, compute_normals)
         elif holder_type == "clip":
-            return generate_clip_holder(product_mesh, padding, base_thickness)
+            return generate_clip_holder(product_mesh, padding, base_thickness, mesh_info,
+                                        fast, compute_normals)
         else:
-            logger.warning(f"Unknown holder type: {holder_type}, falling back to negative holder")
-            return generate_negative_holder(product_mesh, padding, base_thickness)
+            logger.warning("Unknown holder type: %s, falling back to negative holder", holder_type)
+            return generate_negative_holder(product_mesh, padding, base_thickness, mesh_info,
+                                            fast, compute_normals)
             
     except Exception as e:
-        logger.error(f"Holder structure generation failed: {str(e)}")
+        logger.error("Holder structure generation failed: %s", e)
         raise HolderGenerationError(f"Failed to generate holder structure: {str(e)}")
 
 
 def generate_negative_holder(product_mesh: o3d.geometry.TriangleMesh,
                            padding: float,
-                           base_thickness: float) -> o3d.geometry.TriangleMesh:
+                           base_thickness: float,
+                           mesh_info: Optional[MeshInfoCache] = None,
+                           fast: bool = False,
+                           compute_normals: bool = True) -> o3d.geometry.TriangleMesh:
     """Generate a negative of the product for secure packaging.
     
     This creates a holder by subtracting the product shape (with padding)
@@ -61,6 +113,10 @@ def generate_negative_holder(product_mesh: o3d.geometry.TriangleMesh,
         product_mesh: 3D mesh of the product
         padding: Padding between product and holder (mm)
         base_thickness: Thickness of the holder base (mm)
+        mesh_info: Precomputed summary of product_mesh (computed if omitted)
+        fast: Carve the cavity on a voxel grid instead of an exact mesh boolean
+        compute_normals: Compute vertex normals (skip if only exporting or
+            feeding another boolean)
         
     Returns:
         3D mesh of the negative holder
@@ -68,80 +124,152 @@ def generate_negative_holder(product_mesh: o3d.geometry.TriangleMesh,
     logger.debug("Generating negative holder structure")
     
     try:
+        if mesh_info is None:
+            mesh_info = MeshInfoCache.from_mesh(product_mesh)
+        
         # First, scale the product mesh to add padding
         # Get product center and scale
-        center = product_mesh.get_center()
-        
-        # Create a slightly larger version of the product (for padding)
-        padded_product = product_mesh.copy()
+        center = mesh_info.center
         
         # Calculate scaling factor based on padding
         # This is a simplified approach; more sophisticated padding could be implemented
-        bbox = padded_product.get_axis_aligned_bounding_box()
-        bbox_dimensions = np.asarray(bbox.max_bound) - np.asarray(bbox.min_bound)
+        bbox_dimensions = mesh_info.dimensions
         scale_factor = 1.0 + (padding * 2 / min(bbox_dimensions))
         
-        # Scale the product mesh
-        padded_product = padded_product.scale(scale_factor, center)
+        # Create a slightly larger version of the product (for padding), scaled
+        # about its center directly on the vertex array instead of copying the
+        # Open3D mesh and scaling it in place
+        padded_vertices = np.asarray(product_mesh.vertices) - center
+        padded_vertices *= scale_factor
+        padded_vertices += center
         
-        # Get bounding box dimensions for the block
-        bbox = padded_product.get_axis_aligned_bounding_box()
-        min_bound = np.asarray(bbox.min_bound)
-        max_bound = np.asarray(bbox.max_bound)
+        # Bounding box of the scaled product, derived without re-scanning it
+        min_bound = center + scale_factor * (mesh_info.min_bound - center)
+        max_bound = center + scale_factor * (mesh_info.max_bound - center)
         
-        # Create a block with dimensions matching the bounding box plus base thickness
-        block_dimensions = max_bound - min_bound
-        block_width, block_height, block_depth = block_dimensions
+        # Block matching the bounding box that extends below the product by
+        # the base thickness, built directly from the unit cube
+        block_min = min_bound - np.array([0.0, base_thickness, 0.0])
+        block_vertices = UNIT_CUBE_VERTS * (max_bound - block_min) + block_min
         
-        # Create a block that extends below the product
-        block = o3d.geometry.TriangleMesh.create_box(
-            width=block_width,
-            height=block_height + base_thickness,  # Add base thickness
-            depth=block_depth
-        )
-        
-        # Position the block relative to the product
-        block = block.translate([min_bound[0], min_bound[1] - base_thickness, min_bound[2]])
+        if fast and _marching_cubes() is not None:
+            holder = _voxel_negative_holder(block_min, max_bound, padded_vertices,
+                                            np.asarray(product_mesh.triangles), padding,
+                                            compute_normals)
+            logger.debug("Generated voxel negative holder with %s vertices", len(holder.vertices))
+            return holder
+        if fast:
+            logger.warning("scikit-image is not installed, using exact boolean for the holder")
         
-        # Convert to trimesh for boolean operation
+        # Convert to trimesh for boolean operation; the block is already
+        # clean, so trimesh's merge/validate pass is skipped for it
+        trimesh = get_trimesh()
         block_trimesh = trimesh.Trimesh(
-            vertices=np.asarray(block.vertices),
-            faces=np.asarray(block.triangles)
+            vertices=block_vertices,
+            faces=UNIT_CUBE_TRIS,
+            process=False,
+            validate=False
         )
         
         product_trimesh = trimesh.Trimesh(
-            vertices=np.asarray(padded_product.vertices),
-            faces=np.asarray(padded_product.triangles)
+            vertices=padded_vertices,
+            faces=np.asarray(product_mesh.triangles)
         )
         
         # Perform boolean difference
-        holder_trimesh = block_trimesh.difference(product_trimesh)
+        holder_trimesh = block_trimesh.difference(product_trimesh, engine=_boolean_engine())
         
-        # Convert back to Open3D mesh
+        # Merge the duplicate vertices the boolean leaves along the cut
+        # before converting back to an Open3D mesh
+        holder_vertices, holder_triangles = weld_vertices(holder_trimesh.vertices,
+                                                          holder_trimesh.faces)
+        o3d = get_open3d()
         holder = o3d.geometry.TriangleMesh()
-        holder.vertices = o3d.utility.Vector3dVector(holder_trimesh.vertices)
-        holder.triangles = o3d.utility.Vector3iVector(holder_trimesh.faces)
+        holder.vertices = o3d.utility.Vector3dVector(holder_vertices)
+        holder.triangles = o3d.utility.Vector3iVector(holder_triangles)
         
         # Compute normals
-        holder = holder.compute_vertex_normals()
+        if compute_normals:
+            holder = holder.compute_vertex_normals()
         
-        logger.debug(f"Generated negative holder with {len(holder.vertices)} vertices")
+        logger.debug("Generated negative holder with %s vertices", len(holder.vertices))
         return holder
         
     except Exception as e:
-        logger.error(f"Error generating negative holder: {str(e)}")
+        logger.error("Error generating negative holder: %s", e)
         raise HolderGenerationError(f"Failed to generate negative holder: {str(e)}")
 
 
+def _voxel_negative_holder(block_min: np.ndarray, block_max: np.ndarray,
+                           product_vertices: np.ndarray, product_triangles: np.ndarray,
+                           padding: float,
+                           compute_normals: bool = True) -> o3d.geometry.TriangleMesh:
+    """Approximate block-minus-product on a voxel grid.
+    
+    The padded product is voxelized and filled, its cells are cleared from a
+    solid block grid, and the remainder is surfaced with marching cubes.
+    Unlike the exact boolean this tolerates self-intersecting scans and does
+    not produce sliver triangles; the cavity is accurate to one voxel.
+    
+    Args:
+        block_min: Minimum corner of the holder block
+        block_max: Maximum corner of the holder block
+        product_vertices: Vertices of the padded product
+        product_triangles: Triangles of the product
+        padding: Padding between product and holder (mm), sets the voxel size
+        compute_normals: Compute vertex normals
+        
+    Returns:
+        3D mesh of the negative holder
+    """
+    block_dims = block_max - block_min
+    pitch = max(padding / 2, block_dims.max() / MAX_VOXEL_GRID_DIM)
+    shape = np.maximum(np.ceil(block_dims / pitch).astype(np.int64), 1)
+    
+    product_trimesh = get_trimesh().Trimesh(vertices=product_vertices, faces=product_triangles)
+    product_voxels = product_trimesh.voxelized(pitch).fill()
+    
+    # Clear the product's cells from a solid block; the grid is padded by an
+    # empty layer on every side so marching cubes closes the outer surface
+    solid = np.zeros(shape + 2, dtype=bool)
+    solid[1:-1, 1:-1, 1:-1] = True
+    cells = np.floor((product_voxels.points - block_min) / pitch).astype(np.int64) + 1
+    cells = cells[np.all((cells >= 1) & (cells <= shape), axis=1)]
+    solid[tuple(cells.T)] = False
+    
+    vertices, faces, _, _ = _marching_cubes()(solid.astype(np.float32), level=0.5)
+    
+    # Grid index i is the center of cell i - 1, i.e. block_min + (i - 0.5) * pitch
+    vertices = (vertices - 0.5) * pitch + block_min
+    
+    # marching_cubes winds faces toward the solid; flip them to face outward
+    faces = faces[:, ::-1]
+    
+    o3d = get_open3d()
+    holder = o3d.geometry.TriangleMesh(
+        o3d.utility.Vector3dVector(as_o3d_verts(vertices)),
+        o3d.utility.Vector3iVector(as_o3d_tris(faces)))
+    if compute_normals:
+        holder = holder.compute_vertex_normals()
+    return holder
+
+
 def generate_cradle_holder(product_mesh: o3d.geometry.TriangleMesh,
                          padding: float,
-                         base_thickness: float) -> o3d.geometry.TriangleMesh:
+                         base_thickness: float,
+                         mesh_info: Optional[MeshInfoCache] = None,
+                         fast: bool = False,
+                         compute_normals: bool = True) -> o3d.geometry.TriangleMesh:
     """Generate a cradle holder that supports the product from below.
     
     Args:
         product_mesh: 3D mesh of the product
         padding: Padding between product and holder (mm)
         base_thickness: Thickness of the holder base (mm)
+        mesh_info: Precomputed summary of product_mesh (computed if omitted)
+        fast: Carve the cavity on a voxel grid instead of an exact mesh boolean
+        compute_normals: Compute vertex normals (skip if only exporting or
+            feeding another boolean)
         
     Returns:
         3D mesh of the cradle holder
@@ -150,18 +278,26 @@ def generate_cradle_holder(product_mesh: o3d.geometry.TriangleMesh,
     
     # Simplified implementation - placeholder
     # TODO: Implement actual cradle holder generation
-    return generate_negative_holder(product_mesh, padding, base_thickness)
+    return generate_negative_holder(product_mesh, padding, base_thickness, mesh_info,
+                                    fast, compute_normals)
 
 
 def generate_clip_holder(product_mesh: o3d.geometry.TriangleMesh,
                        padding: float,
-                       base_thickness: float) -> o3d.geometry.TriangleMesh:
+                       base_thickness: float,
+                       mesh_info: Optional[MeshInfoCache] = None,
+                       fast: bool = False,
+                       compute_normals: bool = True) -> o3d.geometry.TriangleMesh:
     """Generate a clip holder that secures the product with clips or arms.
     
     Args:
         product_mesh: 3D mesh of the product
         padding: Padding between product and holder (mm)
         base_thickness: Thickness of the holder base (mm)
+        mesh_info: Precomputed summary of product_mesh (computed if omitted)
+        fast: Carve the cavity on a voxel grid instead of an exact mesh boolean
+        compute_normals: Compute vertex normals (skip if only exporting or
+            feeding another boolean)
         
     Returns:
         3D mesh of the clip holder
@@ -170,4 +306,74 @@ def generate_clip_holder(product_mesh: o3d.geometry.TriangleMesh,
     
     # Simplified implementation - placeholder
     # TODO: Implement actual clip holder generation
-    return generate_negative_holder(product_mesh, padding, base_thickness)
\ No newline at end of file
+    return generate_negative_holder(product_mesh, padding, base_thickness, mesh_info,
+                                    fast, compute_normals)
+
+
+def _generate_holder_arrays(vertices: np.ndarray, triangles: np.ndarray,
+                            holder_type: str, padding: float,
+                            base_thickness: float, fast: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Process pool worker: build a holder from raw arrays and return raw arrays.
+    
+    Open3D geometries do not pickle reliably, so meshes cross the process
+    boundary as NumPy buffers.
+    """
+    o3d = get_open3d()
+    product_mesh = o3d.geometry.TriangleMesh(
+        o3d.utility.Vector3dVector(as_o3d_verts(vertices)),
+        o3d.utility.Vector3iVector(as_o3d_tris(triangles)))
+    holder = generate_holder_structure(product_mesh, holder_type, padding, base_thickness,
+                                       fast=fast, compute_normals=False)
+    return np.asarray(holder.vertices), np.asarray(holder.triangles)
+
+
+def generate_holders_batch(product_meshes: List[o3d.geometry.TriangleMesh],
+                           holder_type: str = "negative",
+                           padding: float = 2.0,
+                           base_thickness: float = 5.0,
+                           fast: bool = False,
+                           compute_normals: bool = True,
+                           max_workers: Optional[int] = None) -> List[o3d.geometry.TriangleMesh]:
+    """Generate holder structures for many products in parallel.
+    
+    Each holder is dominated by its mesh boolean, which holds the GIL, so the
+    products are spread over worker processes rather than threads.
+    
+    Args:
+        product_meshes: 3D meshes of the products
+        holder_type: Type of holder structure ("negative", "cradle", "clip")
+        padding: Padding between product and holder (mm)
+        base_thickness: Thickness of the holder base (mm)
+        fast: Carve the cavities on a voxel grid instead of exact mesh booleans
+        compute_normals: Compute vertex normals for each holder
+        max_workers: Number of worker processes (defaults to the CPU count)
+        
+    Returns:
+        Holder meshes in the same order as product_meshes
+    """
+    logger.info("Generating %s %s holders in parallel", len(product_meshes), holder_type)
+    
+    try:
+        o3d = get_open3d()
+        n = len(product_meshes)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                _generate_holder_arrays,
+                [np.asarray(m.vertices) for m in product_meshes],
+                [np.asarray(m.triangles) for m in product_meshes],
+                [holder_type] * n, [padding] * n, [base_thickness] * n, [fast] * n)
+            
+            holders = []
+            for vertices, triangles in results:
+                holder = o3d.geometry.TriangleMesh(
+                    o3d.utility.Vector3dVector(as_o3d_verts(vertices)),
+                    o3d.utility.Vector3iVector(as_o3d_tris(triangles)))
+                if compute_normals:
+                    holder = holder.compute_vertex_normals()
+                holders.append(holder)
+        
+        return holders
+        
+    except Exception as e:
+        logger.error("Batch holder generation failed: %s", e)
+        raise HolderGenerationError(f"Failed to generate holder structures: {str(e)}")
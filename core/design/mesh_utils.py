@@ -0,0 +1,158 @@
+"""Array helpers shared by the design mesh generators."""
+
+import functools
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+# Unit cube corners; corner i has x = bit 0, y = bit 1, z = bit 2 of i
+UNIT_CUBE_VERTS = np.array([
+    [0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0],
+    [0, 0, 1], [1, 0, 1], [0, 1, 1], [1, 1, 1],
+], dtype=np.float64)
+
+# Unit cube triangles, counter-clockwise seen from outside
+UNIT_CUBE_TRIS = np.array([
+    [0, 2, 1], [1, 2, 3],  # z = 0
+    [4, 5, 6], [5, 7, 6],  # z = 1
+    [0, 1, 4], [1, 5, 4],  # y = 0
+    [2, 6, 3], [3, 6, 7],  # y = 1
+    [0, 4, 2], [2, 4, 6],  # x = 0
+    [1, 3, 5], [3, 7, 5],  # x = 1
+], dtype=np.int32)
+
+# A box with a closed cavity: the outer cube (vertices 0-7) plus the inner
+# cube (vertices 8-15) with reversed winding so its normals face the cavity.
+# This is exactly what the boolean difference of two nested boxes yields.
+# Only the extents differ between boxes: vertices are unit corners scaled
+# by an entry of (W_outer, H_outer, D_outer, W_inner, H_inner, D_inner)
+# picked through HOLLOW_BOX_SCALE_INDEX, with the inner cube shifted by the
+# wall thickness through HOLLOW_BOX_INNER.
+HOLLOW_BOX_VERTS = np.vstack([UNIT_CUBE_VERTS, UNIT_CUBE_VERTS])
+HOLLOW_BOX_TRIS = np.vstack([UNIT_CUBE_TRIS, UNIT_CUBE_TRIS[:, ::-1] + 8])
+HOLLOW_BOX_SCALE_INDEX = np.repeat([[0, 1, 2], [3, 4, 5]], 8, axis=0)
+HOLLOW_BOX_INNER = np.repeat([[0.0], [1.0]], 8, axis=0)
+
+
+@functools.lru_cache(maxsize=None)
+def get_open3d():
+    """Import open3d on first use.
+    
+    open3d loads large native libraries and takes seconds to import, so the
+    design modules defer it until a mesh is actually built.
+    
+    Returns:
+        The open3d module
+    """
+    import open3d
+    return open3d
+
+
+@functools.lru_cache(maxsize=None)
+def get_trimesh():
+    """Import trimesh on first use.
+    
+    Returns:
+        The trimesh module
+    """
+    import trimesh
+    return trimesh
+
+
+def as_o3d_verts(vertices) -> np.ndarray:
+    """Return vertices as a C-contiguous float64 array.
+    
+    Open3D's Vector3dVector takes a fast bulk-copy path only for this
+    layout; any other dtype or stride falls back to per-element conversion.
+    
+    Args:
+        vertices: (N, 3) array-like of vertex positions
+        
+    Returns:
+        C-contiguous float64 array (no copy if already in that layout)
+    """
+    return np.ascontiguousarray(vertices, dtype=np.float64)
+
+
+def as_o3d_tris(triangles) -> np.ndarray:
+    """Return triangle indices as a C-contiguous int32 array.
+    
+    Args:
+        triangles: (M, 3) array-like of vertex indices
+        
+    Returns:
+        C-contiguous int32 array (no copy if already in that layout)
+    """
+    return np.ascontiguousarray(triangles, dtype=np.int32)
+
+
+def weld_vertices(vertices: np.ndarray, triangles: np.ndarray,
+                  tolerance: float = 1e-6) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge vertices that coincide within a tolerance.
+    
+    Positions are snapped to an integer grid of the given tolerance and
+    deduplicated with one np.unique pass; triangles that collapse onto an
+    edge or point after merging are dropped.
+    
+    Args:
+        vertices: (N, 3) vertex positions
+        triangles: (M, 3) vertex indices
+        tolerance: Distance below which vertices are considered identical
+        
+    Returns:
+        Tuple of (vertices, triangles) as float64 / int32 arrays ready for Open3D
+    """
+    vertices = np.asarray(vertices)
+    triangles = np.asarray(triangles)
+    keys = np.round(vertices / tolerance).astype(np.int64)
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    triangles = inverse.reshape(-1)[triangles]
+    
+    degenerate = ((triangles[:, 0] == triangles[:, 1]) |
+                  (triangles[:, 1] == triangles[:, 2]) |
+                  (triangles[:, 0] == triangles[:, 2]))
+    return as_o3d_verts(vertices[first]), as_o3d_tris(triangles[~degenerate])
+
+
+@dataclass
+class MeshInfoCache:
+    """Geometric summary of a mesh, computed once and reused.
+    
+    Bounds and center come from a single NumPy reduction over the vertex
+    array, so callers that need several of them do not re-scan the mesh.
+    """
+    min_bound: np.ndarray
+    max_bound: np.ndarray
+    center: np.ndarray
+    n_verts: int
+    n_tris: int
+    volume: Optional[float] = None
+    surface_area: Optional[float] = None
+    
+    @property
+    def dimensions(self) -> np.ndarray:
+        """Extent of the axis-aligned bounding box."""
+        return self.max_bound - self.min_bound
+    
+    @classmethod
+    def from_mesh(cls, mesh, with_metrics: bool = False) -> "MeshInfoCache":
+        """Summarize an Open3D triangle mesh.
+        
+        Args:
+            mesh: Open3D triangle mesh
+            with_metrics: Also compute volume and surface area
+            
+        Returns:
+            MeshInfoCache for the mesh
+        """
+        vertices = np.asarray(mesh.vertices)
+        return cls(
+            min_bound=vertices.min(axis=0),
+            max_bound=vertices.max(axis=0),
+            center=vertices.mean(axis=0),  # same as mesh.get_center()
+            n_verts=len(vertices),
+            n_tris=len(mesh.triangles),
+            volume=mesh.get_volume() if with_metrics else None,
+            surface_area=mesh.get_surface_area() if with_metrics else None,
+        )
@@ -5,12 +5,19 @@ This module provides utilities for converting 3D scan data into formats
 that can be used by the intelligence module for design recommendations.
 """
 
+import os
+import sys
 import json
+import shutil
 import logging
+import functools
+from collections import OrderedDict
 import numpy as np
 from typing import Dict, Any, List, Tuple, Optional, Union
 from pathlib import Path
 
+from .._numba_compat import njit
+
 try:
     import open3d as o3d
 except ImportError:
@@ -18,12 +25,109 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Fragility levels indexed by the code returned from _classify_fragility
+_FRAGILITY_LEVELS = ("High", "Medium-High", "Medium", "Low")
+
+# ioctl request that clones a file's extents on Linux copy-on-write filesystems
+_FICLONE = 0x40049409
+
 
 class CaptureInterfaceError(Exception):
     """Exception for errors in the capture interface."""
     pass
 
 
+def _mesh_metrics(vertices: np.ndarray, triangles: np.ndarray) -> Tuple[float, float]:
+    """Compute surface area and enclosed volume from raw mesh arrays.
+    
+    One cross product per triangle gives both: its norm is twice the
+    triangle area, and its dot product with the first vertex is six times
+    the signed tetrahedron volume (divergence theorem).
+    
+    Args:
+        vertices: (N, 3) vertex positions
+        triangles: (M, 3) vertex indices
+        
+    Returns:
+        Tuple of (volume, surface_area)
+    """
+    if len(triangles) == 0:
+        return 0.0, 0.0
+    
+    v0, v1, v2 = (vertices[triangles[:, k]] for k in range(3))
+    cross = np.cross(v1 - v0, v2 - v0)
+    surface_area = 0.5 * np.linalg.norm(cross, axis=1).sum()
+    volume = abs(np.einsum("ij,ij->", v0, cross)) / 6.0
+    return float(volume), float(surface_area)
+
+
+def _file_key(path: Path) -> Tuple[str, float, int]:
+    """Cache key identifying a file's current contents: (path, mtime, size)."""
+    stat = os.stat(path)
+    return str(path), stat.st_mtime, stat.st_size
+
+
+@functools.lru_cache(maxsize=128)
+def _compute_product_info_cached(mesh_path: str, mtime: float, size: int) -> Tuple:
+    """Load a mesh and compute its geometric properties.
+    
+    Cached on (path, mtime, size), so a mesh is only re-read when the file
+    changes. Returns an immutable tuple; callers build fresh dicts from it.
+    
+    Returns:
+        Tuple of (dimensions, volume, surface_area, center, num_vertices, num_triangles)
+    """
+    # Load mesh
+    mesh = o3d.io.read_triangle_mesh(mesh_path)
+    
+    # Pull the buffers out once; every metric below is computed from them
+    vertices = np.asarray(mesh.vertices)
+    triangles = np.asarray(mesh.triangles)
+    
+    # Calculate basic properties
+    volume, surface_area = _mesh_metrics(vertices, triangles)
+    
+    # Get bounding box and center
+    min_bound = vertices.min(axis=0)
+    max_bound = vertices.max(axis=0)
+    
+    # Calculate dimensions
+    dimensions = max_bound - min_bound
+    
+    # Calculate center of mass (approximate)
+    center = vertices.mean(axis=0)
+    
+    return (tuple(dimensions.tolist()), volume, surface_area, tuple(center.tolist()),
+            len(vertices), len(triangles))
+
+
+def _product_info_dict(name: str, category: str, mesh_path: str,
+                       dimensions, volume: float, surface_area: float, center,
+                       num_vertices: int, num_triangles: int) -> Dict[str, Any]:
+    """Build the product information dictionary from computed geometry."""
+    width, height, depth = dimensions
+    return {
+        "name": name,
+        "category": category,
+        "dimensions": {
+            "width": float(width),
+            "height": float(height),
+            "depth": float(depth),
+            "unit": "mm"
+        },
+        "volume": float(volume),
+        "surface_area": float(surface_area),
+        "center_of_mass": {
+            "x": float(center[0]),
+            "y": float(center[1]),
+            "z": float(center[2])
+        },
+        "mesh_path": mesh_path,
+        "num_vertices": int(num_vertices),
+        "num_triangles": int(num_triangles)
+    }
+
+
 def mesh_to_product_info(
     mesh_path: Union[str, Path],
     product_name: Optional[str] = None,
@@ -40,50 +144,16 @@ def mesh_to_product_info(
         
     Returns:
         Dictionary with product information
+    
+    Mesh geometry is cached per file (path, mtime, size); repeated calls for
+    an unchanged mesh only rebuild the returned dict.
     """
     mesh_path = Path(mesh_path)
     
     try:
-        # Load mesh
-        mesh = o3d.io.read_triangle_mesh(str(mesh_path))
-        
-        # Calculate basic properties
-        volume = mesh.get_volume()
-        surface_area = mesh.get_surface_area()
-        
-        # Get bounding box
-        bbox = mesh.get_axis_aligned_bounding_box()
-        min_bound = np.asarray(bbox.min_bound)
-        max_bound = np.asarray(bbox.max_bound)
-        
-        # Calculate dimensions
-        dimensions = max_bound - min_bound
-        width, height, depth = dimensions
-        
-        # Calculate center of mass (approximate)
-        center = mesh.get_center()
-        
-        # Prepare product info
-        product_info = {
-            "name": product_name or mesh_path.stem,
-            "category": category or "unknown",
-            "dimensions": {
-                "width": float(width),
-                "height": float(height),
-                "depth": float(depth),
-                "unit": "mm"
-            },
-            "volume": float(volume),
-            "surface_area": float(surface_area),
-            "center_of_mass": {
-                "x": float(center[0]),
-                "y": float(center[1]),
-                "z": float(center[2])
-            },
-            "mesh_path": str(mesh_path),
-            "num_vertices": len(mesh.vertices),
-            "num_triangles": len(mesh.triangles)
-        }
+        product_info = _product_info_dict(
+            product_name or mesh_path.stem, category or "unknown", str(mesh_path),
+            *_compute_product_info_cached(*_file_key(mesh_path)))
         
         # Add additional info if provided
         if additional_info:
@@ -94,44 +164,177 @@ def mesh_to_product_info(
         return product_info
         
     except Exception as e:
-        logger.error(f"Error processing mesh {mesh_path}: {str(e)}")
+        logger.error("Error processing mesh %s: %s", mesh_path, e)
         raise CaptureInterfaceError(f"Failed to process mesh: {str(e)}")
 
 
-def extract_features_for_llm(
-    product_info: Dict[str, Any]
-) -> Dict[str, Any]:
-    """Extract relevant features from product info for LLM input.
+class ProductInfoTable:
+    """Product information for a catalog, stored column-wise.
+    
+    Numeric fields live in contiguous NumPy arrays (one row per product), so
+    batch consumers such as extract_features_for_llm_batch can work on whole
+    columns instead of unpacking one dict per product. to_dicts() gives the
+    same dictionaries mesh_to_product_info returns.
+    """
+    
+    def __init__(self, capacity: int = 64):
+        """Create an empty table.
+        
+        Args:
+            capacity: Initial number of rows to allocate (grows as needed)
+        """
+        capacity = max(int(capacity), 1)
+        self._size = 0
+        self._dims = np.empty((capacity, 3), dtype=np.float64)
+        self._centers = np.empty((capacity, 3), dtype=np.float64)
+        self._volumes = np.empty(capacity, dtype=np.float64)
+        self._surface_areas = np.empty(capacity, dtype=np.float64)
+        self._num_vertices = np.empty(capacity, dtype=np.int64)
+        self._num_triangles = np.empty(capacity, dtype=np.int64)
+        self.names: List[str] = []
+        self.categories: List[str] = []
+        self.mesh_paths: List[str] = []
+        self.extra: List[Dict[str, Any]] = []
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def dims(self) -> np.ndarray:
+        """(N, 3) width, height, depth in mm."""
+        return self._dims[:self._size]
+    
+    @property
+    def centers(self) -> np.ndarray:
+        """(N, 3) approximate centers of mass."""
+        return self._centers[:self._size]
+    
+    @property
+    def volumes(self) -> np.ndarray:
+        """(N,) volumes in mm³."""
+        return self._volumes[:self._size]
+    
+    @property
+    def surface_areas(self) -> np.ndarray:
+        """(N,) surface areas in mm²."""
+        return self._surface_areas[:self._size]
+    
+    def _grow(self):
+        """Double the capacity of the numeric columns."""
+        for attr in ("_dims", "_centers", "_volumes", "_surface_areas",
+                     "_num_vertices", "_num_triangles"):
+            column = getattr(self, attr)
+            grown = np.empty((2 * len(column),) + column.shape[1:], dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, attr, grown)
+    
+    def append_from_mesh(
+        self,
+        mesh_path: Union[str, Path],
+        product_name: Optional[str] = None,
+        category: Optional[str] = None,
+        additional_info: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Add a product computed from a mesh file.
+        
+        Args:
+            mesh_path: Path to the 3D mesh file
+            product_name: Name of the product (optional)
+            category: Product category (optional)
+            additional_info: Additional product information (optional)
+            
+        Returns:
+            Row index of the new product
+        """
+        mesh_path = Path(mesh_path)
+        
+        try:
+            dimensions, volume, surface_area, center, num_vertices, num_triangles = \
+                _compute_product_info_cached(*_file_key(mesh_path))
+        except Exception as e:
+            logger.error("Error processing mesh %s: %s", mesh_path, e)
+            raise CaptureInterfaceError(f"Failed to process mesh: {str(e)}")
+        
+        if self._size == len(self._volumes):
+            self._grow()
+        
+        row = self._size
+        self._dims[row] = dimensions
+        self._centers[row] = center
+        self._volumes[row] = volume
+        self._surface_areas[row] = surface_area
+        self._num_vertices[row] = num_vertices
+        self._num_triangles[row] = num_triangles
+        self.names.append(product_name or mesh_path.stem)
+        self.categories.append(category or "unknown")
+        self.mesh_paths.append(str(mesh_path))
+        self.extra.append(dict(additional_info) if additional_info else {})
+        self._size += 1
+        return row
+    
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Return one product information dictionary per row.
+        
+        Returns:
+            List of dictionaries in the format of mesh_to_product_info
+        """
+        product_infos = []
+        for row, (dims, volume, area, center, n_verts, n_tris) in enumerate(zip(
+                self.dims.tolist(), self.volumes.tolist(), self.surface_areas.tolist(),
+                self.centers.tolist(), self._num_vertices[:self._size].tolist(),
+                self._num_triangles[:self._size].tolist())):
+            product_info = _product_info_dict(
+                self.names[row], self.categories[row], self.mesh_paths[row],
+                dims, volume, area, center, n_verts, n_tris)
+            for key, value in self.extra[row].items():
+                if key not in product_info:  # Don't overwrite computed values
+                    product_info[key] = value
+            product_infos.append(product_info)
+        return product_infos
+
+
+@njit(cache=True)
+def _classify_fragility(min_dim: float, max_dim: float, volume_cm3: float) -> int:
+    """Return the index into _FRAGILITY_LEVELS for a product.
+    
+    This is a very simplified heuristic.
+    """
+    if min_dim < 2:  # Very thin in one dimension
+        return 0
+    elif volume_cm3 < 10:  # Small volume
+        return 1
+    elif max_dim > 200:  # Large in one dimension
+        return 2
+    return 3
+
+
+def _fragility_codes(dims: np.ndarray, volumes_cm3: np.ndarray) -> np.ndarray:
+    """Vectorized _classify_fragility over a batch of products.
     
     Args:
-        product_info: Dictionary with product information
+        dims: (N, 3) product dimensions
+        volumes_cm3: (N,) product volumes in cm³
         
     Returns:
-        Dictionary with features formatted for LLM input
+        (N,) indices into _FRAGILITY_LEVELS
     """
+    return np.select(
+        [dims.min(axis=1) < 2, volumes_cm3 < 10, dims.max(axis=1) > 200],
+        [0, 1, 2],
+        default=3)
+
+
+def _llm_features(product_info: Dict[str, Any], width: float, height: float, depth: float,
+                  volume_cm3: float, fragility: str) -> Dict[str, Any]:
+    """Assemble the LLM feature dict for one product."""
     # Get dimensions in user-friendly format
-    dims = product_info.get("dimensions", {})
-    dimensions_str = f"{dims.get('width', 0):.1f} x {dims.get('height', 0):.1f} x {dims.get('depth', 0):.1f} {dims.get('unit', 'mm')}"
+    unit = product_info.get("dimensions", {}).get("unit", "mm")
+    dimensions_str = f"{width:.1f} x {height:.1f} x {depth:.1f} {unit}"
     
     # Estimate weight (very rough approximation based on volume)
     # Assuming average density of plastic (1.2 g/cm³)
-    volume_cm3 = product_info.get("volume", 0) / 1000  # Convert mm³ to cm³
     estimated_weight = volume_cm3 * 1.2  # g
     
-    # Determine fragility based on dimensions and volume
-    # This is a very simplified heuristic
-    max_dim = max(dims.get('width', 0), dims.get('height', 0), dims.get('depth', 0))
-    min_dim = min(dims.get('width', 0), dims.get('height', 0), dims.get('depth', 0))
-    
-    if min_dim < 2:  # Very thin in one dimension
-        fragility = "High"
-    elif volume_cm3 < 10:  # Small volume
-        fragility = "Medium-High"
-    elif max_dim > 200:  # Large in one dimension
-        fragility = "Medium"
-    else:
-        fragility = "Low"
-    
     # Extract key features for LLM
     llm_features = {
         "name": product_info.get("name", "Unnamed Product"),
@@ -149,6 +352,67 @@ def extract_features_for_llm(
     return llm_features
 
 
+def extract_features_for_llm(
+    product_info: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Extract relevant features from product info for LLM input.
+    
+    Args:
+        product_info: Dictionary with product information
+        
+    Returns:
+        Dictionary with features formatted for LLM input
+    """
+    # Look each dimension up once; everything below works on the locals
+    dims = product_info.get("dimensions", {})
+    width, height, depth = dims.get("width", 0), dims.get("height", 0), dims.get("depth", 0)
+    volume_cm3 = product_info.get("volume", 0) / 1000  # Convert mm³ to cm³
+    
+    # Determine fragility based on dimensions and volume
+    max_dim = max(width, height, depth)
+    min_dim = min(width, height, depth)
+    fragility = _FRAGILITY_LEVELS[_classify_fragility(float(min_dim), float(max_dim), float(volume_cm3))]
+    
+    return _llm_features(product_info, width, height, depth, volume_cm3, fragility)
+
+
+def extract_features_for_llm_batch(
+    product_infos: Union[List[Dict[str, Any]], ProductInfoTable]
+) -> List[Dict[str, Any]]:
+    """Extract LLM features for a catalog of products at once.
+    
+    Equivalent to calling extract_features_for_llm on each product, but the
+    fragility heuristic runs as one NumPy expression over the whole batch.
+    
+    Args:
+        product_infos: List of product information dictionaries, or a
+            ProductInfoTable whose columns are used directly
+        
+    Returns:
+        List of feature dictionaries, in the same order
+    """
+    if len(product_infos) == 0:
+        return []
+    
+    if isinstance(product_infos, ProductInfoTable):
+        dims = product_infos.dims
+        volumes_cm3 = product_infos.volumes / 1000
+        product_infos = product_infos.to_dicts()
+    else:
+        dims = np.array([
+            [p.get("dimensions", {}).get(axis, 0) for axis in ("width", "height", "depth")]
+            for p in product_infos
+        ], dtype=np.float64)
+        volumes_cm3 = np.array([p.get("volume", 0) for p in product_infos], dtype=np.float64) / 1000
+    
+    codes = _fragility_codes(dims, volumes_cm3)
+    return [
+        _llm_features(p, width, height, depth, volume_cm3, _FRAGILITY_LEVELS[code])
+        for p, (width, height, depth), volume_cm3, code
+        in zip(product_infos, dims.tolist(), volumes_cm3.tolist(), codes.tolist())
+    ]
+
+
 def scan_to_mesh(
     scan_data_path: Union[str, Path],
     output_mesh_path: Optional[Union[str, Path]] = None,
@@ -156,6 +420,10 @@ def scan_to_mesh(
 ) -> str:
     """Convert raw scan data to a processed 3D mesh.
     
+    Results are cached per input file (path, mtime, size); an unchanged scan
+    whose output mesh is still the file this function wrote is not
+    processed again.
+    
     Args:
         scan_data_path: Path to raw scan data (point cloud, images, etc.)
         output_mesh_path: Path to save the output mesh (optional)
@@ -171,27 +439,118 @@ def scan_to_mesh(
     else:
         output_mesh_path = Path(output_mesh_path)
     
+    try:
+        cache_key = (*_file_key(scan_data_path), str(output_mesh_path), mesh_simplification)
+    except OSError:
+        # Nothing on disk to key the cache on; process without caching
+        return _process_scan(scan_data_path, output_mesh_path)
+    
+    # A hit needs the output to be exactly the file written for this scan:
+    # it may since have been removed or overwritten (e.g. by another scan)
+    written = _SCAN_MESH_CACHE.get(cache_key)
+    if written is not None and _output_key(output_mesh_path) == written:
+        _SCAN_MESH_CACHE.move_to_end(cache_key)
+        return str(output_mesh_path)
+    
+    result = _process_scan(scan_data_path, output_mesh_path)
+    _SCAN_MESH_CACHE[cache_key] = _output_key(output_mesh_path)
+    if len(_SCAN_MESH_CACHE) > _SCAN_MESH_CACHE_SIZE:
+        _SCAN_MESH_CACHE.popitem(last=False)
+    return result
+
+
+# Processed scans: (scan path, mtime, size, output path, simplification)
+# mapped to the _output_key of the mesh they wrote, least recent first
+_SCAN_MESH_CACHE: "OrderedDict[Tuple, Tuple[int, int]]" = OrderedDict()
+_SCAN_MESH_CACHE_SIZE = 128
+
+
+def _output_key(path: Path) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of an output file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    """Clone src to dst without copying data, if the filesystem supports it.
+    
+    Uses FICLONE on Linux (Btrfs, XFS) and clonefile on macOS (APFS).
+    
+    Returns:
+        True if dst was created as a copy-on-write clone of src
+    """
+    try:
+        if sys.platform.startswith("linux"):
+            import fcntl
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                try:
+                    fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+                    return True
+                except OSError:
+                    pass
+            os.unlink(dst)
+        elif sys.platform == "darwin":
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+    except (OSError, AttributeError):
+        pass
+    return False
+
+
+def _clone_or_copy(src: Path, dst: Path) -> str:
+    """Make dst hold the contents of src while moving as few bytes as possible.
+    
+    Tries a copy-on-write clone first and copies the bytes when the
+    filesystem cannot clone. dst never shares storage with src, so writing
+    to it later cannot modify the source mesh.
+    
+    Args:
+        src: Existing file
+        dst: Destination path (replaced if it exists)
+        
+    Returns:
+        Description of how the file was placed, for logging
+    """
+    if dst.exists():
+        if os.path.samefile(src, dst):
+            return "Reused"
+        dst.unlink()
+    
+    if _reflink(src, dst):
+        return "Cloned"
+    
+    shutil.copy(src, dst)
+    return "Copied"
+
+
+def _process_scan(scan_data_path: Path, output_mesh_path: Path) -> str:
+    """Process a scan into a mesh at output_mesh_path (uncached part of scan_to_mesh)."""
     # This is a placeholder for actual scan processing logic
     # In a real implementation, this would use photogrammetry or other techniques
-    logger.info(f"Processing scan data from {scan_data_path} to mesh {output_mesh_path}")
+    logger.info("Processing scan data from %s to mesh %s", scan_data_path, output_mesh_path)
     logger.warning("scan_to_mesh is a placeholder. No actual processing is performed.")
     
     # Mock processing steps (for demonstration)
     try:
         # For demonstration, if the input is already a mesh, just copy it
         if scan_data_path.suffix in ['.obj', '.ply', '.stl']:
-            import shutil
-            shutil.copy(scan_data_path, output_mesh_path)
-            logger.info(f"Copied existing mesh from {scan_data_path} to {output_mesh_path}")
+            method = _clone_or_copy(scan_data_path, output_mesh_path)
+            logger.info("%s existing mesh from %s to %s", method, scan_data_path, output_mesh_path)
         else:
             # Create a dummy mesh (in a real implementation this would be actual processing)
             # This is just to provide a working example
             mesh = o3d.geometry.TriangleMesh.create_sphere()
+            # Replace rather than overwrite, in case the path is a link to another file
+            output_mesh_path.unlink(missing_ok=True)
             o3d.io.write_triangle_mesh(str(output_mesh_path), mesh)
-            logger.info(f"Created placeholder mesh at {output_mesh_path}")
+            logger.info("Created placeholder mesh at %s", output_mesh_path)
         
         return str(output_mesh_path)
     
     except Exception as e:
-        logger.error(f"Error processing scan data: {str(e)}")
+        logger.error("Error processing scan data: %s", e)
         raise CaptureInterfaceError(f"Failed to process scan data: {str(e)}")
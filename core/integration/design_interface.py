@@ -6,44 +6,137 @@ the intelligence module into formats that can be used by the design module
 for 3D model generation.
 """
 
+from __future__ import annotations
+
 import logging
 import json
+import functools
 import numpy as np
-from typing import Dict, Any, List, Tuple, Optional, Union
+from enum import Enum
+from typing import Dict, Any, List, NamedTuple, Tuple, Optional, Union, TYPE_CHECKING
 from pathlib import Path
 
-try:
+if TYPE_CHECKING:
     import open3d as o3d
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import manifold3d
 except ImportError:
-    logging.warning("open3d not available. 3D model processing functions will be limited.")
+    manifold3d = None
 
 logger = logging.getLogger(__name__)
 
+# Simple mapping of materials to typical wall thicknesses (mm)
+_THICKNESS_MAP = {
+    "cardboard": 1.5,
+    "corrugate": 3.0,
+    "plastic": 1.0,
+    "biodegradable": 2.0,
+    "paperboard": 0.7,
+    "molded_pulp": 3.5,
+    "foam": 5.0,
+    "wood": 3.0
+}
+
+# Dense encoding of _THICKNESS_MAP for vectorized lookups; the extra last
+# entry is the cardboard default used for unknown materials
+_MATERIAL_INDEX = {name: i for i, name in enumerate(_THICKNESS_MAP)}
+_UNKNOWN_MATERIAL = len(_MATERIAL_INDEX)
+_THICKNESS_LUT = np.array([*_THICKNESS_MAP.values(), 1.5], dtype=np.float64)
+
+
+class ManufacturingParams(NamedTuple):
+    """Manufacturing parameters written into a design spec, in mm."""
+    wall_thickness: float
+    corner_radius: float = 2.0
+    tolerance: float = 0.5
+
+
+# Per-material manufacturing parameters, keyed by MaterialType value
+_MANUFACTURING_PARAMS = {
+    name: ManufacturingParams(wall_thickness=thickness)
+    for name, thickness in _THICKNESS_MAP.items()
+}
+_DEFAULT_MANUFACTURING_PARAMS = _MANUFACTURING_PARAMS["cardboard"]
+
 
 class DesignInterfaceError(Exception):
     """Exception for errors in the design interface."""
     pass
 
 
+def _to_manifold(mesh: o3d.geometry.TriangleMesh) -> Optional["manifold3d.Manifold"]:
+    """Convert an Open3D mesh to a manifold3d solid.
+    
+    Args:
+        mesh: Open3D triangle mesh
+        
+    Returns:
+        Manifold solid, or None if the mesh is not a closed 2-manifold
+    """
+    solid = manifold3d.Manifold(manifold3d.Mesh(
+        vert_properties=np.array(mesh.vertices, dtype=np.float32),
+        tri_verts=np.array(mesh.triangles, dtype=np.uint32)
+    ))
+    if solid.status() != manifold3d.Error.NoError:
+        return None
+    return solid
+
+
+def vertices_soa(mesh: o3d.geometry.TriangleMesh) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Split mesh vertices into separate contiguous float32 x, y, z arrays.
+    
+    Open3D stores vertices as interleaved (N, 3) float64. Per-axis arrays
+    halve the memory traffic and let SIMD/GPU consumers load each
+    coordinate with aligned, unit-stride reads.
+    
+    Args:
+        mesh: Open3D triangle mesh
+        
+    Returns:
+        Tuple of (x, y, z) float32 arrays
+    """
+    vertices = np.asarray(mesh.vertices, dtype=np.float32)
+    return tuple(np.ascontiguousarray(vertices[:, axis]) for axis in range(3))
+
+
+def _from_manifold(solid: "manifold3d.Manifold") -> o3d.geometry.TriangleMesh:
+    """Convert a manifold3d solid to an Open3D mesh."""
+    import open3d as o3d
+    
+    mesh = solid.to_mesh()
+    return o3d.geometry.TriangleMesh(
+        o3d.utility.Vector3dVector(np.asarray(mesh.vert_properties[:, :3], dtype=np.float64)),
+        o3d.utility.Vector3iVector(np.asarray(mesh.tri_verts, dtype=np.int32))
+    )
+
+
 def create_design_spec(
     product_info: Dict[str, Any],
     box_type: str,
-    material: str,
+    material: Union[str, Enum],
     dimensions: Tuple[float, float, float],
     internal_structure: Optional[str] = "negative",
     padding: float = 10.0,
-    output_path: Optional[Union[str, Path]] = None
+    output_path: Optional[Union[str, Path]] = None,
+    pretty: bool = False
 ) -> Dict[str, Any]:
     """Create design specification for the design module.
     
     Args:
         product_info: Dictionary with product information
         box_type: Type of box to generate
-        material: Material for the box
+        material: Material for the box, as a name or a MaterialType
         dimensions: (width, height, depth) in mm
         internal_structure: Type of internal structure ("negative", "cradle", "clip")
         padding: Padding around product in mm
         output_path: Path to save the design specification (optional)
+        pretty: Indent the saved JSON for human reading; compact by default
         
     Returns:
         Dictionary with design specification
@@ -56,6 +149,10 @@ def create_design_spec(
     # Convert dimensions to internal format
     width, height, depth = dimensions
     
+    if isinstance(material, Enum):
+        material = material.value
+    manufacturing = _MANUFACTURING_PARAMS.get(material.lower(), _DEFAULT_MANUFACTURING_PARAMS)
+    
     # Create design spec
     design_spec = {
         "product": {
@@ -77,11 +174,7 @@ def create_design_spec(
                 "padding": padding
             }
         },
-        "manufacturing": {
-            "wall_thickness": get_wall_thickness(material),
-            "corner_radius": 2.0,
-            "tolerance": 0.5
-        },
+        "manufacturing": manufacturing._asdict(),
         "metadata": {
             "generated_by": "VirtualPackaging",
             "version": "0.1.0"
@@ -91,13 +184,25 @@ def create_design_spec(
     # Save to file if output path provided
     if output_path:
         output_path = Path(output_path)
-        with open(output_path, 'w') as f:
-            json.dump(design_spec, f, indent=2)
+        if orjson is not None:
+            # orjson also serializes NumPy scalars coming from upstream optimizers
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(design_spec, option=option))
+        else:
+            with open(output_path, 'w') as f:
+                if pretty:
+                    json.dump(design_spec, f, indent=2)
+                else:
+                    json.dump(design_spec, f, separators=(',', ':'))
         logger.info(f"Saved design specification to {output_path}")
     
     return design_spec
 
 
+@functools.lru_cache(maxsize=64)
 def get_wall_thickness(material: str) -> float:
     """Determine appropriate wall thickness based on material.
     
@@ -107,185 +212,281 @@ def get_wall_thickness(material: str) -> float:
     Returns:
         Wall thickness in mm
     """
-    # Simple mapping of materials to typical wall thicknesses
-    thickness_map = {
-        "cardboard": 1.5,
-        "corrugate": 3.0,
-        "plastic": 1.0,
-        "biodegradable": 2.0,
-        "paperboard": 0.7,
-        "molded_pulp": 3.5,
-        "foam": 5.0,
-        "wood": 3.0
-    }
-    
     # Default to cardboard if material not found
-    return thickness_map.get(material.lower(), 1.5)
+    return _THICKNESS_MAP.get(material.lower(), 1.5)
+
+
+def encode_materials(materials: List[str]) -> np.ndarray:
+    """Encode material names as integer IDs for get_wall_thicknesses.
+    
+    Args:
+        materials: Material names (case-insensitive)
+        
+    Returns:
+        Array of material IDs; unknown materials map to the default
+    """
+    return np.fromiter(
+        (_MATERIAL_INDEX.get(material.lower(), _UNKNOWN_MATERIAL) for material in materials),
+        dtype=np.intp, count=len(materials))
+
+
+def get_wall_thicknesses(materials: Union[List[str], np.ndarray]) -> np.ndarray:
+    """Vectorized get_wall_thickness for material sweeps over many SKUs.
+    
+    Args:
+        materials: Material names, or IDs already encoded with encode_materials
+        
+    Returns:
+        Wall thicknesses in mm, one per material
+    """
+    if not (isinstance(materials, np.ndarray) and np.issubdtype(materials.dtype, np.integer)):
+        materials = encode_materials(materials)
+    return _THICKNESS_LUT[materials]
 
 
 def generate_box_mesh(
     design_spec: Dict[str, Any],
-    output_path: Optional[Union[str, Path]] = None
-) -> o3d.geometry.TriangleMesh:
+    output_path: Optional[Union[str, Path]] = None,
+    return_soa: bool = False
+) -> Union[o3d.geometry.TriangleMesh, Tuple[o3d.geometry.TriangleMesh, Tuple[np.ndarray, ...]]]:
     """Generate a 3D mesh for a box based on design specification.
     
     Args:
         design_spec: Dictionary with design specification
         output_path: Path to save the generated mesh (optional)
+        return_soa: Also return the vertices as (x, y, z) float32 arrays
         
     Returns:
-        Box mesh as an Open3D TriangleMesh
+        Box mesh as an Open3D TriangleMesh, or (mesh, (x, y, z)) if return_soa
     """
-    # Extract dimensions
+    # open3d is only loaded once a mesh is built, so spec-only users skip it
+    import open3d as o3d
+    
+    # Extract dimensions as one (width, height, depth) vector
     dimensions = design_spec["box"]["dimensions"]
-    width = dimensions["width"]
-    height = dimensions["height"]
-    depth = dimensions["depth"]
+    outer_size = np.array([dimensions["width"], dimensions["height"], dimensions["depth"]],
+                          dtype=np.float64)
     
     # Extract manufacturing parameters
     manufacturing = design_spec["manufacturing"]
     wall_thickness = manufacturing["wall_thickness"]
     corner_radius = manufacturing["corner_radius"]
     
-    # Create outer box mesh
-    outer_box = o3d.geometry.TriangleMesh.create_box(
-        width=width, 
-        height=height, 
-        depth=depth
-    )
-    
-    # Create inner box mesh for hollowing
-    inner_width = width - (2 * wall_thickness)
-    inner_height = height - (2 * wall_thickness)
-    inner_depth = depth - (2 * wall_thickness)
-    
-    inner_box = o3d.geometry.TriangleMesh.create_box(
-        width=inner_width,
-        height=inner_height,
-        depth=inner_depth
-    )
-    
-    # Move inner box to center of outer box
-    inner_box.translate([wall_thickness, wall_thickness, wall_thickness])
+    # Inner box dimensions for hollowing
+    inner_size = outer_size - 2 * wall_thickness
     
-    # Boolean difference to create hollow box
-    # Note: Open3D doesn't directly support boolean operations
-    # In a real implementation, this would use a CAD library
-    # This is a simplified placeholder
-    box_mesh = outer_box
-    logger.warning("generate_box_mesh is simplified. No actual hollow box is created.")
+    if manifold3d is not None:
+        # Boolean difference to create hollow box, with the inner box moved
+        # to the center of the outer box
+        outer_box = manifold3d.Manifold.cube(outer_size.tolist())
+        inner_box = manifold3d.Manifold.cube(inner_size.tolist()).translate(
+            [wall_thickness, wall_thickness, wall_thickness])
+        box_mesh = _from_manifold(outer_box - inner_box)
+    else:
+        # Note: Open3D doesn't directly support boolean operations
+        # Without manifold3d this is a simplified placeholder
+        width, height, depth = outer_size.tolist()
+        box_mesh = o3d.geometry.TriangleMesh.create_box(
+            width=width, 
+            height=height, 
+            depth=depth
+        )
+        logger.warning("manifold3d not available. generate_box_mesh is simplified. No actual hollow box is created.")
     
     # Save to file if output path provided
     if output_path:
         o3d.io.write_triangle_mesh(str(output_path), box_mesh)
         logger.info(f"Saved box mesh to {output_path}")
     
+    if return_soa:
+        return box_mesh, vertices_soa(box_mesh)
     return box_mesh
 
 
+def generate_box_meshes_batch(
+    design_specs: List[Dict[str, Any]],
+    device: Optional[str] = None
+) -> List[Union[o3d.geometry.TriangleMesh, o3d.t.geometry.TriangleMesh]]:
+    """Generate hollow box meshes for many design specifications at once.
+    
+    Every box shares the outer-plus-inner cube topology that
+    generate_box_mesh produces, so all vertex buffers are built with one
+    broadcast over a (N, 16, 3) array instead of one boolean per box.
+    
+    Args:
+        design_specs: List of design specification dictionaries
+        device: Open3D device such as "CUDA:0" or "CPU:0". When given, the
+            boxes are returned as tensor meshes living on that device, so
+            GPU pipelines that render or analyze them skip the host copy.
+            CUDA devices fall back to CPU if Open3D was built without CUDA.
+        
+    Returns:
+        List of box meshes in input order, as legacy Open3D TriangleMeshes or
+        as tensor TriangleMeshes if a device was given
+    """
+    import open3d as o3d
+    from ..design.mesh_utils import (HOLLOW_BOX_VERTS, HOLLOW_BOX_TRIS, HOLLOW_BOX_SCALE_INDEX,
+                                     HOLLOW_BOX_INNER)
+    
+    if not design_specs:
+        return []
+    
+    outer_size = np.array([
+        [spec["box"]["dimensions"][k] for k in ("width", "height", "depth")]
+        for spec in design_specs
+    ], dtype=np.float64)
+    wall_thickness = np.array([spec["manufacturing"]["wall_thickness"] for spec in design_specs],
+                              dtype=np.float64)
+    inner_size = outer_size - 2 * wall_thickness[:, None]
+    
+    # Outer cube, then the inner cube with inverted winding so the cavity
+    # faces inward; the inner cube is shifted by the wall thickness
+    extents = np.concatenate([outer_size, inner_size], axis=1)
+    vertices = HOLLOW_BOX_VERTS * extents[:, HOLLOW_BOX_SCALE_INDEX]
+    vertices += HOLLOW_BOX_INNER * wall_thickness[:, None, None]
+    triangles = HOLLOW_BOX_TRIS
+    
+    if device is not None:
+        if device.upper().startswith("CUDA") and not o3d.core.cuda.is_available():
+            logger.warning("CUDA not available in Open3D, building box meshes on CPU")
+            device = "CPU:0"
+        o3c_device = o3d.core.Device(device)
+        # One host-to-device copy for all boxes, then per-box views on the device
+        all_vertices = o3d.core.Tensor(vertices.astype(np.float32), device=o3c_device)
+        triangles = o3d.core.Tensor(triangles, device=o3c_device)
+        meshes = []
+        for i in range(len(design_specs)):
+            mesh = o3d.t.geometry.TriangleMesh(o3c_device)
+            mesh.vertex.positions = all_vertices[i]
+            mesh.triangle.indices = triangles
+            meshes.append(mesh)
+        return meshes
+    
+    return [
+        o3d.geometry.TriangleMesh(
+            o3d.utility.Vector3dVector(box_vertices),
+            o3d.utility.Vector3iVector(triangles)
+        )
+        for box_vertices in vertices
+    ]
+
+
 def generate_internal_structure(
     design_spec: Dict[str, Any],
     product_mesh: o3d.geometry.TriangleMesh,
-    output_path: Optional[Union[str, Path]] = None
-) -> o3d.geometry.TriangleMesh:
+    output_path: Optional[Union[str, Path]] = None,
+    return_soa: bool = False
+) -> Union[o3d.geometry.TriangleMesh, Tuple[o3d.geometry.TriangleMesh, Tuple[np.ndarray, ...]]]:
     """Generate internal structure mesh based on product and design specification.
     
     Args:
         design_spec: Dictionary with design specification
         product_mesh: Mesh of the product
         output_path: Path to save the generated mesh (optional)
+        return_soa: Also return the vertices as (x, y, z) float32 arrays
         
     Returns:
-        Internal structure mesh as an Open3D TriangleMesh
+        Internal structure mesh as an Open3D TriangleMesh, or
+        (mesh, (x, y, z)) if return_soa
     """
+    import open3d as o3d
+    
     # Extract relevant information
     internal_structure_type = design_spec["box"]["internal_structure"]["type"]
     padding = design_spec["box"]["internal_structure"]["padding"]
     
-    # Get product dimensions
-    product_bbox = product_mesh.get_axis_aligned_bounding_box()
-    product_center = product_mesh.get_center()
+    # Get product dimensions from one set of reductions over the vertex
+    # buffer; everything below is vector math on them
+    vertices = np.asarray(product_mesh.vertices)
+    extent = vertices.max(axis=0) - vertices.min(axis=0)
+    center = vertices.mean(axis=0)  # same as product_mesh.get_center()
     
     # Create a placeholder structure
     # In a real implementation, this would generate actual support structures
     # For now, just create a simple mesh to demonstrate
     if internal_structure_type == "negative":
-        # For "negative" type, create a box slightly larger than the product
-        structure = o3d.geometry.TriangleMesh.create_box(
-            width=product_bbox.get_extent()[0] + padding,
-            height=product_bbox.get_extent()[1] + padding,
-            depth=product_bbox.get_extent()[2] + padding
-        )
-        
-        # Center the structure
-        structure.translate([
-            product_center[0] - (product_bbox.get_extent()[0] + padding) / 2,
-            product_center[1] - (product_bbox.get_extent()[1] + padding) / 2,
-            product_center[2] - (product_bbox.get_extent()[2] + padding) / 2
-        ])
+        # For "negative" type, create a box slightly larger than the product,
+        # centered on it
+        size = extent + padding
+        origin = center - size / 2
         
     elif internal_structure_type == "cradle":
-        # For "cradle" type, create a simple platform
-        structure = o3d.geometry.TriangleMesh.create_box(
-            width=product_bbox.get_extent()[0] + padding,
-            height=padding / 2,
-            depth=product_bbox.get_extent()[2] + padding
-        )
-        
-        # Position at the bottom
-        structure.translate([
-            product_center[0] - (product_bbox.get_extent()[0] + padding) / 2,
-            product_center[1] - product_bbox.get_extent()[1] / 2 - padding / 2,
-            product_center[2] - (product_bbox.get_extent()[2] + padding) / 2
-        ])
+        # For "cradle" type, create a simple platform at the bottom
+        size = np.array([extent[0] + padding, padding / 2, extent[2] + padding])
+        origin = center - size / 2
+        origin[1] = center[1] - extent[1] / 2 - padding / 2
         
     else:
-        # Default to a simple platform
-        structure = o3d.geometry.TriangleMesh.create_box(
-            width=product_bbox.get_extent()[0],
-            height=padding / 2,
-            depth=product_bbox.get_extent()[2]
-        )
-        
-        # Position at the bottom
-        structure.translate([
-            product_center[0] - product_bbox.get_extent()[0] / 2,
-            product_center[1] - product_bbox.get_extent()[1] / 2 - padding / 2,
-            product_center[2] - product_bbox.get_extent()[2] / 2
-        ])
+        # Default to a simple platform at the bottom
+        size = np.array([extent[0], padding / 2, extent[2]])
+        origin = center - size / 2
+        origin[1] = center[1] - extent[1] / 2 - padding / 2
+    
+    structure = o3d.geometry.TriangleMesh.create_box(*size.tolist())
+    structure.translate(origin.tolist())
     
     # Save to file if output path provided
     if output_path:
         o3d.io.write_triangle_mesh(str(output_path), structure)
         logger.info(f"Saved internal structure mesh to {output_path}")
     
+    if return_soa:
+        return structure, vertices_soa(structure)
     return structure
 
 
 def combine_meshes(
     box_mesh: o3d.geometry.TriangleMesh,
-    internal_structure: o3d.geometry.TriangleMesh,
+    internal_structure: Union[o3d.geometry.TriangleMesh, List[o3d.geometry.TriangleMesh]],
     output_path: Optional[Union[str, Path]] = None
 ) -> o3d.geometry.TriangleMesh:
     """Combine box and internal structure meshes.
     
     Args:
         box_mesh: Mesh of the box
-        internal_structure: Mesh of the internal structure
+        internal_structure: Mesh of the internal structure, or a list of
+            sub-part meshes (walls, cradle, clips, supports, ...)
         output_path: Path to save the combined mesh (optional)
         
     Returns:
         Combined mesh as an Open3D TriangleMesh
     """
-    # In a real implementation, this would use boolean operations
-    # Open3D doesn't support boolean operations natively, so we'll just combine the meshes
+    import open3d as o3d
+    
+    if isinstance(internal_structure, (list, tuple)):
+        parts = [box_mesh, *internal_structure]
+    else:
+        parts = [box_mesh, internal_structure]
     
-    # Create a new mesh that combines both
-    combined = box_mesh + internal_structure
+    # Open3D doesn't support boolean operations natively, so the union is
+    # done with manifold3d when all parts are closed solids. batch_boolean
+    # unions them as one CSG tree, evaluated in parallel inside manifold3d.
+    combined = None
+    if manifold3d is not None:
+        solids = [_to_manifold(part) for part in parts]
+        if all(solid is not None for solid in solids):
+            combined = _from_manifold(manifold3d.Manifold.batch_boolean(solids, manifold3d.OpType.Add))
+        else:
+            logger.warning("Meshes are not closed manifolds, combining without a boolean union")
+    
+    if combined is None:
+        # Create a new mesh that combines all parts: one concatenation of the
+        # vertex buffers, with each part's triangle indices offset by the
+        # vertices that precede it
+        vertices = [np.asarray(part.vertices) for part in parts]
+        offsets = np.cumsum([0] + [len(v) for v in vertices[:-1]])
+        triangles = [np.asarray(part.triangles) + offset for part, offset in zip(parts, offsets)]
+        combined = o3d.geometry.TriangleMesh(
+            o3d.utility.Vector3dVector(np.concatenate(vertices)),
+            o3d.utility.Vector3iVector(np.concatenate(triangles).astype(np.int32))
+        )
+        if all(part.has_vertex_normals() for part in parts):
+            combined.vertex_normals = o3d.utility.Vector3dVector(
+                np.concatenate([np.asarray(part.vertex_normals) for part in parts]))
     
     # Save to file if output path provided
     if output_path:
         o3d.io.write_triangle_mesh(str(output_path), combined)
         logger.info(f"Saved combined mesh to {output_path}")
     
-    return combined
\ No newline at end of file
+    return combined
@@ -27,21 +27,43 @@ Usage:
 # Version information
 __version__ = '0.1.0'
 
-# Export main classes from modules for easier access
-from .llm import PackagingLLM, ModelProvider, DesignMode, LLMError
-from .design_automation import (
-    DesignAutomation, DesignPriority, MaterialType, 
-    BoxType
-)
-from .labeling import (
-    PackagingLabeling, TextElementType, TextPlacement, 
-    TextOrientation
-)
-from .regulatory import (
-    verify_compliance, generate_regulatory_text, 
-    check_material_compliance, generate_compliance_report,
-    RegulatoryError
-)
+import importlib
+
+# Main classes are exported lazily (PEP 562): each submodule, and the LLM
+# client SDKs it pulls in, is imported on first attribute access only
+_LAZY_EXPORTS = {
+    # LLM module
+    'PackagingLLM': '.llm', 'ModelProvider': '.llm', 'DesignMode': '.llm',
+    'LLMError': '.llm',
+    
+    # Design automation module
+    'DesignAutomation': '.design_automation', 'DesignPriority': '.design_automation',
+    'MaterialType': '.design_automation', 'BoxType': '.design_automation',
+    
+    # Labeling module
+    'PackagingLabeling': '.labeling', 'TextElementType': '.labeling',
+    'TextPlacement': '.labeling', 'TextOrientation': '.labeling',
+    
+    # Regulatory module
+    'verify_compliance': '.regulatory', 'generate_regulatory_text': '.regulatory',
+    'check_material_compliance': '.regulatory',
+    'generate_compliance_report': '.regulatory', 'RegulatoryError': '.regulatory',
+}
+
+
+def __getattr__(name):
+    try:
+        module_name = _LAZY_EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 
 # Define all modules that should be imported with "from intelligence import *"
 __all__ = [
@@ -0,0 +1,96 @@
+"""Compiled numeric kernels for parametric package design.
+
+The DesignAutomation helpers evaluate a handful of arithmetic expressions
+per call, so in design-space sweeps interpreter overhead dominates. These
+kernels run the same formulas under numba (when installed), with batch
+variants that loop over whole arrays in parallel.
+
+Box types are passed as integer codes in BoxType declaration order;
+design_automation checks the codes below against BoxType at import.
+"""
+
+import math
+
+from .._numba_compat import njit, prange
+
+
+# Box type codes (positions in BoxType) with their own area formula
+RSC = 0
+TELESCOPE = 4
+HEXAGONAL = 9
+TRIANGULAR = 10
+
+# Prism-shaped boxes: number of side panels and end-cap area per width²
+HEXAGONAL_SIDES, HEXAGONAL_END_COEFF = 6, 3 * math.sqrt(3) / 8
+TRIANGULAR_SIDES, TRIANGULAR_END_COEFF = 3, math.sqrt(3) / 4
+
+
+@njit(cache=True)
+def _rsc_area(width, height, depth):
+    # Two width x height panels, two depth x height panels, and flaps
+    panel_area = 2 * (width * height) + 2 * (depth * height)
+    flap_area = 2 * (width * (depth / 2)) + 2 * (depth * (width / 2))
+    return panel_area + flap_area
+
+
+@njit(cache=True)
+def _prism_area(sides, end_coeff, width, height):
+    # Side panels of width/2 each around the circumference, plus two end caps
+    return sides * width / 2 * height + 2 * end_coeff * width ** 2
+
+
+@njit(cache=True)
+def material_area(box_code, width, height, depth):
+    """Material area in mm² for a box of the given type and dimensions."""
+    if box_code == RSC:
+        return _rsc_area(width, height, depth)
+    if box_code == TELESCOPE:
+        # Two parts: base and lid
+        return (_rsc_area(width, height * 0.7, depth) +
+                _rsc_area(width + 5, height * 0.4, depth + 5))
+    if box_code == HEXAGONAL:
+        return _prism_area(HEXAGONAL_SIDES, HEXAGONAL_END_COEFF, width, height)
+    if box_code == TRIANGULAR:
+        return _prism_area(TRIANGULAR_SIDES, TRIANGULAR_END_COEFF, width, height)
+    # 20% extra for flaps/overlap
+    return 2 * (width * height + width * depth + height * depth) * 1.2
+
+
+@njit(cache=True)
+def material_thickness(base_thickness, volume, box_factor):
+    """Material thickness in mm, scaled by product volume (mm³) and box type."""
+    if volume > 0:
+        volume_factor = min(max(math.log10(volume) / 6, 0.8), 1.5)
+    else:
+        volume_factor = 0.8
+    return base_thickness * volume_factor * box_factor
+
+
+@njit(cache=True)
+def estimate_weight(density, area_mm2, thickness):
+    """Packaging weight in grams from density (g/cm³), area and thickness."""
+    return area_mm2 * thickness / 1000 * density
+
+
+@njit(parallel=True, cache=True)
+def material_area_batch(box_codes, width, height, depth, out):
+    """Fill out[i] with material_area for each box in the batch."""
+    for i in prange(box_codes.shape[0]):
+        out[i] = material_area(box_codes[i], width[i], height[i], depth[i])
+    return out
+
+
+@njit(parallel=True, cache=True)
+def material_thickness_batch(base_thickness, volume, box_factor, out):
+    """Fill out[i] with material_thickness for each box in the batch."""
+    for i in prange(volume.shape[0]):
+        out[i] = material_thickness(base_thickness[i], volume[i], box_factor[i])
+    return out
+
+
+@njit(parallel=True, cache=True)
+def estimate_weight_batch(density, area_mm2, thickness, out):
+    """Fill out[i] with estimate_weight for each box in the batch."""
+    for i in prange(area_mm2.shape[0]):
+        out[i] = estimate_weight(density[i], area_mm2[i], thickness[i])
+    return out
@@ -0,0 +1,91 @@
+"""Nearest-neighbour search over text embeddings.
+
+Design recommendations and labeling responses are both reused for inputs
+that embed close to an earlier one; this is the index behind both.
+"""
+
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+
+class EmbeddingIndex:
+    """Unit-length text embeddings, searchable by cosine similarity.
+    
+    Texts are embedded with a caller-supplied function. Search uses a FAISS
+    index when faiss is installed (an HNSW graph if hnsw_m is given, an
+    exact inner-product index otherwise) and a brute-force NumPy scan when
+    it is not.
+    """
+    
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], np.ndarray],
+        hnsw_m: Optional[int] = None
+    ):
+        """Initialize an empty index.
+        
+        Args:
+            embed_fn: Maps a list of texts to an (N, D) array of embeddings
+            hnsw_m: Neighbours per node of a FAISS HNSW graph (optional)
+        """
+        self.embed_fn = embed_fn
+        self.hnsw_m = hnsw_m
+        self.vectors: Optional[np.ndarray] = None
+        self._index = None
+    
+    def __len__(self) -> int:
+        return 0 if self.vectors is None else len(self.vectors)
+    
+    @property
+    def dimension(self) -> Optional[int]:
+        """Size of the stored embeddings, or None while the index is empty."""
+        return None if self.vectors is None else self.vectors.shape[1]
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as unit-length float32 rows."""
+        vectors = np.asarray(self.embed_fn(texts), dtype=np.float32).reshape(len(texts), -1)
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    
+    def nearest(self, vector: np.ndarray) -> Tuple[int, float]:
+        """Position and cosine similarity of the stored vector nearest to vector.
+        
+        Args:
+            vector: Unit-length query embedding
+            
+        Returns:
+            Tuple of (position in insertion order, similarity); position is
+            -1 if nothing was found
+        """
+        if self.vectors is None:
+            return -1, float("-inf")
+        if self._index is not None:
+            scores, ids = self._index.search(vector[None], 1)
+            i, score = int(ids[0, 0]), float(scores[0, 0])
+            if self.hnsw_m is not None:
+                # Squared L2 distance between unit vectors is 2 - 2 * cosine similarity
+                score = 1.0 - score / 2
+            return i, score
+        similarities = self.vectors @ vector
+        i = int(np.argmax(similarities))
+        return i, float(similarities[i])
+    
+    def add(self, vectors: np.ndarray) -> None:
+        """Append (N, D) unit-length embeddings."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.vectors = vectors if self.vectors is None else np.vstack([self.vectors, vectors])
+        if faiss is not None:
+            if self._index is None:
+                self._index = (faiss.IndexHNSWFlat(vectors.shape[1], self.hnsw_m)
+                               if self.hnsw_m is not None else faiss.IndexFlatIP(vectors.shape[1]))
+            self._index.add(vectors)
+    
+    def clear(self) -> None:
+        """Remove all stored embeddings."""
+        self.vectors = None
+        self._index = None
@@ -0,0 +1,46 @@
+"""Compiled numeric kernels for ergonomic package sizing.
+
+Catalog passes size thousands of boxes with a few arithmetic operations
+each, so the per-product loop runs under numba (when installed) instead of
+the interpreter.
+
+Handling scenarios are passed as integer codes.
+"""
+
+from .._numba_compat import njit, prange
+
+
+# Handling scenario codes
+DIRECT_GRIP = 0
+TWO_HANDED = 1
+DEFAULT_SCENARIO = 2
+
+SCENARIO_CODES = {"direct_grip": DIRECT_GRIP, "two_handed": TWO_HANDED}
+
+
+@njit(parallel=True, cache=True)
+def optimal_box_dimensions_batch(product_dims, hand_breadth, scenario, out):
+    """Fill out[i] with the box (width, height, depth) for product_dims[i].
+    
+    Same rules as ergonomics.get_optimal_box_dimensions; all sizes in mm.
+    """
+    for i in prange(product_dims.shape[0]):
+        width = product_dims[i, 0]
+        height = product_dims[i, 1]
+        depth = product_dims[i, 2]
+        if scenario == DIRECT_GRIP:
+            # Add margin based on hand breadth
+            margin = max(20.0, hand_breadth * 0.5)
+            out[i, 0] = width + margin
+            out[i, 1] = height + 20
+            out[i, 2] = depth + margin
+        elif scenario == TWO_HANDED:
+            # Enough space for two hands, minimum depth for a secure grip
+            out[i, 0] = max(width + 40, hand_breadth * 2.5)
+            out[i, 1] = height + 30
+            out[i, 2] = max(depth + 40, 100.0)
+        else:
+            out[i, 0] = width + 30
+            out[i, 1] = height + 30
+            out[i, 2] = depth + 30
+    return out
@@ -0,0 +1,40 @@
+"""Parsing of product weights given as numbers or strings with units.
+
+Ergonomic safety checks and design recommendation rules both read the
+free-form "weight" field of product info, so they share one grammar.
+"""
+
+import re
+from typing import Any
+
+# A complete weight such as "350", "350g", "1,200 g" or "0.35 kg"
+_WEIGHT_RE = re.compile(
+    r"((?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?|\.\d+)\s*([a-z]*)", re.IGNORECASE)
+
+# Grams per unit; a bare number is in grams
+_GRAMS_PER_UNIT = {"": 1.0, "g": 1.0, "kg": 1000.0, "mg": 0.001}
+
+
+def weight_in_grams(weight: Any) -> float:
+    """Convert a product weight to grams.
+    
+    Args:
+        weight: Weight in grams, or a string with an optional g/kg/mg unit
+        
+    Returns:
+        Weight in grams
+        
+    Raises:
+        ValueError: If the weight is not a number followed by a known unit
+    """
+    if isinstance(weight, (int, float)):
+        return float(weight)
+    
+    text = str(weight).strip()
+    match = _WEIGHT_RE.fullmatch(text)
+    if not match:
+        raise ValueError(f"Cannot parse weight: {weight!r}")
+    grams_per_unit = _GRAMS_PER_UNIT.get(match.group(2).lower())
+    if grams_per_unit is None:
+        raise ValueError(f"Unknown weight unit in {weight!r}")
+    return float(match.group(1).replace(",", "")) * grams_per_unit
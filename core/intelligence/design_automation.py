@@ -6,13 +6,33 @@ generate optimized packaging designs based on product specifications.
 
 import logging
 import json
-from typing import Dict, List, Any, Optional, Union, Tuple
+import re
+import asyncio
+import bisect
+import math
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Union, Tuple, Iterator, Callable
 from enum import Enum
+from types import MappingProxyType
 import numpy as np
 import os
 import time
 
-from .llm import PackagingLLM, DesignMode, ModelProvider
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from rapidfuzz import process as fuzz_process
+except ImportError:
+    fuzz_process = None
+
+from .llm import PackagingLLM, DesignMode, ModelProvider, _ResponseCache
+from . import _design_kernels as kernels
+from ._weights import weight_in_grams
+from ._embeddings import EmbeddingIndex
 from ..utils.geometry_utils import calculate_volume, calculate_surface_area, get_mesh_dimensions
 
 logger = logging.getLogger(__name__)
@@ -55,6 +75,512 @@ class BoxType(Enum):
     TRIANGULAR_BOX = "triangle"            # Triangular prism box
 
 
+# Static instructions for the recommendation prompts. They are sent ahead of
+# the per-product details and must stay byte-identical between calls so the
+# provider can serve them from its prompt cache.
+_BOX_TYPE_PROMPT_PREFIX = """
+As a packaging expert, recommend the ideal box type for the product described below.
+
+List the top 3 recommended box types from these options:
+- Regular Slotted Container (RSC)
+- Full Overlap Slotted Container (FOSC)
+- Five Panel Folder (5PF)
+- Die Cut Display Box
+- Telescope Box
+- Mailer Box
+- Rigid Box
+- Pillow Box
+- Drawer Box
+- Hexagonal Box
+- Triangular Box
+
+For each recommended type, provide:
+1. Reasoning for this recommendation
+2. Advantages for this specific product
+3. Potential disadvantages
+4. Sustainability score (1-10)
+5. Cost score (1-10, where 10 is least expensive)
+
+Format your response as a structured JSON object.
+"""
+
+_MATERIAL_PROMPT_PREFIX = """
+As a packaging materials expert, recommend the ideal material for the product and box type described below.
+
+Consider these materials:
+- Cardboard
+- Corrugated Board
+- Plastic
+- Biodegradable Materials
+- Paperboard
+- Molded Pulp
+- Foam
+- Wood
+
+For each recommended material, provide:
+1. Reasoning for this recommendation
+2. Advantages for this specific product
+3. Sustainability considerations
+4. Cost considerations
+5. Protection level provided
+
+Format your response as a structured JSON object.
+"""
+
+_IMPROVEMENT_PROMPT_PREFIX = """
+As a packaging optimization expert, review the packaging design below and suggest improvements.
+
+Suggest 3-5 specific improvements that would better align with the design priority.
+For each suggestion:
+1. Describe the specific change to make
+2. Explain how it improves the design for the given priority
+3. Quantify the expected improvement if possible (e.g., "15% material reduction")
+4. Note any trade-offs or potential drawbacks
+
+Format your response as a JSON array of improvement objects.
+"""
+
+
+# Integer codes for BoxType members, used to index the per-box-type tables
+_BOX_INDEX = {bt: i for i, bt in enumerate(BoxType)}
+
+# The area kernel hard-codes the codes of the box types it special-cases
+assert (_BOX_INDEX[BoxType.REGULAR_SLOTTED_CONTAINER], _BOX_INDEX[BoxType.TELESCOPE_BOX],
+        _BOX_INDEX[BoxType.HEXAGONAL_BOX], _BOX_INDEX[BoxType.TRIANGULAR_BOX]) == (
+    kernels.RSC, kernels.TELESCOPE, kernels.HEXAGONAL, kernels.TRIANGULAR), \
+    "BoxType order no longer matches the box codes in _design_kernels"
+
+# Padding multipliers (width, height, depth) per box type, in BoxType order
+_PADDING_MULTIPLIERS = np.full((len(BoxType), 3), 2.0)
+_PADDING_MULTIPLIERS[_BOX_INDEX[BoxType.TELESCOPE_BOX]] = (2.0, 3.0, 2.0)  # extra height for the lid
+_PADDING_MULTIPLIERS[_BOX_INDEX[BoxType.MAILER_BOX]] = 1.5
+_PADDING_MULTIPLIERS[_BOX_INDEX[BoxType.RIGID_BOX]] = 2.5
+_PADDING_MULTIPLIERS[_BOX_INDEX[BoxType.DRAWER_BOX]] = 2.5
+
+# Box types whose footprint is sized from the product's width/depth diagonal
+_DIAGONAL_FOOTPRINT = np.zeros(len(BoxType), dtype=bool)
+_DIAGONAL_FOOTPRINT[[_BOX_INDEX[BoxType.HEXAGONAL_BOX], _BOX_INDEX[BoxType.TRIANGULAR_BOX]]] = True
+
+# The same two tables as plain Python values, for single-box calls
+_BOX_PADDING = {bt: tuple(_PADDING_MULTIPLIERS[i].tolist()) for bt, i in _BOX_INDEX.items()}
+_DIAGONAL_FOOTPRINT_TYPES = frozenset(bt for bt, i in _BOX_INDEX.items() if _DIAGONAL_FOOTPRINT[i])
+
+
+# Integer codes for MaterialType members, used to index the per-material tables
+_MATERIAL_INDEX = {mt: i for i, mt in enumerate(MaterialType)}
+
+# Base material thickness in mm, in MaterialType order
+_BASE_THICKNESS = np.array([{
+    MaterialType.CARDBOARD: 0.5,
+    MaterialType.CORRUGATE: 3.0,
+    MaterialType.PLASTIC: 0.8,
+    MaterialType.BIODEGRADABLE: 2.0,
+    MaterialType.PAPERBOARD: 0.4,
+    MaterialType.MOLDED_PULP: 3.5,
+    MaterialType.FOAM: 5.0,
+    MaterialType.WOOD: 3.0
+}[mt] for mt in MaterialType])
+
+# Material densities in g/cm³, in MaterialType order
+_DENSITY = np.array([{
+    MaterialType.CARDBOARD: 0.6,
+    MaterialType.CORRUGATE: 0.1,
+    MaterialType.PLASTIC: 1.0,
+    MaterialType.BIODEGRADABLE: 0.7,
+    MaterialType.PAPERBOARD: 0.8,
+    MaterialType.MOLDED_PULP: 0.25,
+    MaterialType.FOAM: 0.03,
+    MaterialType.WOOD: 0.7
+}[mt] for mt in MaterialType])
+
+# Thickness multiplier per box type, in BoxType order
+_BOX_THICKNESS_FACTOR = np.array([{
+    BoxType.REGULAR_SLOTTED_CONTAINER: 1.0,
+    BoxType.FULL_OVERLAP_SLOTTED_CONTAINER: 1.1,
+    BoxType.FIVE_PANEL_FOLDER: 1.0,
+    BoxType.DIE_CUT_DISPLAY_BOX: 0.9,
+    BoxType.TELESCOPE_BOX: 1.0,
+    BoxType.MAILER_BOX: 0.95,
+    BoxType.RIGID_BOX: 1.5,
+    BoxType.PILLOW_BOX: 0.9,
+    BoxType.DRAWER_BOX: 1.3,
+    BoxType.HEXAGONAL_BOX: 1.1,
+    BoxType.TRIANGULAR_BOX: 1.1
+}[bt] for bt in BoxType])
+
+
+def _design_output_files(box_type: BoxType, width: float, height: float, depth: float) -> Dict[str, str]:
+    """Output file paths for a generated design."""
+    stem = f"{box_type.value}_{width}x{height}x{depth}"
+    return {
+        "3d_model": f"output/models/{stem}.obj",
+        "2d_dieline": f"output/dielines/{stem}.svg",
+        "manufacturing_specs": f"output/specs/{stem}.pdf"
+    }
+
+
+def encode_materials(materials: List[MaterialType]) -> np.ndarray:
+    """Encode material types as integer codes for the batch methods.
+    
+    Args:
+        materials: Material types
+        
+    Returns:
+        Array of material codes
+    """
+    return np.fromiter((_MATERIAL_INDEX[mt] for mt in materials), dtype=np.intp, count=len(materials))
+
+
+def encode_box_types(box_types: List[BoxType]) -> np.ndarray:
+    """Encode box types as integer codes for the batch methods.
+    
+    Args:
+        box_types: Box types
+        
+    Returns:
+        Array of box type codes
+    """
+    return np.fromiter((_BOX_INDEX[bt] for bt in box_types), dtype=np.intp, count=len(box_types))
+
+
+# Enum lookup by label, built once: enum values and member names plus the
+# phrasings the LLM commonly uses (labels are lowercase, spaces as "_")
+_BOX_LOOKUP = {bt.value: bt for bt in BoxType}
+_BOX_ALIASES = {
+    **{bt.name.lower(): bt for bt in BoxType},
+    **{bt.name.lower().replace("_box", ""): bt for bt in BoxType},
+    "regular_slotted_container_(rsc)": BoxType.REGULAR_SLOTTED_CONTAINER,
+    "full_overlap_slotted_container_(fosc)": BoxType.FULL_OVERLAP_SLOTTED_CONTAINER,
+    "five_panel_folder_(5pf)": BoxType.FIVE_PANEL_FOLDER,
+    "display_box": BoxType.DIE_CUT_DISPLAY_BOX,
+    "hexagonal": BoxType.HEXAGONAL_BOX,
+    "triangular": BoxType.TRIANGULAR_BOX,
+}
+
+_MATERIAL_LOOKUP = {mt.value: mt for mt in MaterialType}
+_MATERIAL_ALIASES = {
+    **{mt.name.lower(): mt for mt in MaterialType},
+    "corrugated": MaterialType.CORRUGATE,
+    "corrugated_board": MaterialType.CORRUGATE,
+    "corrugated_cardboard": MaterialType.CORRUGATE,
+    "biodegradable_materials": MaterialType.BIODEGRADABLE,
+    "molded_pulp_fiber": MaterialType.MOLDED_PULP,
+    "moulded_pulp": MaterialType.MOLDED_PULP,
+}
+
+# Minimum rapidfuzz score (0-100) for a fuzzy label match
+_FUZZY_MATCH_CUTOFF = 85
+
+
+def _match_label(label: str, lookup: Dict[str, Enum], aliases: Dict[str, Enum]) -> Optional[Enum]:
+    """Map an LLM-provided label to an enum member.
+    
+    Exact and alias hits are dictionary lookups. Other labels fall back to
+    rapidfuzz when it is installed, otherwise to the longest known label
+    contained in the text.
+    
+    Args:
+        label: Normalized label (lowercase, spaces replaced by underscores)
+        lookup: Enum values to members
+        aliases: Alternative labels to members
+        
+    Returns:
+        Matching enum member, or None if nothing matches
+    """
+    member = lookup.get(label) or aliases.get(label)
+    if member is not None or not label:
+        return member
+    
+    if fuzz_process is not None:
+        match = fuzz_process.extractOne(label, aliases.keys() | lookup.keys(),
+                                        score_cutoff=_FUZZY_MATCH_CUTOFF)
+        if match is not None:
+            return lookup.get(match[0]) or aliases[match[0]]
+        return None
+    
+    best = None
+    for key, candidate in (*lookup.items(), *aliases.items()):
+        if key in label and (best is None or len(key) > len(best[0])):
+            best = (key, candidate)
+    return best[1] if best else None
+
+
+# Line classifiers for _parse_unstructured_recommendation, one named group per
+# kind. "Disadvantages" is listed before "advantages" so it wins at the same
+# position.
+_RECOMMENDATION_LINE_RE = re.compile(
+    r"(?P<type>Box|Container|RSC|Mailer)"
+    r"|(?P<reasoning>Reasoning|reason)"
+    r"|(?P<disadvantages>Disadvantages|disadvantages|Cons)"
+    r"|(?P<advantages>Advantages|advantages|Pros)"
+    r"|(?P<sustainability_score>Sustainability)"
+    r"|(?P<cost_score>Cost)"
+)
+
+# Precedence when a line matches several kinds
+_RECOMMENDATION_LINE_KINDS = (
+    "type", "reasoning", "advantages", "disadvantages", "sustainability_score", "cost_score"
+)
+
+
+# Returned when no suggestion can be parsed from an improvements reply
+_DEFAULT_IMPROVEMENT = MappingProxyType({
+    "suggestion": "Review overall dimensions",
+    "reasoning": "Optimization opportunity identified"
+})
+
+
+# Upper bounds in grams of the product weight bins used by recommendation rules
+_WEIGHT_BIN_EDGES_G = (100.0, 500.0, 2000.0, 10000.0)
+
+# One row per recommendation rule; strings are stored lowercase
+_RULE_DTYPE = np.dtype([
+    ("fragility", "U16"),
+    ("weight_bin", np.int8),
+    ("category", "U32"),
+    ("priority", "U16"),
+    ("best_box", "U16"),
+    ("best_material", "U16"),
+    ("confidence", np.float64),
+])
+
+
+def _weight_bin(weight: Any) -> Optional[int]:
+    """Map a product weight such as 350, "350g" or "1.2 kg" to its weight bin.
+    
+    Args:
+        weight: Weight in grams, or a string with a g/kg/mg unit
+        
+    Returns:
+        Index into the bins bounded by _WEIGHT_BIN_EDGES_G, or None if the
+        weight cannot be parsed
+    """
+    try:
+        grams = weight_in_grams(weight)
+    except ValueError:
+        return None
+    return bisect.bisect_right(_WEIGHT_BIN_EDGES_G, grams)
+
+
+def _read_json(path: str) -> Any:
+    """Parse a JSON file, with orjson when available."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _extract_json(text: str, open_char: str = '{') -> Optional[Any]:
+    """Parse the JSON object or array embedded in an LLM response.
+    
+    The C scanner decodes one complete value starting at an opening bracket
+    and stops there, so prose after the JSON is never scanned. Brackets that
+    do not start valid JSON (e.g. "{brand}" in a preamble) are skipped.
+    
+    Args:
+        text: LLM response text
+        open_char: '{' for an object, '[' for an array
+        
+    Returns:
+        Parsed value, or None if the text contains no opening bracket
+        
+    Raises:
+        ValueError: If no opening bracket starts valid JSON
+    """
+    start = text.find(open_char)
+    if start < 0:
+        return None
+    while True:
+        try:
+            return _JSON_DECODER.raw_decode(text, start)[0]
+        except ValueError:
+            start = text.find(open_char, start + 1)
+            if start < 0:
+                raise
+
+
+_JSON_CLOSE_CHAR = {'{': '}', '[': ']'}
+
+
+def _read_json_stream(chunks: Iterator[str], open_char: str = '{') -> str:
+    """Read a streamed LLM response up to the end of its first JSON value.
+    
+    Brackets are counted as chunks arrive (ignoring those inside string
+    literals); once the first value is balanced and decodes, the stream is
+    closed so the model stops generating the prose that usually follows.
+    
+    Args:
+        chunks: Text chunks, e.g. from PackagingLLM.stream_response
+        open_char: '{' for an object, '[' for an array
+        
+    Returns:
+        Text of the first JSON value, or the whole response if it has none
+    """
+    close_char = _JSON_CLOSE_CHAR[open_char]
+    buffer = ""
+    pos = 0
+    start = -1
+    depth = 0
+    in_string = escaped = False
+    try:
+        for chunk in chunks:
+            buffer += chunk
+            while pos < len(buffer):
+                char = buffer[pos]
+                pos += 1
+                if depth == 0:
+                    if char == open_char:
+                        start, depth = pos - 1, 1
+                elif in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == '\\':
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '"':
+                    in_string = True
+                elif char == open_char:
+                    depth += 1
+                elif char == close_char:
+                    depth -= 1
+                    if depth == 0:
+                        try:
+                            end = _JSON_DECODER.raw_decode(buffer, start)[1]
+                            return buffer[start:end]
+                        except ValueError:
+                            # Not JSON (e.g. "{brand}" in a preamble); look further on
+                            pos = start + 1
+        return buffer
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+@functools.lru_cache(maxsize=16)
+def _load_json_cached(path: str, mtime_ns: int, size: int) -> Any:
+    """Parse a JSON file once per (path, mtime, size) across all instances."""
+    return _read_json(path)
+
+
+# Upper bound on threads reading template files concurrently
+_TEMPLATE_LOAD_WORKERS = 16
+
+
+def _load_one_template(templates_path: str, filename: str) -> Tuple[str, Any]:
+    """Read one template file, returning (template name, parsed template)."""
+    return filename.split('.')[0], _read_json(os.path.join(templates_path, filename))
+
+
+@functools.lru_cache(maxsize=16)
+def _load_templates_cached(templates_path: str, files_key: Tuple[Tuple[str, int, int], ...]) -> Dict[str, Any]:
+    """Parse a templates directory once per set of (filename, mtime, size).
+    
+    Files are read on a thread pool, since on network mounts the per-file
+    latency outweighs parsing.
+    """
+    if not files_key:
+        return {}
+    filenames = [filename for filename, _, _ in files_key]
+    with ThreadPoolExecutor(max_workers=min(_TEMPLATE_LOAD_WORKERS, len(filenames))) as executor:
+        return dict(executor.map(functools.partial(_load_one_template, templates_path), filenames))
+
+
+def _stat_key(path: str) -> Tuple[str, int, int]:
+    """Cache key that changes whenever the file at path is modified."""
+    st = os.stat(path)
+    return path, st.st_mtime_ns, st.st_size
+
+
+def _is_default_recommendation(reasoning: Dict[str, Any]) -> bool:
+    """Whether a recommendation is the fallback returned when the LLM reply was unusable."""
+    return str(reasoning.get("reasoning", "")).startswith("Default recommendation")
+
+
+class _RecommendationHistory:
+    """Nearest-neighbour index of past box type / material recommendations.
+    
+    Products are embedded with a caller-supplied function. A product whose
+    embedding lies within max_distance (cosine distance) of an earlier one
+    reuses that product's recommendation.
+    """
+    
+    # Neighbours per node in the FAISS HNSW graph
+    HNSW_M = 32
+    
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], np.ndarray],
+        path: Optional[str] = None,
+        max_distance: float = 0.15
+    ):
+        """Initialize the history.
+        
+        Args:
+            embed_fn: Maps a list of texts to an (N, D) array of embeddings
+            path: .npz file that keeps the history across runs (optional)
+            max_distance: Largest cosine distance at which a past
+                recommendation is reused
+        """
+        self.path = path
+        self.max_distance = max_distance
+        self._index = EmbeddingIndex(embed_fn, hnsw_m=self.HNSW_M)
+        self._results: List[Tuple[str, str]] = []
+        
+        if path and os.path.exists(path):
+            data = np.load(path)
+            self._results = list(zip(data["box_types"].tolist(), data["materials"].tolist()))
+            self._index.add(data["vectors"])
+            logger.info(f"Loaded {len(self._results)} past recommendations")
+    
+    def __len__(self) -> int:
+        return len(self._results)
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as unit-length float32 rows."""
+        return self._index.embed(texts)
+    
+    def search(self, vector: np.ndarray) -> Optional[Tuple[BoxType, MaterialType]]:
+        """Recommendation of the nearest past product, or None if none is close enough."""
+        self._check_dimension(vector)
+        if not self._results:
+            return None
+        i, similarity = self._index.nearest(vector)
+        if i < 0 or 1.0 - similarity > self.max_distance:
+            return None
+        box_value, material_value = self._results[i]
+        return BoxType(box_value), MaterialType(material_value)
+    
+    def add(self, vector: np.ndarray, box_type: BoxType, material: MaterialType) -> None:
+        """Record the recommendation for an embedded product."""
+        self._check_dimension(vector)
+        self._results.append((box_type.value, material.value))
+        self._index.add(vector[None])
+        if self.path:
+            self._save()
+    
+    def _check_dimension(self, vector: np.ndarray) -> None:
+        """Start a fresh history if vector does not match the stored embeddings."""
+        dimension = self._index.dimension
+        if dimension is not None and dimension != vector.shape[0]:
+            logger.warning(f"Recommendation history holds {dimension}-d embeddings "
+                           f"but embed_fn returns {vector.shape[0]}-d; starting a fresh history")
+            self._index.clear()
+            self._results = []
+    
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        box_types, materials = zip(*self._results)
+        with open(self.path, 'wb') as f:
+            np.savez(f, vectors=self._index.vectors, box_types=np.array(box_types),
+                     materials=np.array(materials))
+
+
 class DesignAutomation:
     """Packaging design automation using LLM and parametric design."""
 
@@ -62,7 +588,13 @@ class DesignAutomation:
         self,
         llm: Optional[PackagingLLM] = None,
         design_templates_path: str = "data/design_templates",
-        materials_db_path: str = "data/materials_database.json"
+        materials_db_path: str = "data/materials_database.json",
+        response_cache_size: int = 256,
+        response_cache_path: Optional[str] = None,
+        recommendation_rules_path: str = "data/recommendation_rules.json",
+        embed_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+        history_path: Optional[str] = None,
+        history_max_distance: float = 0.15
     ):
         """Initialize the design automation system.
         
@@ -70,6 +602,16 @@ class DesignAutomation:
             llm: PackagingLLM instance (created if None)
             design_templates_path: Path to design templates directory
             materials_db_path: Path to materials database
+            response_cache_size: Number of LLM responses cached in memory (0 disables caching)
+            response_cache_path: SQLite file for persisting cached LLM responses (optional)
+            recommendation_rules_path: Path to rules that answer common
+                recommendations without calling the LLM
+            embed_fn: Text embedding function (list of texts to an (N, D)
+                array). If given, recommend_combined reuses the
+                recommendation of a sufficiently similar earlier product.
+            history_path: .npz file for persisting past recommendations (optional)
+            history_max_distance: Cosine distance below which an earlier
+                product counts as similar
         """
         # Initialize or use provided LLM
         self.llm = llm or PackagingLLM(
@@ -84,6 +626,22 @@ class DesignAutomation:
         # Load materials database
         self.materials_path = materials_db_path
         self.materials_db = self._load_materials_db()
+        
+        # Load deterministic recommendation rules
+        self.rules_path = recommendation_rules_path
+        self.recommendation_rules = self._load_recommendation_rules()
+        
+        # Cache of LLM responses for repeated recommendation queries
+        self._response_cache = (
+            _ResponseCache(response_cache_size, response_cache_path)
+            if response_cache_size > 0 else None
+        )
+        
+        # Past recommendations, searched by product embedding
+        self._history = (
+            _RecommendationHistory(embed_fn, history_path, history_max_distance)
+            if embed_fn is not None else None
+        )
     
     def _load_templates(self) -> Dict[str, Any]:
         """Load parametric design templates.
@@ -91,20 +649,19 @@ class DesignAutomation:
         Returns:
             Dictionary of templates
         """
-        templates = {}
-        
         try:
             if not os.path.exists(self.templates_path):
                 logger.warning(f"Templates directory not found: {self.templates_path}")
-                return templates
+                return {}
             
-            # Load each template file in the directory
-            for filename in os.listdir(self.templates_path):
+            # Load each template file in the directory; parsed templates are
+            # shared between instances until a file changes
+            files_key = []
+            for filename in sorted(os.listdir(self.templates_path)):
                 if filename.endswith('.json'):
-                    with open(os.path.join(self.templates_path, filename), 'r') as f:
-                        template_data = json.load(f)
-                        template_id = filename.split('.')[0]
-                        templates[template_id] = template_data
+                    _, mtime_ns, size = _stat_key(os.path.join(self.templates_path, filename))
+                    files_key.append((filename, mtime_ns, size))
+            templates = dict(_load_templates_cached(self.templates_path, tuple(files_key)))
             
             logger.info(f"Loaded {len(templates)} design templates")
             return templates
@@ -124,8 +681,7 @@ class DesignAutomation:
                 logger.warning(f"Materials database not found: {self.materials_path}")
                 return {}
             
-            with open(self.materials_path, 'r') as f:
-                materials = json.load(f)
+            materials = dict(_load_json_cached(*_stat_key(self.materials_path)))
             
             logger.info(f"Loaded data for {len(materials)} materials")
             return materials
@@ -134,6 +690,129 @@ class DesignAutomation:
             logger.error(f"Error loading materials database: {str(e)}")
             return {}
     
+    def _load_recommendation_rules(self) -> np.ndarray:
+        """Load recommendation rules into a structured array.
+        
+        The rules file is a JSON list of objects with the fields of
+        _RULE_DTYPE: fragility, weight_bin, category and priority to match
+        on, and the best_box / best_material values (BoxType and
+        MaterialType values) to recommend with a confidence.
+        
+        Returns:
+            Structured array of rules (empty if none could be loaded)
+        """
+        try:
+            if not os.path.exists(self.rules_path):
+                logger.warning(f"Recommendation rules not found: {self.rules_path}")
+                return np.empty(0, dtype=_RULE_DTYPE)
+            
+            rules = _load_json_cached(*_stat_key(self.rules_path))
+            
+            box_values = {bt.value for bt in BoxType}
+            material_values = {mt.value for mt in MaterialType}
+            rows = []
+            for rule in rules:
+                if rule["best_box"] not in box_values or rule["best_material"] not in material_values:
+                    logger.warning(f"Skipping recommendation rule with unknown box or material: {rule}")
+                    continue
+                rows.append((
+                    rule["fragility"].lower(), rule["weight_bin"], rule["category"].lower(),
+                    rule["priority"].lower(), rule["best_box"], rule["best_material"],
+                    rule.get("confidence", 1.0)
+                ))
+            
+            logger.info(f"Loaded {len(rows)} recommendation rules")
+            return np.array(rows, dtype=_RULE_DTYPE)
+            
+        except Exception as e:
+            logger.error(f"Error loading recommendation rules: {str(e)}")
+            return np.empty(0, dtype=_RULE_DTYPE)
+    
+    def _lookup_recommendation(
+        self,
+        product_info: Dict[str, Any],
+        priority: DesignPriority
+    ) -> Optional[np.void]:
+        """Find the recommendation rule matching a product, if any.
+        
+        Args:
+            product_info: Dictionary with product details
+            priority: Design priority
+            
+        Returns:
+            Highest-confidence matching rule, or None if no rule matches
+        """
+        rules = self.recommendation_rules
+        if len(rules) == 0:
+            return None
+        
+        weight_bin = _weight_bin(product_info.get('weight', ''))
+        if weight_bin is None:
+            return None
+        
+        mask = ((rules['fragility'] == str(product_info.get('fragility', 'Medium')).lower()) &
+                (rules['weight_bin'] == weight_bin) &
+                (rules['category'] == str(product_info.get('category', 'General')).lower()) &
+                (rules['priority'] == priority.value))
+        matches = rules[mask]
+        if len(matches) == 0:
+            return None
+        return matches[np.argmax(matches['confidence'])]
+    
+    def _cached_generate(
+        self,
+        prompt: str,
+        prefix: str,
+        json_mode: bool = False,
+        json_open_char: Optional[str] = None
+    ) -> str:
+        """Get an LLM response, reusing a cached one for an identical prompt.
+        
+        Args:
+            prompt: The per-call part of the prompt
+            prefix: Static instructions sent ahead of the prompt
+            json_mode: Ask the LLM for a single JSON object
+            json_open_char: If set ('{' or '['), stream the response and stop
+                once the first JSON object or array is complete
+            
+        Returns:
+            Generated text response
+        """
+        if self._response_cache is None:
+            return self._generate(prompt, prefix, json_mode, json_open_char)
+        
+        key = self._response_cache.make_key(
+            self.llm.provider.value, self.llm.model_name, prefix, prompt, json_mode)
+        response = self._response_cache.get(key)
+        if response is None:
+            response = self._generate(prompt, prefix, json_mode, json_open_char)
+            self._response_cache.put(key, response)
+        else:
+            logger.debug("Reusing cached LLM response")
+        return response
+    
+    def _generate(self, prompt: str, prefix: str, json_mode: bool, json_open_char: Optional[str]) -> str:
+        """Uncached LLM call behind _cached_generate."""
+        if json_open_char is None:
+            return self.llm.generate_response(prompt, cached_prefix=prefix, json_mode=json_mode)
+        stream = self.llm.stream_response(prompt, cached_prefix=prefix, json_mode=json_mode)
+        return _read_json_stream(stream, json_open_char)
+    
+    async def _cached_agenerate(self, prompt: str, prefix: str, json_mode: bool = False) -> str:
+        """Asynchronous _cached_generate."""
+        if self._response_cache is None:
+            return await self.llm.agenerate_response(prompt, cached_prefix=prefix, json_mode=json_mode)
+        
+        key = self._response_cache.make_key(
+            self.llm.provider.value, self.llm.model_name, prefix, prompt, json_mode)
+        response = self._response_cache.get(key)
+        if response is None:
+            response = await self.llm.agenerate_response(prompt, cached_prefix=prefix, json_mode=json_mode)
+            self._response_cache.put(key, response)
+        else:
+            logger.debug("Reusing cached LLM response")
+        return response
+    
     def recommend_box_type(
         self, 
         product_info: Dict[str, Any],
@@ -150,10 +829,39 @@ class DesignAutomation:
         Returns:
             Tuple of (recommended box type, reasoning dictionary)
         """
-        # Prepare inputs for LLM to get recommendations
-        prompt = f"""
-        As a packaging expert, recommend the ideal box type for the following product:
+        # Common products are answered from the rules table without the LLM
+        recommendation = self._rule_box_type(product_info, priority)
+        if recommendation is not None:
+            return recommendation
         
+        # Get recommendations from LLM
+        prompt = self._box_type_prompt(product_info, target_market, priority)
+        response = self._cached_generate(prompt, _BOX_TYPE_PROMPT_PREFIX, json_mode=True, json_open_char='{')
+        return self._parse_box_type_response(response)
+    
+    def _rule_box_type(
+        self,
+        product_info: Dict[str, Any],
+        priority: DesignPriority
+    ) -> Optional[Tuple[BoxType, Dict[str, Any]]]:
+        """Box type recommendation from the rules table, or None if no rule matches."""
+        rule = self._lookup_recommendation(product_info, priority)
+        if rule is None:
+            return None
+        return BoxType(str(rule['best_box'])), {
+            "type": str(rule['best_box']),
+            "reasoning": "Matched recommendation rule",
+            "confidence": float(rule['confidence'])
+        }
+    
+    def _box_type_prompt(
+        self,
+        product_info: Dict[str, Any],
+        target_market: str,
+        priority: DesignPriority
+    ) -> str:
+        """Per-product part of the box type prompt."""
+        return f"""
         Product: {product_info.get('name', 'Unnamed')}
         Dimensions: {product_info.get('dimensions', 'Unknown')}
         Weight: {product_info.get('weight', 'Unknown')}
@@ -161,42 +869,15 @@ class DesignAutomation:
         Category: {product_info.get('category', 'General')}
         Target Market: {target_market}
         Design Priority: {priority.value}
-        
-        List the top 3 recommended box types from these options:
-        - Regular Slotted Container (RSC)
-        - Full Overlap Slotted Container (FOSC)
-        - Five Panel Folder (5PF)
-        - Die Cut Display Box
-        - Telescope Box
-        - Mailer Box
-        - Rigid Box
-        - Pillow Box
-        - Drawer Box
-        - Hexagonal Box
-        - Triangular Box
-        
-        For each recommended type, provide:
-        1. Reasoning for this recommendation
-        2. Advantages for this specific product
-        3. Potential disadvantages
-        4. Sustainability score (1-10)
-        5. Cost score (1-10, where 10 is least expensive)
-        
-        Format your response as a structured JSON object.
         """
-        
-        # Get recommendations from LLM
-        response = self.llm.generate_response(prompt)
-        
+    
+    def _parse_box_type_response(self, response: str) -> Tuple[BoxType, Dict[str, Any]]:
+        """Map an LLM box type recommendation to a BoxType and its reasoning."""
         # Extract JSON from response
         try:
             # Find JSON in the response (in case the LLM included other text)
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                recommendations = json.loads(json_str)
-            else:
+            recommendations = _extract_json(response, '{')
+            if recommendations is None:
                 # Fallback parsing for non-JSON formatted responses
                 logger.warning("LLM did not return properly formatted JSON")
                 recommendations = self._parse_unstructured_recommendation(response)
@@ -206,10 +887,9 @@ class DesignAutomation:
                 top_rec = recommendations["recommendations"][0]
                 box_type_str = top_rec.get("type", "").lower().replace(" ", "_")
                 
-                # Map to BoxType enum
-                for bt in BoxType:
-                    if bt.value in box_type_str or box_type_str in bt.value:
-                        return bt, top_rec
+                box_type = _match_label(box_type_str, _BOX_LOOKUP, _BOX_ALIASES)
+                if box_type is not None:
+                    return box_type, top_rec
                 
                 # If no match found, default to RSC
                 logger.warning(f"Could not map recommendation to known box type: {box_type_str}")
@@ -244,8 +924,12 @@ class DesignAutomation:
             if not line:
                 continue
                 
+            # Classify the line with one regex scan
+            found = {match.lastgroup for match in _RECOMMENDATION_LINE_RE.finditer(line)}
+            kind = next((k for k in _RECOMMENDATION_LINE_KINDS if k in found), None)
+            
             # Look for box type headers
-            if "Box" in line or "Container" in line or "RSC" in line or "Mailer" in line:
+            if kind == "type":
                 # Save previous recommendation if it exists
                 if current_rec:
                     recommendations.append(current_rec)
@@ -256,36 +940,17 @@ class DesignAutomation:
                 continue
                 
             # Look for section headers
-            if "Reasoning" in line or "reason" in line:
-                current_section = "reasoning"
+            if kind in ("reasoning", "advantages", "disadvantages"):
+                current_section = kind
                 current_rec[current_section] = ""
                 continue
                 
-            if "Advantages" in line or "advantages" in line or "Pros" in line:
-                current_section = "advantages"
-                current_rec[current_section] = ""
-                continue
-                
-            if "Disadvantages" in line or "disadvantages" in line or "Cons" in line:
-                current_section = "disadvantages"
-                current_rec[current_section] = ""
-                continue
-                
-            if "Sustainability" in line:
+            if kind in ("sustainability_score", "cost_score"):
                 try:
                     score = int(line.split(':')[-1].strip().split('/')[0].strip())
-                    current_rec["sustainability_score"] = score
+                    current_rec[kind] = score
                 except:
-                    current_rec["sustainability_score"] = 5
-                current_section = None
-                continue
-                
-            if "Cost" in line:
-                try:
-                    score = int(line.split(':')[-1].strip().split('/')[0].strip())
-                    current_rec["cost_score"] = score
-                except:
-                    current_rec["cost_score"] = 5
+                    current_rec[kind] = 5
                 current_section = None
                 continue
                 
@@ -315,49 +980,55 @@ class DesignAutomation:
         Returns:
             Tuple of (recommended material type, reasoning dictionary)
         """
-        # Similar to recommend_box_type - get LLM recommendations
-        prompt = f"""
-        As a packaging materials expert, recommend the ideal material for the following product and box type:
+        # A rule's material applies when its box type was the one selected
+        recommendation = self._rule_material(product_info, box_type, priority)
+        if recommendation is not None:
+            return recommendation
         
+        # Get recommendations from LLM
+        prompt = self._material_prompt(product_info, box_type, priority)
+        response = self._cached_generate(prompt, _MATERIAL_PROMPT_PREFIX, json_mode=True, json_open_char='{')
+        return self._parse_material_response(response)
+    
+    def _rule_material(
+        self,
+        product_info: Dict[str, Any],
+        box_type: BoxType,
+        priority: DesignPriority
+    ) -> Optional[Tuple[MaterialType, Dict[str, Any]]]:
+        """Material recommendation from the rules table, or None if no rule applies."""
+        rule = self._lookup_recommendation(product_info, priority)
+        if rule is None or rule['best_box'] != box_type.value:
+            return None
+        return MaterialType(str(rule['best_material'])), {
+            "material": str(rule['best_material']),
+            "reasoning": "Matched recommendation rule",
+            "confidence": float(rule['confidence'])
+        }
+    
+    def _material_prompt(
+        self,
+        product_info: Dict[str, Any],
+        box_type: BoxType,
+        priority: DesignPriority
+    ) -> str:
+        """Per-product part of the material prompt."""
+        return f"""
         Product: {product_info.get('name', 'Unnamed')}
         Weight: {product_info.get('weight', 'Unknown')}
         Fragility: {product_info.get('fragility', 'Medium')}
         Category: {product_info.get('category', 'General')}
         Box Type: {box_type.name}
         Design Priority: {priority.value}
-        
-        Consider these materials:
-        - Cardboard
-        - Corrugated Board
-        - Plastic
-        - Biodegradable Materials
-        - Paperboard
-        - Molded Pulp
-        - Foam
-        - Wood
-        
-        For each recommended material, provide:
-        1. Reasoning for this recommendation
-        2. Advantages for this specific product
-        3. Sustainability considerations
-        4. Cost considerations
-        5. Protection level provided
-        
-        Format your response as a structured JSON object.
         """
-        
-        # Get recommendations from LLM
-        response = self.llm.generate_response(prompt)
-        
+    
+    def _parse_material_response(self, response: str) -> Tuple[MaterialType, Dict[str, Any]]:
+        """Map an LLM material recommendation to a MaterialType and its reasoning."""
         # Process response - similar to box type recommendation
         try:
             # Find JSON in the response
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                recommendations = json.loads(json_str)
-            else:
+            recommendations = _extract_json(response, '{')
+            if recommendations is None:
                 # Fallback parsing
                 logger.warning("LLM did not return properly formatted JSON for material recommendation")
                 recommendations = {"recommendations": [{"material": "cardboard", "reasoning": "Default recommendation"}]}
@@ -367,10 +1038,9 @@ class DesignAutomation:
                 top_rec = recommendations["recommendations"][0]
                 material_str = top_rec.get("material", "").lower().replace(" ", "_")
                 
-                # Map to MaterialType enum
-                for mt in MaterialType:
-                    if mt.value in material_str or material_str in mt.value:
-                        return mt, top_rec
+                material = _match_label(material_str, _MATERIAL_LOOKUP, _MATERIAL_ALIASES)
+                if material is not None:
+                    return material, top_rec
                 
                 # If no match found, default to cardboard
                 logger.warning(f"Could not map recommendation to known material type: {material_str}")
@@ -383,6 +1053,111 @@ class DesignAutomation:
             logger.error(f"Error processing material recommendations: {str(e)}")
             return MaterialType.CARDBOARD, {"reasoning": f"Default recommendation due to error: {str(e)}"}
     
+    async def recommend_box_type_async(
+        self,
+        product_info: Dict[str, Any],
+        target_market: str,
+        priority: DesignPriority
+    ) -> Tuple[BoxType, Dict[str, Any]]:
+        """Asynchronous recommend_box_type.
+        
+        Args:
+            product_info: Dictionary with product details
+            target_market: Target market description
+            priority: Design priority
+            
+        Returns:
+            Tuple of (recommended box type, reasoning dictionary)
+        """
+        recommendation = self._rule_box_type(product_info, priority)
+        if recommendation is not None:
+            return recommendation
+        
+        prompt = self._box_type_prompt(product_info, target_market, priority)
+        response = await self._cached_agenerate(prompt, _BOX_TYPE_PROMPT_PREFIX, json_mode=True)
+        return self._parse_box_type_response(response)
+    
+    async def recommend_material_async(
+        self,
+        product_info: Dict[str, Any],
+        box_type: BoxType,
+        priority: DesignPriority
+    ) -> Tuple[MaterialType, Dict[str, Any]]:
+        """Asynchronous recommend_material.
+        
+        Args:
+            product_info: Dictionary with product details
+            box_type: Selected box type
+            priority: Design priority
+            
+        Returns:
+            Tuple of (recommended material type, reasoning dictionary)
+        """
+        recommendation = self._rule_material(product_info, box_type, priority)
+        if recommendation is not None:
+            return recommendation
+        
+        prompt = self._material_prompt(product_info, box_type, priority)
+        response = await self._cached_agenerate(prompt, _MATERIAL_PROMPT_PREFIX, json_mode=True)
+        return self._parse_material_response(response)
+    
+    async def recommend_combined(
+        self,
+        product_info: Dict[str, Any],
+        target_market: str,
+        priority: DesignPriority,
+        tentative_box_type: BoxType = BoxType.REGULAR_SLOTTED_CONTAINER
+    ) -> Tuple[Tuple[BoxType, Dict[str, Any]], Tuple[MaterialType, Dict[str, Any]]]:
+        """Recommend box type and material with the two LLM calls in flight together.
+        
+        The material request is issued speculatively for a tentative box
+        type alongside the box type request. If the recommended box type
+        turns out different, only the material request is repeated.
+        
+        Products covered by the rules table get the rule's recommendation.
+        For the others, with an embed_fn configured, the product is embedded
+        once and a similar earlier product's recommendation is reused
+        without calling the LLM; new recommendations are added to that
+        history.
+        
+        Args:
+            product_info: Dictionary with product details
+            target_market: Target market description
+            priority: Design priority
+            tentative_box_type: Box type assumed for the speculative material request
+            
+        Returns:
+            Tuple of (box type recommendation, material recommendation), each as
+            returned by recommend_box_type / recommend_material
+        """
+        # The rules table takes precedence over similar earlier products
+        box_rule = self._rule_box_type(product_info, priority)
+        if box_rule is not None:
+            return box_rule, await self.recommend_material_async(product_info, box_rule[0], priority)
+        
+        vector = None
+        if self._history is not None:
+            description = self._box_type_prompt(product_info, target_market, priority)
+            vector = (await asyncio.to_thread(self._history.embed, [description]))[0]
+            match = self._history.search(vector)
+            if match is not None:
+                box_type, material = match
+                reasoning = "Matched the recommendation for a similar earlier product"
+                return ((box_type, {"type": box_type.value, "reasoning": reasoning}),
+                        (material, {"material": material.value, "reasoning": reasoning}))
+        
+        box_rec, material_rec = await asyncio.gather(
+            self.recommend_box_type_async(product_info, target_market, priority),
+            self.recommend_material_async(product_info, tentative_box_type, priority)
+        )
+        if box_rec[0] != tentative_box_type:
+            material_rec = await self.recommend_material_async(product_info, box_rec[0], priority)
+        
+        if vector is not None and not (_is_default_recommendation(box_rec[1]) or
+                                       _is_default_recommendation(material_rec[1])):
+            self._history.add(vector, box_rec[0], material_rec[0])
+        return box_rec, material_rec
+    
     def calculate_optimal_dimensions(
         self,
         product_dimensions: Tuple[float, float, float],
@@ -399,39 +1174,54 @@ class DesignAutomation:
         Returns:
             Tuple of (width, height, depth) for packaging in mm
         """
-        # Add padding to each dimension
         width, height, depth = product_dimensions
         
-        # Different box types need different dimension calculations
-        if box_type == BoxType.TELESCOPE_BOX:
-            # Telescope boxes need additional height for the lid
-            padded_width = width + (padding_mm * 2)
-            padded_height = height + (padding_mm * 3)  # Extra padding for lid
-            padded_depth = depth + (padding_mm * 2)
-        elif box_type == BoxType.MAILER_BOX:
-            # Mailer boxes often have less padding to minimize shipping costs
-            padded_width = width + (padding_mm * 1.5)
-            padded_height = height + (padding_mm * 1.5)
-            padded_depth = depth + (padding_mm * 1.5)
-        elif box_type in [BoxType.RIGID_BOX, BoxType.DRAWER_BOX]:
-            # Rigid boxes need more padding for premium feel
-            padded_width = width + (padding_mm * 2.5)
-            padded_height = height + (padding_mm * 2.5)
-            padded_depth = depth + (padding_mm * 2.5)
-        elif box_type in [BoxType.HEXAGONAL_BOX, BoxType.TRIANGULAR_BOX]:
-            # Geometric boxes need special calculations
-            # For simplicity, we'll use a bounding box approach
-            diagonal = np.sqrt(width**2 + depth**2)
-            padded_width = diagonal + (padding_mm * 2)
-            padded_height = height + (padding_mm * 2)
-            padded_depth = diagonal + (padding_mm * 2)
-        else:
-            # Standard padding for regular box types
-            padded_width = width + (padding_mm * 2)
-            padded_height = height + (padding_mm * 2)
-            padded_depth = depth + (padding_mm * 2)
+        # Different box types need different padding multipliers
+        width_factor, height_factor, depth_factor = _BOX_PADDING[box_type]
         
-        return (padded_width, padded_height, padded_depth)
+        # Geometric boxes (hexagonal, triangular) use a bounding box around
+        # the width/depth diagonal for their footprint
+        if box_type in _DIAGONAL_FOOTPRINT_TYPES:
+            width = depth = math.hypot(width, depth)
+        
+        return (width + padding_mm * width_factor,
+                height + padding_mm * height_factor,
+                depth + padding_mm * depth_factor)
+    
+    def calculate_optimal_dimensions_batch(
+        self,
+        product_dimensions: np.ndarray,
+        box_types: Union[List[BoxType], np.ndarray],
+        padding_mm: Union[float, np.ndarray] = 10.0
+    ) -> np.ndarray:
+        """Vectorized calculate_optimal_dimensions for many products.
+        
+        Args:
+            product_dimensions: (N, 3) array of product (width, height, depth) in mm
+            box_types: N box types, or codes from encode_box_types
+            padding_mm: Padding around each product in mm, scalar or (N,)
+            
+        Returns:
+            (N, 3) array of packaging (width, height, depth) in mm
+        """
+        if not (isinstance(box_types, np.ndarray) and np.issubdtype(box_types.dtype, np.integer)):
+            box_types = encode_box_types(box_types)
+        dims = np.asarray(product_dimensions, dtype=np.float64)
+        padding = np.broadcast_to(np.asarray(padding_mm, dtype=np.float64), dims.shape[:1])[:, None]
+        
+        # Different box types need different padding multipliers
+        padded = dims + padding * _PADDING_MULTIPLIERS[box_types]
+        
+        # Geometric boxes (hexagonal, triangular) use a bounding box around
+        # the width/depth diagonal for their footprint
+        geometric = _DIAGONAL_FOOTPRINT[box_types]
+        if geometric.any():
+            diagonal = np.hypot(dims[geometric, 0], dims[geometric, 2])
+            footprint = diagonal + 2 * padding[geometric, 0]
+            padded[geometric, 0] = footprint
+            padded[geometric, 2] = footprint
+        
+        return padded
     
     def generate_parametric_design(
         self,
@@ -473,6 +1263,7 @@ class DesignAutomation:
             }
         
         # Calculate additional parameters based on dimensions
+        area_mm2 = self._calculate_material_area(box_type, width, height, depth)
         result = {
             "box_type": box_type.value,
             "material": material.value,
@@ -483,14 +1274,10 @@ class DesignAutomation:
             },
             "material_thickness": material_thickness,
             "template_parameters": template,
-            "estimated_material_area": self._calculate_material_area(box_type, width, height, depth),
-            "estimated_weight": self._estimate_weight(material, width, height, depth, material_thickness),
+            "estimated_material_area": area_mm2,
+            "estimated_weight": self._estimate_weight(material, area_mm2, material_thickness),
             # In a real implementation, these would be actual file paths
-            "output_files": {
-                "3d_model": f"output/models/{box_type.value}_{width}x{height}x{depth}.obj",
-                "2d_dieline": f"output/dielines/{box_type.value}_{width}x{height}x{depth}.svg",
-                "manufacturing_specs": f"output/specs/{box_type.value}_{width}x{height}x{depth}.pdf"
-            }
+            "output_files": _design_output_files(box_type, width, height, depth)
         }
         
         # For internal structure, we'd generate a custom holder based on the product mesh
@@ -502,6 +1289,52 @@ class DesignAutomation:
         
         return result
     
+    def generate_parametric_design_batch(
+        self,
+        box_codes: np.ndarray,
+        material_codes: np.ndarray,
+        dimensions: np.ndarray
+    ) -> Dict[str, Any]:
+        """Compute design parameters for many boxes at once.
+        
+        The batch counterpart of generate_parametric_design for catalog
+        sweeps: inputs and outputs are parallel arrays rather than one dict
+        per design. Output file paths are only formatted on request.
+        
+        Args:
+            box_codes: (N,) codes from encode_box_types
+            material_codes: (N,) codes from encode_materials
+            dimensions: (N, 3) box (width, height, depth) in mm
+            
+        Returns:
+            Dictionary of (N,) arrays "material_thickness",
+            "estimated_material_area" and "estimated_weight", the inputs
+            under "box_codes", "material_codes" and "dimensions", and
+            "output_files", a function mapping a design index to the same
+            paths generate_parametric_design returns
+        """
+        box_codes = np.asarray(box_codes, dtype=np.intp)
+        material_codes = np.asarray(material_codes, dtype=np.intp)
+        dims = np.asarray(dimensions, dtype=np.float64)
+        
+        material_thickness = self._calculate_material_thickness_batch(
+            material_codes, dims.prod(axis=1), box_codes)
+        area_mm2 = self._calculate_material_area_batch(box_codes, dims)
+        box_types = list(BoxType)
+        
+        def output_files(i: int) -> Dict[str, str]:
+            return _design_output_files(box_types[box_codes[i]], *dims[i].tolist())
+        
+        return {
+            "box_codes": box_codes,
+            "material_codes": material_codes,
+            "dimensions": dims,
+            "material_thickness": material_thickness,
+            "estimated_material_area": area_mm2,
+            "estimated_weight": self._estimate_weight_batch(material_codes, area_mm2, material_thickness),
+            "output_files": output_files
+        }
+    
     def _calculate_material_thickness(
         self, 
         material: MaterialType, 
@@ -518,37 +1351,32 @@ class DesignAutomation:
         Returns:
             Material thickness in mm
         """
-        # Basic calculations - in production would use more sophisticated models
-        base_thickness = {
-            MaterialType.CARDBOARD: 0.5,
-            MaterialType.CORRUGATE: 3.0,
-            MaterialType.PLASTIC: 0.8,
-            MaterialType.BIODEGRADABLE: 2.0,
-            MaterialType.PAPERBOARD: 0.4,
-            MaterialType.MOLDED_PULP: 3.5,
-            MaterialType.FOAM: 5.0,
-            MaterialType.WOOD: 3.0
-        }.get(material, 1.0)
-        
-        # Adjust thickness based on volume
-        volume_factor = min(max(np.log10(volume) / 6, 0.8), 1.5)
-        
-        # Adjust thickness based on box type
-        box_factor = {
-            BoxType.REGULAR_SLOTTED_CONTAINER: 1.0,
-            BoxType.FULL_OVERLAP_SLOTTED_CONTAINER: 1.1,
-            BoxType.FIVE_PANEL_FOLDER: 1.0,
-            BoxType.DIE_CUT_DISPLAY_BOX: 0.9,
-            BoxType.TELESCOPE_BOX: 1.0,
-            BoxType.MAILER_BOX: 0.95,
-            BoxType.RIGID_BOX: 1.5,
-            BoxType.PILLOW_BOX: 0.9,
-            BoxType.DRAWER_BOX: 1.3,
-            BoxType.HEXAGONAL_BOX: 1.1,
-            BoxType.TRIANGULAR_BOX: 1.1
-        }.get(box_type, 1.0)
-        
-        return base_thickness * volume_factor * box_factor
+        # Basic calculations - in production would use more sophisticated models,
+        # adjusted based on volume and box type
+        return kernels.material_thickness(
+            _BASE_THICKNESS[_MATERIAL_INDEX[material]], volume,
+            _BOX_THICKNESS_FACTOR[_BOX_INDEX[box_type]])
+    
+    def _calculate_material_thickness_batch(
+        self,
+        material_codes: np.ndarray,
+        volumes: np.ndarray,
+        box_codes: np.ndarray
+    ) -> np.ndarray:
+        """Vectorized _calculate_material_thickness.
+        
+        Args:
+            material_codes: (N,) codes from encode_materials
+            volumes: (N,) product volumes (mm³)
+            box_codes: (N,) codes from encode_box_types
+            
+        Returns:
+            (N,) material thicknesses in mm
+        """
+        volumes = np.asarray(volumes, dtype=np.float64)
+        return kernels.material_thickness_batch(
+            _BASE_THICKNESS[material_codes], volumes, _BOX_THICKNESS_FACTOR[box_codes],
+            np.empty_like(volumes))
     
     def _calculate_material_area(self, box_type: BoxType, width: float, height: float, depth: float) -> float:
         """Calculate the material area needed for the box.
@@ -563,71 +1391,62 @@ class DesignAutomation:
             Material area in mm²
         """
         # Basic calculations - in production would use actual dieline templates
-        if box_type == BoxType.REGULAR_SLOTTED_CONTAINER:
-            # RSC pattern: two width×height panels, two depth×height panels, and flaps
-            panel_area = 2 * (width * height) + 2 * (depth * height)
-            flap_area = 2 * (width * (depth/2)) + 2 * (depth * (width/2))
-            return panel_area + flap_area
-            
-        elif box_type == BoxType.TELESCOPE_BOX:
-            # Telescope box has two parts (base and lid)
-            base_area = self._calculate_material_area(BoxType.REGULAR_SLOTTED_CONTAINER, width, height*0.7, depth)
-            lid_area = self._calculate_material_area(BoxType.REGULAR_SLOTTED_CONTAINER, width+5, height*0.4, depth+5)
-            return base_area + lid_area
-            
-        elif box_type in [BoxType.HEXAGONAL_BOX, BoxType.TRIANGULAR_BOX]:
-            # Geometric shapes require special calculations
-            # This is a simplification
-            circumference = box_type == BoxType.HEXAGONAL_BOX and 6 * width/2 or 3 * width/2
-            panel_area = circumference * height
-            end_area = box_type == BoxType.HEXAGONAL_BOX and 2 * (3*np.sqrt(3)/2 * (width/2)**2) or 2 * (np.sqrt(3)/4 * width**2)
-            return panel_area + end_area
+        return kernels.material_area(_BOX_INDEX[box_type], width, height, depth)
+    
+    def _calculate_material_area_batch(self, box_codes: np.ndarray, dimensions: np.ndarray) -> np.ndarray:
+        """Vectorized _calculate_material_area.
+        
+        Args:
+            box_codes: (N,) codes from encode_box_types
+            dimensions: (N, 3) box (width, height, depth) in mm
             
-        else:
-            # Default calculation for other box types
-            # This is a simplification - real calculations would be more complex
-            return 2 * (width * height + width * depth + height * depth) * 1.2  # 20% extra for flaps/overlap
+        Returns:
+            (N,) material areas in mm²
+        """
+        dims = np.asarray(dimensions, dtype=np.float64)
+        return kernels.material_area_batch(
+            np.asarray(box_codes, dtype=np.intp), dims[:, 0], dims[:, 1], dims[:, 2],
+            np.empty(len(dims)))
     
     def _estimate_weight(
         self, 
         material: MaterialType, 
-        width: float, 
-        height: float, 
-        depth: float, 
+        area_mm2: float, 
         thickness: float
     ) -> float:
         """Estimate the weight of the packaging.
         
         Args:
             material: Material type
-            width: Width in mm
-            height: Height in mm
-            depth: Depth in mm
+            area_mm2: Material area in mm², from _calculate_material_area
             thickness: Material thickness in mm
             
         Returns:
             Estimated weight in grams
         """
-        # Material densities in g/cm³
-        densities = {
-            MaterialType.CARDBOARD: 0.6,
-            MaterialType.CORRUGATE: 0.1,
-            MaterialType.PLASTIC: 1.0,
-            MaterialType.BIODEGRADABLE: 0.7,
-            MaterialType.PAPERBOARD: 0.8,
-            MaterialType.MOLDED_PULP: 0.25,
-            MaterialType.FOAM: 0.03,
-            MaterialType.WOOD: 0.7
-        }.get(material, 0.5)
-        
-        # Calculate volume of material in cm³
-        area_mm2 = self._calculate_material_area(BoxType.REGULAR_SLOTTED_CONTAINER, width, height, depth)
-        volume_cm3 = area_mm2 * thickness / 1000  # Convert to cm³
-        
-        # Calculate weight
-        weight_g = volume_cm3 * densities
-        
-        return weight_g
+        # Weight of the material volume (converted to cm³)
+        return kernels.estimate_weight(_DENSITY[_MATERIAL_INDEX[material]], area_mm2, thickness)
+    
+    def _estimate_weight_batch(
+        self,
+        material_codes: np.ndarray,
+        areas_mm2: np.ndarray,
+        thicknesses: np.ndarray
+    ) -> np.ndarray:
+        """Vectorized _estimate_weight.
+        
+        Args:
+            material_codes: (N,) codes from encode_materials
+            areas_mm2: (N,) material areas in mm², from _calculate_material_area_batch
+            thicknesses: (N,) material thicknesses in mm
+            
+        Returns:
+            (N,) estimated weights in grams
+        """
+        areas_mm2 = np.asarray(areas_mm2, dtype=np.float64)
+        return kernels.estimate_weight_batch(
+            _DENSITY[material_codes], areas_mm2, np.asarray(thicknesses, dtype=np.float64),
+            np.empty_like(areas_mm2))
     
     def suggest_design_improvements(
         self,
@@ -650,8 +1469,6 @@ class DesignAutomation:
         
         # Create prompt for suggestions
         prompt = f"""
-        As a packaging optimization expert, review this packaging design and suggest improvements.
-        
         Current design parameters:
         {design_json}
         
@@ -661,28 +1478,16 @@ class DesignAutomation:
         - Fragility: {product_info.get('fragility', 'Medium')}
         
         Design priority: {priority.value}
-        
-        Suggest 3-5 specific improvements that would better align with the design priority.
-        For each suggestion:
-        1. Describe the specific change to make
-        2. Explain how it improves the design for the given priority
-        3. Quantify the expected improvement if possible (e.g., "15% material reduction")
-        4. Note any trade-offs or potential drawbacks
-        
-        Format your response as a JSON array of improvement objects.
         """
         
         # Get suggestions from LLM
-        response = self.llm.generate_response(prompt)
+        response = self._cached_generate(prompt, _IMPROVEMENT_PROMPT_PREFIX, json_open_char='[')
         
         # Process response to extract suggestions
         try:
             # Find JSON in the response
-            json_start = response.find('[')
-            json_end = response.rfind(']') + 1
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                improvements = json.loads(json_str)
+            improvements = _extract_json(response, '[')
+            if improvements is not None:
                 return improvements
             else:
                 # Fallback parsing for non-JSON formatted responses
@@ -704,7 +1509,7 @@ class DesignAutomation:
         """
         # Basic parsing for when LLM doesn't return properly formatted JSON
         improvements = []
-        current_suggestion = {}
+        current_suggestion = None  # always has a "suggestion" key once set
         
         lines = text.split('\n')
         for i, line in enumerate(lines):
@@ -717,13 +1522,13 @@ class DesignAutomation:
             # Look for numbered suggestions (1., 2., etc.)
             if line[0].isdigit() and line[1:].startswith('. '):
                 # Save previous suggestion if it exists
-                if current_suggestion and "suggestion" in current_suggestion:
+                if current_suggestion is not None:
                     improvements.append(current_suggestion)
                 
                 current_suggestion = {"suggestion": line[3:], "reasoning": ""}
                 
             # If we're in a suggestion and find keywords, categorize the line
-            elif current_suggestion:
+            elif current_suggestion is not None:
                 lower_line = line.lower()
                 if "improv" in lower_line or "benefit" in lower_line:
                     current_suggestion["reasoning"] = line
@@ -736,12 +1541,12 @@ class DesignAutomation:
                     current_suggestion["suggestion"] += " " + line
         
         # Add the last suggestion
-        if current_suggestion and "suggestion" in current_suggestion:
+        if current_suggestion is not None:
             improvements.append(current_suggestion)
             
-        # If nothing was parsed successfully, create a default suggestion
+        # If nothing was parsed successfully, return a copy of the default suggestion
         if not improvements:
-            improvements = [{"suggestion": "Review overall dimensions", "reasoning": "Optimization opportunity identified"}]
+            return [dict(_DEFAULT_IMPROVEMENT)]
             
         return improvements
 
@@ -5,12 +5,22 @@ This module leverages human pose and anthropometry data to optimize
 packaging design for better user interaction and ergonomics.
 """
 
+from __future__ import annotations
+
 import logging
-import numpy as np
-from typing import Dict, List, Any, Tuple, Optional, Union
+import functools
+from typing import Dict, List, Any, Tuple, Optional, Union, TYPE_CHECKING
 from pathlib import Path
 import json
 import os
+from types import MappingProxyType
+
+# NumPy, and numba behind the batch kernels, are imported by the batch
+# functions only: the scalar API is pure Python and imports in milliseconds
+if TYPE_CHECKING:
+    import numpy as np
+
+from ._weights import weight_in_grams
 
 logger = logging.getLogger(__name__)
 
@@ -20,9 +30,105 @@ class ErgonomicsError(Exception):
     pass
 
 
+# Default anthropometry data (percentiles for adult populations), read-only
+# since every analyzer without a custom data file shares it
+_DEFAULT_ANTHROPOMETRY = MappingProxyType({measure: MappingProxyType(percentiles) for measure, percentiles in {
+    "hand_length": {
+        "5th_percentile": 163,  # mm (women)
+        "50th_percentile": 184,  # mm (average)
+        "95th_percentile": 211,  # mm (men)
+    },
+    "hand_breadth": {
+        "5th_percentile": 74,  # mm (women)
+        "50th_percentile": 87,  # mm (average)
+        "95th_percentile": 100,  # mm (men)
+    },
+    "grip_diameter": {
+        "5th_percentile": 29,  # mm (women)
+        "50th_percentile": 38,  # mm (average)
+        "95th_percentile": 49,  # mm (men)
+    }
+}.items()})
+
+
+# Base values for average adult lifting capacity by handle type, in kg
+_BASE_WEIGHT_LIMITS = {
+    "cutout": 7.5,
+    "strap": 10.0,
+    "grip": 12.5,
+    "none": 5.0,
+}
+
+# Adjustment factors for different user groups
+_USER_GROUP_FACTORS = {
+    "general": 1.0,
+    "elderly": 0.6,
+    "children": 0.3,
+    "limited_mobility": 0.5,
+}
+
+# Lifting capacity in kg per (handle type, user group), before the safety factor
+_MAX_WEIGHT_KG = {
+    (handle_type, user_group): base_weight * user_factor
+    for handle_type, base_weight in _BASE_WEIGHT_LIMITS.items()
+    for user_group, user_factor in _USER_GROUP_FACTORS.items()
+}
+
+
+def _product_weight_kg(product_info: Dict[str, Any]) -> float:
+    """Product weight in kg from "weight_kg", or parsed from "weight".
+    
+    Args:
+        product_info: Dictionary with product information
+        
+    Returns:
+        Weight in kg (0 if not given)
+        
+    Raises:
+        ErgonomicsError: If the weight cannot be parsed
+    """
+    weight_kg = product_info.get("weight_kg")
+    if weight_kg is not None:
+        return float(weight_kg)
+    
+    try:
+        return weight_in_grams(product_info.get("weight", 0)) / 1000
+    except ValueError as e:
+        raise ErgonomicsError(f"Cannot parse product weight: {str(e)}")
+
+
+_MEASURES = ("hand_length", "hand_breadth", "grip_diameter")
+_PERCENTILES = ("5th_percentile", "50th_percentile", "95th_percentile")
+
+
+def _hand_dimension_table(anthropometry: Dict[str, Any]) -> Dict[str, Tuple[float, float, float]]:
+    """(hand_length, hand_breadth, grip_diameter) in mm for each percentile.
+    
+    Measures or percentiles missing from the data fall back to the defaults.
+    """
+    return {
+        p: tuple(float(anthropometry.get(m, {}).get(p, _DEFAULT_ANTHROPOMETRY[m][p])) for m in _MEASURES)
+        for p in _PERCENTILES
+    }
+
+
+@functools.lru_cache(maxsize=32)
+def _load_anthropometry_cached(path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """Parse an anthropometry file once per (path, mtime, size) across all analyzers."""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
 class ErgonomicsAnalyzer:
     """Analyzer for ergonomic optimization of packaging designs."""
     
+    __slots__ = (
+        "pose_data_path", "anthropometry_data_path", "anthropometry", "pose_model_loaded",
+        "_hand_dimensions",
+    )
+    
+    default_anthropometry = _DEFAULT_ANTHROPOMETRY
+    
     def __init__(
         self,
         pose_data_path: Optional[str] = None,
@@ -37,27 +143,9 @@ class ErgonomicsAnalyzer:
         self.pose_data_path = pose_data_path
         self.anthropometry_data_path = anthropometry_data_path
         
-        # Default anthropometry data (percentiles for adult populations)
-        self.default_anthropometry = {
-            "hand_length": {
-                "5th_percentile": 163,  # mm (women)
-                "50th_percentile": 184,  # mm (average)
-                "95th_percentile": 211,  # mm (men)
-            },
-            "hand_breadth": {
-                "5th_percentile": 74,  # mm (women)
-                "50th_percentile": 87,  # mm (average)
-                "95th_percentile": 100,  # mm (men)
-            },
-            "grip_diameter": {
-                "5th_percentile": 29,  # mm (women)
-                "50th_percentile": 38,  # mm (average)
-                "95th_percentile": 49,  # mm (men)
-            }
-        }
-        
         # Load custom data if paths provided
         self.anthropometry = self._load_anthropometry_data()
+        self._hand_dimensions = _hand_dimension_table(self.anthropometry)
         self.pose_model_loaded = self._load_pose_model()
         
         logger.info("Ergonomics analyzer initialized")
@@ -66,8 +154,9 @@ class ErgonomicsAnalyzer:
         """Load anthropometry data from file or use defaults."""
         if self.anthropometry_data_path and os.path.exists(self.anthropometry_data_path):
             try:
-                with open(self.anthropometry_data_path, 'r') as f:
-                    data = json.load(f)
+                path = os.path.abspath(self.anthropometry_data_path)
+                st = os.stat(path)
+                data = dict(_load_anthropometry_cached(path, st.st_mtime_ns, st.st_size))
                 logger.info(f"Loaded anthropometry data from {self.anthropometry_data_path}")
                 return data
             except Exception as e:
@@ -126,12 +215,10 @@ class ErgonomicsAnalyzer:
         width, height, depth = box_dimensions
         
         # Get appropriate anthropometry data
-        if target_percentile not in ["5th_percentile", "50th_percentile", "95th_percentile"]:
+        if target_percentile not in self._hand_dimensions:
             target_percentile = "5th_percentile"  # Design for smaller hands by default
             
-        hand_length = self.anthropometry["hand_length"][target_percentile]
-        hand_breadth = self.anthropometry["hand_breadth"][target_percentile]
-        grip_diameter = self.anthropometry["grip_diameter"][target_percentile]
+        hand_length, hand_breadth, grip_diameter = self._hand_dimensions[target_percentile]
         
         # Calculate handle dimensions based on handle type
         if handle_type == "cutout":
@@ -211,32 +298,17 @@ class ErgonomicsAnalyzer:
         Returns:
             Maximum recommended weight in kg
         """
-        # Base values for average adult lifting capacity by handle type
-        base_weight_limits = {
-            "cutout": 7.5,  # kg
-            "strap": 10.0,  # kg
-            "grip": 12.5,  # kg
-            "none": 5.0,   # kg
-        }
-        
-        # Adjustment factors for different user groups
-        user_group_factors = {
-            "general": 1.0,
-            "elderly": 0.6,
-            "children": 0.3,
-            "limited_mobility": 0.5,
-        }
-        
-        # Get base weight for handle type
-        base_weight = base_weight_limits.get(handle_type, base_weight_limits["none"])
-        
-        # Apply user group factor
-        user_factor = user_group_factors.get(user_group, user_group_factors["general"])
+        capacity = _MAX_WEIGHT_KG.get((handle_type, user_group))
+        if capacity is None:
+            # Unknown handle types count as "none", unknown user groups as "general"
+            if handle_type not in _BASE_WEIGHT_LIMITS:
+                handle_type = "none"
+            if user_group not in _USER_GROUP_FACTORS:
+                user_group = "general"
+            capacity = _MAX_WEIGHT_KG[handle_type, user_group]
         
         # Calculate safe weight limit
-        max_weight = base_weight * user_factor * safety_factor
-        
-        return max_weight
+        return capacity * safety_factor
     
     def recommend_box_improvements(
         self,
@@ -257,15 +329,88 @@ class ErgonomicsAnalyzer:
         width, height, depth = box_dimensions
         
         # Product weight
-        product_weight = float(str(product_info.get("weight", "0")).split("g")[0]) / 1000  # Convert to kg
+        product_weight = _product_weight_kg(product_info)
         
         # Calculate volume
         volume = width * height * depth / 1000000  # Convert to liters
         
+        return self._box_improvements(
+            product_weight, box_dimensions, target_user_group,
+            needs_handle=product_weight > 2.0,
+            oversized=any(dim > 600 for dim in box_dimensions),
+            two_handed=product_weight > self.estimate_max_weight("cutout", target_user_group),
+            large_and_heavy=volume > 10 and product_weight > 3
+        )
+    
+    def recommend_box_improvements_batch(
+        self,
+        products: List[Dict[str, Any]],
+        box_dimensions: Union[List[Tuple[float, float, float]], np.ndarray],
+        target_user_group: str = "general"
+    ) -> List[List[Dict[str, Any]]]:
+        """Vectorized recommend_box_improvements for a catalog of products.
+        
+        The threshold checks run as array operations over the whole batch;
+        recommendation dicts are only built for the products they flag.
+        
+        Args:
+            products: Dictionaries with product information
+            box_dimensions: (N, 3) box (width, height, depth) in mm, one row per product
+            target_user_group: Target user population
+            
+        Returns:
+            List of recommended improvements for each product
+        """
+        import numpy as np
+        
+        dims = np.asarray(box_dimensions, dtype=np.float64).reshape(-1, 3)
+        weights = np.fromiter(
+            (_product_weight_kg(product_info) for product_info in products),
+            dtype=np.float64, count=len(products))
+        volumes = dims.prod(axis=1) / 1000000  # Convert to liters
+        
+        needs_handle = weights > 2.0
+        oversized = (dims > 600).any(axis=1)
+        two_handed = weights > self.estimate_max_weight("cutout", target_user_group)
+        large_and_heavy = (volumes > 10) & (weights > 3)
+        
+        recommendations = [[] for _ in range(len(dims))]
+        flagged = needs_handle | oversized | two_handed | large_and_heavy
+        for i in np.flatnonzero(flagged).tolist():
+            recommendations[i] = self._box_improvements(
+                weights[i].item(), tuple(dims[i].tolist()), target_user_group,
+                needs_handle[i], oversized[i], two_handed[i], large_and_heavy[i]
+            )
+        return recommendations
+    
+    def _box_improvements(
+        self,
+        product_weight: float,
+        box_dimensions: Tuple[float, float, float],
+        target_user_group: str,
+        needs_handle: bool,
+        oversized: bool,
+        two_handed: bool,
+        large_and_heavy: bool
+    ) -> List[Dict[str, Any]]:
+        """Build the recommendations for the checks a product failed.
+        
+        Args:
+            product_weight: Product weight in kg
+            box_dimensions: (width, height, depth) in mm
+            target_user_group: Target user population
+            needs_handle: Product is heavy enough to need a handle
+            oversized: A box dimension exceeds common shelving
+            two_handed: Product exceeds the single-hand lift capacity
+            large_and_heavy: Box is large and somewhat heavy
+            
+        Returns:
+            List of recommended improvements
+        """
         recommendations = []
         
         # Check if handle is needed based on weight
-        if product_weight > 2.0:
+        if needs_handle:
             # Calculate optimal handle dimensions
             handle_info = self.optimize_handle_dimensions(
                 box_dimensions,
@@ -282,7 +427,7 @@ class ErgonomicsAnalyzer:
             })
         
         # Check box size relative to common shelving
-        if any(dim > 600 for dim in box_dimensions):
+        if oversized:
             recommendations.append({
                 "type": "size_adjustment",
                 "reason": "Package exceeds common shelf dimensions",
@@ -291,7 +436,7 @@ class ErgonomicsAnalyzer:
             })
         
         # Check if box requires two-handed lifting
-        if product_weight > self.estimate_max_weight("cutout", target_user_group):
+        if two_handed:
             recommendations.append({
                 "type": "handling_warning",
                 "reason": f"Weight exceeds single-hand lift capacity for {target_user_group} users",
@@ -300,7 +445,7 @@ class ErgonomicsAnalyzer:
             })
         
         # Check if weight distribution indicators are needed
-        if volume > 10 and product_weight > 3:  # Large, somewhat heavy box
+        if large_and_heavy:  # Large, somewhat heavy box
             recommendations.append({
                 "type": "orientation_indicator",
                 "reason": "Large package may be difficult to orient correctly",
@@ -381,3 +526,27 @@ def get_optimal_box_dimensions(
         depth = product_depth + 30
     
     return (width, height, depth)
+
+
+def get_optimal_box_dimensions_batch(
+    product_dimensions: np.ndarray,
+    anthropometry_data: Dict[str, Any],
+    handling_scenario: str = "direct_grip"
+) -> np.ndarray:
+    """Vectorized get_optimal_box_dimensions for many products.
+    
+    Args:
+        product_dimensions: (N, 3) product (width, height, depth) in mm
+        anthropometry_data: Dictionary with anthropometry data
+        handling_scenario: How the packages will be handled
+        
+    Returns:
+        (N, 3) array of optimal box (width, height, depth) in mm
+    """
+    import numpy as np
+    from . import _ergonomics_kernels as kernels
+    
+    dims = np.ascontiguousarray(product_dimensions, dtype=np.float64).reshape(-1, 3)
+    hand_breadth = float(anthropometry_data["hand_breadth"]["5th_percentile"])
+    scenario = kernels.SCENARIO_CODES.get(handling_scenario, kernels.DEFAULT_SCENARIO)
+    return kernels.optimal_box_dimensions_batch(dims, hand_breadth, scenario, np.empty_like(dims))
@@ -8,15 +8,20 @@ branding elements.
 import logging
 import json
 import os
-from typing import Dict, List, Any, Optional, Union, Tuple
+from typing import Dict, List, Any, Optional, Union, Tuple, Callable, NamedTuple
 from enum import Enum
 import numpy as np
 
-from .llm import PackagingLLM, ModelProvider
+from .llm import PackagingLLM, ModelProvider, _ResponseCache
 from .regulatory import verify_compliance, generate_regulatory_text
+from ._embeddings import EmbeddingIndex
 
 logger = logging.getLogger(__name__)
 
+# Part of every response cache key; bump when a prompt template changes
+# so responses to the old wording are not reused
+_PROMPT_CACHE_VERSION = 1
+
 
 class TextElementType(Enum):
     """Types of text elements that can be placed on packaging."""
@@ -57,6 +62,56 @@ class TextOrientation(Enum):
     ROTATED_270 = "rotated_270"
 
 
+class _PendingText(NamedTuple):
+    """A text element waiting on one LLM response."""
+    prompt: str
+    parse: Callable[[str], Any]  # response -> element text
+    on_error: Callable[[Exception], Any]  # error -> fallback element text
+    semantic: bool = False  # may reuse the response to a near-duplicate prompt
+
+
+class _SemanticResponseCache:
+    """Responses to earlier prompts, looked up by embedding similarity.
+    
+    Products in one category produce prompts that differ only in a feature
+    or two, and for loosely worded elements the answer to one serves the
+    other. Prompts are embedded with a caller-supplied function and a
+    response is reused when cosine similarity reaches min_similarity.
+    """
+    
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], np.ndarray],
+        min_similarity: float = 0.97
+    ):
+        """Initialize the cache.
+        
+        Args:
+            embed_fn: Maps a list of texts to an (N, D) array of embeddings
+            min_similarity: Smallest cosine similarity at which a cached
+                response is reused
+        """
+        self.min_similarity = min_similarity
+        self._index = EmbeddingIndex(embed_fn)
+        self._responses: List[str] = []
+    
+    def embed(self, prompts: List[str]) -> np.ndarray:
+        """Embed prompts as unit-length float32 rows."""
+        return self._index.embed(prompts)
+    
+    def get(self, vector: np.ndarray) -> Optional[str]:
+        """Response to the most similar earlier prompt, or None if none is close enough."""
+        i, similarity = self._index.nearest(vector)
+        if i < 0 or similarity < self.min_similarity:
+            return None
+        return self._responses[i]
+    
+    def put(self, vector: np.ndarray, response: str) -> None:
+        """Store the response to an embedded prompt."""
+        self._responses.append(response)
+        self._index.add(vector[None])
+
+
 class PackagingLabeling:
     """Automated labeling system for packaging designs."""
 
@@ -64,7 +119,11 @@ class PackagingLabeling:
         self,
         llm: Optional[PackagingLLM] = None,
         templates_path: str = "data/text_templates",
-        language: str = "en"
+        language: str = "en",
+        response_cache_size: int = 256,
+        response_cache_path: Optional[str] = None,
+        embed_fn: Optional[Callable[[List[str]], np.ndarray]] = None,
+        semantic_cache_similarity: float = 0.97
     ):
         """Initialize the packaging labeling system.
         
@@ -72,6 +131,14 @@ class PackagingLabeling:
             llm: PackagingLLM instance (created if None)
             templates_path: Path to text templates directory
             language: Language code for generated text
+            response_cache_size: Number of LLM responses cached in memory (0 disables caching)
+            response_cache_path: SQLite file for persisting cached LLM responses (optional)
+            embed_fn: Text embedding function (list of texts to an (N, D)
+                array). When given, the description adjective, generated
+                feature lists and sustainability text reuse the response to
+                a near-identical earlier prompt.
+            semantic_cache_similarity: Smallest prompt cosine similarity at
+                which an earlier response is reused
         """
         # Initialize or use provided LLM
         self.llm = llm or PackagingLLM(
@@ -86,6 +153,16 @@ class PackagingLabeling:
         # Set language
         self.language = language
         
+        # Cache of LLM responses, so regenerating text for the same product is free
+        self._response_cache = (
+            _ResponseCache(response_cache_size, response_cache_path)
+            if response_cache_size > 0 else None
+        )
+        self._semantic_cache = (
+            _SemanticResponseCache(embed_fn, semantic_cache_similarity)
+            if embed_fn is not None else None
+        )
+        
         # Text styling defaults
         self.default_styles = {
             TextElementType.PRODUCT_NAME: {
@@ -187,25 +264,25 @@ class PackagingLabeling:
             if "name" in product_info and product_info["name"]:
                 result[TextElementType.PRODUCT_NAME] = product_info["name"]
             else:
-                result[TextElementType.PRODUCT_NAME] = self._generate_product_name(
+                result[TextElementType.PRODUCT_NAME] = self._product_name_text(
                     product_info, brand_info
                 )
         
         # Product description
         if TextElementType.DESCRIPTION in elements:
-            result[TextElementType.DESCRIPTION] = self._generate_description(
+            result[TextElementType.DESCRIPTION] = self._description_text(
                 product_info, target_audience, brand_info
             )
         
         # Product features/benefits
         if TextElementType.FEATURES in elements:
-            result[TextElementType.FEATURES] = self._generate_features(
+            result[TextElementType.FEATURES] = self._features_text(
                 product_info, target_audience
             )
         
         # Usage instructions
         if TextElementType.INSTRUCTIONS in elements:
-            result[TextElementType.INSTRUCTIONS] = self._generate_instructions(
+            result[TextElementType.INSTRUCTIONS] = self._instructions_text(
                 product_info
             )
         
@@ -241,7 +318,7 @@ class PackagingLabeling:
         
         # Sustainability information
         if TextElementType.SUSTAINABILITY in elements:
-            result[TextElementType.SUSTAINABILITY] = self._generate_sustainability_info(
+            result[TextElementType.SUSTAINABILITY] = self._sustainability_text(
                 product_info
             )
         
@@ -257,7 +334,126 @@ class PackagingLabeling:
                 product_info
             )
         
-        return result
+        # Elements that need the LLM are generated in one concurrent batch
+        return self._resolve_texts(result)
+    
+    def _resolve_texts(self, texts: Dict[TextElementType, Any]) -> Dict[TextElementType, Any]:
+        """Replace every pending text element with its generated text.
+        
+        Args:
+            texts: Text elements, some of them _PendingText
+            
+        Returns:
+            The same dictionary with all elements generated
+        """
+        pending = [(element, text) for element, text in texts.items() if isinstance(text, _PendingText)]
+        if not pending:
+            return texts
+        
+        responses = self._llm_batch([text.prompt for _, text in pending],
+                                    [text.semantic for _, text in pending])
+        for (element, text), response in zip(pending, responses):
+            if isinstance(response, Exception):
+                texts[element] = text.on_error(response)
+                continue
+            try:
+                texts[element] = text.parse(response)
+            except Exception as e:
+                texts[element] = text.on_error(e)
+        return texts
+    
+    def _generate_text(self, text: Any) -> Any:
+        """Generate a single text element, if it is pending."""
+        if not isinstance(text, _PendingText):
+            return text
+        try:
+            return text.parse(self._llm_call(text.prompt, text.semantic))
+        except Exception as e:
+            return text.on_error(e)
+    
+    def _prompt_key(self, prompt: str) -> str:
+        """Response cache key for a prompt sent by this labeling system."""
+        return _ResponseCache.make_key(
+            _PROMPT_CACHE_VERSION, self.llm.provider.value, self.llm.model_name, self.language, prompt)
+    
+    def _llm_call(self, prompt: str, semantic: bool = False) -> str:
+        """Generate a response, reusing the cached one for a repeated prompt.
+        
+        Args:
+            prompt: Prompt to send to the LLM
+            semantic: Also reuse the response to a near-duplicate prompt
+            
+        Returns:
+            Generated text response
+        """
+        key = None
+        if self._response_cache is not None:
+            key = self._prompt_key(prompt)
+            response = self._response_cache.get(key)
+            if response is not None:
+                logger.debug("Reusing cached LLM response")
+                return response
+        
+        vector = None
+        if semantic and self._semantic_cache is not None:
+            vector = self._semantic_cache.embed([prompt])[0]
+            response = self._semantic_cache.get(vector)
+            if response is not None:
+                logger.debug("Reusing LLM response to a similar prompt")
+                return response
+        
+        response = self.llm.generate_response(prompt)
+        self._remember_response(key, vector, response)
+        return response
+    
+    def _llm_batch(self, prompts: List[str], semantic: List[bool]) -> List[Union[str, Exception]]:
+        """Generate responses for several prompts, sending only uncached ones.
+        
+        Args:
+            prompts: Prompts to send to the LLM
+            semantic: Per prompt, whether the response to a near-duplicate
+                prompt may be reused
+            
+        Returns:
+            Responses in prompt order, with the exception in place of a failed one
+        """
+        keys = [None] * len(prompts)
+        vectors = [None] * len(prompts)
+        responses: List[Any] = [None] * len(prompts)
+        if self._response_cache is not None:
+            for i, prompt in enumerate(prompts):
+                keys[i] = self._prompt_key(prompt)
+                responses[i] = self._response_cache.get(keys[i])
+        
+        if self._semantic_cache is not None:
+            similar = [i for i, response in enumerate(responses) if response is None and semantic[i]]
+            if similar:
+                embedded = self._semantic_cache.embed([prompts[i] for i in similar])
+                for i, vector in zip(similar, embedded):
+                    vectors[i] = vector
+                    responses[i] = self._semantic_cache.get(vector)
+        
+        misses = [i for i, response in enumerate(responses) if response is None]
+        if not misses:
+            return responses
+        
+        try:
+            generated = self.llm.batch_generate([prompts[i] for i in misses], return_exceptions=True)
+        except Exception as e:
+            generated = [e] * len(misses)
+        
+        for i, response in zip(misses, generated):
+            responses[i] = response
+            if not isinstance(response, Exception):
+                self._remember_response(keys[i], vectors[i], response)
+        return responses
+    
+    def _remember_response(self, key: Optional[str], vector: Optional[np.ndarray], response: str) -> None:
+        """Store a fresh LLM response in the exact and semantic caches."""
+        if key is not None:
+            self._response_cache.put(key, response)
+        if vector is not None:
+            self._semantic_cache.put(vector, response)
     
     def _generate_product_name(
         self,
@@ -273,6 +469,14 @@ class PackagingLabeling:
         Returns:
             Generated product name
         """
+        return self._generate_text(self._product_name_text(product_info, brand_info))
+    
+    def _product_name_text(
+        self,
+        product_info: Dict[str, Any],
+        brand_info: Dict[str, Any]
+    ) -> Union[str, "_PendingText"]:
+        """Product name, or the pending LLM request that generates it."""
         # If category and key features are provided, generate a name
         brand_name = brand_info.get("name", "")
         category = product_info.get("category", "")
@@ -297,8 +501,7 @@ class PackagingLabeling:
         Return only the product name, with no additional explanation.
         """
         
-        try:
-            response = self.llm.generate_response(prompt)
+        def parse(response: str) -> str:
             # Clean response: remove quotes and extra whitespace
             name = response.strip().strip('"\'').strip()
             
@@ -312,11 +515,13 @@ class PackagingLabeling:
                 name = f"{brand_name} {name}"
             
             return name
-            
-        except Exception as e:
+        
+        def on_error(e: Exception) -> str:
             logger.error(f"Error generating product name: {str(e)}")
             # Fallback to a basic name
             return f"{brand_name} {category.title()}"
+        
+        return _PendingText(prompt, parse, on_error)
     
     def _generate_description(
         self,
@@ -334,6 +539,15 @@ class PackagingLabeling:
         Returns:
             Generated product description
         """
+        return self._generate_text(self._description_text(product_info, target_audience, brand_info))
+    
+    def _description_text(
+        self,
+        product_info: Dict[str, Any],
+        target_audience: str,
+        brand_info: Dict[str, Any]
+    ) -> Union[str, "_PendingText"]:
+        """Product description, or the pending LLM request that generates it."""
         # Try to use appropriate template if available
         category = product_info.get("category", "general").lower()
         
@@ -392,13 +606,37 @@ class PackagingLabeling:
                 
                 Return only the adjective word, nothing else.
                 """
-                try:
-                    variables["adjective"] = self.llm.generate_response(prompt).strip().lower()
-                    if variables["adjective"] not in adjectives:
-                        variables["adjective"] = "innovative"
-                except:
+                
+                def parse(response: str) -> str:
+                    adjective = response.strip().lower()
+                    variables["adjective"] = adjective if adjective in adjectives else "innovative"
+                    return self._fill_description_template(
+                        template, variables, product_info, target_audience, brand_info)
+                
+                def on_error(e: Exception) -> str:
                     variables["adjective"] = "innovative"
+                    return self._fill_description_template(
+                        template, variables, product_info, target_audience, brand_info)
+                
+                return _PendingText(prompt, parse, on_error, semantic=True)
             
+            return self._fill_description_template(
+                template, variables, product_info, target_audience, brand_info)
+            
+        except Exception as e:
+            logger.error(f"Error using template for description: {str(e)}")
+            return self._llm_description_text(product_info, target_audience, brand_info)
+    
+    def _fill_description_template(
+        self,
+        template: str,
+        variables: Dict[str, Any],
+        product_info: Dict[str, Any],
+        target_audience: str,
+        brand_info: Dict[str, Any]
+    ) -> str:
+        """Format the description template, falling back to an LLM-written description."""
+        try:
             # Format template with variables
             description = template.format(**variables)
             # Clean up whitespace
@@ -407,9 +645,17 @@ class PackagingLabeling:
             
         except Exception as e:
             logger.error(f"Error using template for description: {str(e)}")
-            
-            # Fallback to LLM generation
-            prompt = f"""
+            return self._generate_text(self._llm_description_text(product_info, target_audience, brand_info))
+    
+    def _llm_description_text(
+        self,
+        product_info: Dict[str, Any],
+        target_audience: str,
+        brand_info: Dict[str, Any]
+    ) -> "_PendingText":
+        """Pending LLM request for a description written without a template."""
+        # Fallback to LLM generation
+        prompt = f"""
             Write a concise marketing description for this product:
             
             Product Name: {product_info.get('name', 'Product')}
@@ -426,14 +672,13 @@ class PackagingLabeling:
             
             Write the description directly with no explanations or headers.
             """
-            
-            try:
-                description = self.llm.generate_response(prompt)
-                return description.strip()
-            except Exception as e2:
-                logger.error(f"Error generating description with LLM: {str(e2)}")
-                # Simple fallback
-                return f"A premium {product_info.get('category', 'product')} by {brand_info.get('name', 'our brand')}."
+        
+        def on_error(e: Exception) -> str:
+            logger.error(f"Error generating description with LLM: {str(e)}")
+            # Simple fallback
+            return f"A premium {product_info.get('category', 'product')} by {brand_info.get('name', 'our brand')}."
+        
+        return _PendingText(prompt, str.strip, on_error)
     
     def _generate_features(
         self,
@@ -449,16 +694,26 @@ class PackagingLabeling:
         Returns:
             List of feature statements
         """
+        return self._generate_text(self._features_text(product_info, target_audience))
+    
+    def _features_text(
+        self,
+        product_info: Dict[str, Any],
+        target_audience: str
+    ) -> Union[List[str], "_PendingText"]:
+        """Feature statements, or the pending LLM request that generates them."""
         # If features are provided, use them
         if "key_features" in product_info and product_info["key_features"]:
             # Start with existing features
             features = product_info["key_features"]
             
-            # If we need more features, generate them
-            if len(features) < 3:
-                # Use LLM to generate additional features
-                existing = ", ".join(features)
-                prompt = f"""
+            # If we have enough features, use them as they are
+            if len(features) >= 3:
+                return features
+            
+            # Use LLM to generate additional features
+            existing = ", ".join(features)
+            prompt = f"""
                 Generate additional key features for this product to highlight on packaging:
                 
                 Product Name: {product_info.get('name', 'Product')}
@@ -474,21 +729,21 @@ class PackagingLabeling:
                 
                 Return only the feature points, one per line, with no numbers or bullet markers.
                 """
-                
-                try:
-                    response = self.llm.generate_response(prompt)
-                    # Parse the response, each line is a feature
-                    new_features = [line.strip() for line in response.strip().split("\n") if line.strip()]
-                    features.extend(new_features)
-                except Exception as e:
-                    logger.error(f"Error generating additional features: {str(e)}")
             
-            # Format features as bullet points
-            return features
+            def parse(response: str) -> List[str]:
+                # Parse the response, each line is a feature
+                new_features = [line.strip() for line in response.strip().split("\n") if line.strip()]
+                features.extend(new_features)
+                return features
             
-        else:
-            # Generate features from scratch
-            prompt = f"""
+            def on_error(e: Exception) -> List[str]:
+                logger.error(f"Error generating additional features: {str(e)}")
+                return features
+            
+            return _PendingText(prompt, parse, on_error)
+            
+        # Generate features from scratch
+        prompt = f"""
             Generate key product features to highlight on packaging:
             
             Product Name: {product_info.get('name', 'Product')}
@@ -503,20 +758,21 @@ class PackagingLabeling:
             
             Return only the feature points, one per line, with no numbers or bullet markers.
             """
-            
-            try:
-                response = self.llm.generate_response(prompt)
-                # Parse the response, each line is a feature
-                features = [line.strip() for line in response.strip().split("\n") if line.strip()]
-                return features
-            except Exception as e:
-                logger.error(f"Error generating features: {str(e)}")
-                # Return basic fallback features
-                return [
-                    "Premium quality materials",
-                    "Designed for everyday use",
-                    "Satisfaction guaranteed"
-                ]
+        
+        def parse(response: str) -> List[str]:
+            # Parse the response, each line is a feature
+            return [line.strip() for line in response.strip().split("\n") if line.strip()]
+        
+        def on_error(e: Exception) -> List[str]:
+            logger.error(f"Error generating features: {str(e)}")
+            # Return basic fallback features
+            return [
+                "Premium quality materials",
+                "Designed for everyday use",
+                "Satisfaction guaranteed"
+            ]
+        
+        return _PendingText(prompt, parse, on_error, semantic=True)
     
     def _generate_instructions(
         self,
@@ -530,6 +786,10 @@ class PackagingLabeling:
         Returns:
             Formatted usage instructions
         """
+        return self._generate_text(self._instructions_text(product_info))
+    
+    def _instructions_text(self, product_info: Dict[str, Any]) -> Union[str, "_PendingText"]:
+        """Usage instructions, or the pending LLM request that generates them."""
         # If instructions are provided, use them
         if "instructions" in product_info:
             if isinstance(product_info["instructions"], list):
@@ -556,13 +816,12 @@ class PackagingLabeling:
         Format as numbered steps. Be concise. Start with "INSTRUCTIONS FOR USE:" as a heading.
         """
         
-        try:
-            instructions = self.llm.generate_response(prompt)
-            return instructions.strip()
-        except Exception as e:
+        def on_error(e: Exception) -> str:
             logger.error(f"Error generating instructions: {str(e)}")
             # Basic fallback
             return "INSTRUCTIONS FOR USE:\n1. Remove product from packaging\n2. Follow manufacturer guidelines\n3. Store in a cool, dry place"
+        
+        return _PendingText(prompt, str.strip, on_error)
     
     def _format_ingredients(self, ingredients: Union[List[str], str]) -> str:
         """Format ingredients list for packaging.
@@ -697,6 +956,10 @@ class PackagingLabeling:
         Returns:
             Formatted sustainability information
         """
+        return self._generate_text(self._sustainability_text(product_info))
+    
+    def _sustainability_text(self, product_info: Dict[str, Any]) -> Union[str, "_PendingText"]:
+        """Sustainability information, or the pending LLM request that generates it."""
         # If sustainability info is provided, use it
         if "sustainability" in product_info:
             if isinstance(product_info["sustainability"], str):
@@ -741,13 +1004,12 @@ class PackagingLabeling:
         Keep it concise (2-3 sentences) and factual. Start with "SUSTAINABILITY INFORMATION:" as a heading.
         """
         
-        try:
-            sustainability_info = self.llm.generate_response(prompt)
-            return sustainability_info.strip()
-        except Exception as e:
+        def on_error(e: Exception) -> str:
             logger.error(f"Error generating sustainability info: {str(e)}")
             # Basic fallback
             return "SUSTAINABILITY INFORMATION:\nWe are committed to reducing our environmental impact. This packaging is made with recyclable materials where possible."
+        
+        return _PendingText(prompt, str.strip, on_error, semantic=True)
     
     def _format_contact_info(self, contact: Dict[str, str]) -> str:
         """Format contact information.
@@ -11,7 +11,12 @@ import logging
 import os
 import json
 import time
-from typing import Dict, List, Any, Optional, Union, Tuple
+import asyncio
+import weakref
+import hashlib
+import sqlite3
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Union, Tuple, Iterator
 from enum import Enum
 
 logger = logging.getLogger(__name__)
@@ -40,6 +45,69 @@ class LLMError(Exception):
     pass
 
 
+class _ResponseCache:
+    """LRU cache of LLM responses, optionally persisted to SQLite.
+    
+    Recommendation and labeling prompts are fully determined by their
+    inputs, so a session that re-asks the same question gets the stored
+    answer instead of another round-trip to the provider.
+    """
+    
+    def __init__(self, maxsize: int = 256, path: Optional[str] = None):
+        """Initialize the cache.
+        
+        Args:
+            maxsize: Number of responses kept in memory
+            path: SQLite file that keeps responses across runs (optional)
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+            self._db.commit()
+    
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Hash the parts that determine a response into a cache key."""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss."""
+        response = self._entries.get(key)
+        if response is not None:
+            self._entries.move_to_end(key)
+            return response
+        
+        if self._db is not None:
+            row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._remember(key, row[0])
+                return row[0]
+        return None
+    
+    def put(self, key: str, response: str) -> None:
+        """Store a response under key."""
+        self._remember(key, response)
+        if self._db is not None:
+            self._db.execute("INSERT OR REPLACE INTO responses (key, response) VALUES (?, ?)",
+                             (key, response))
+            self._db.commit()
+    
+    def _remember(self, key: str, response: str) -> None:
+        self._entries[key] = response
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
 class PackagingLLM:
     """Interface for LLM-powered packaging design and text generation."""
 
@@ -66,6 +134,8 @@ class PackagingLLM:
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.client = self._initialize_client()
+        self._async_client = None  # created on first agenerate_response call
+        self._async_client_loop = None  # weak reference to the loop it is bound to
         
         # Cache of previous interactions for context
         self.conversation_history = []
@@ -192,50 +262,260 @@ class PackagingLLM:
         except KeyError as e:
             raise LLMError(f"Missing required input for prompt: {str(e)}")
     
-    def generate_response(self, prompt: str) -> str:
+    def _initialize_async_client(self) -> Any:
+        """Initialize the asyncio client for the provider on first use.
+        
+        The client's connection pool is bound to the event loop it was
+        created on, so a new client is created when called from another
+        loop (e.g. a later asyncio.run).
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is not None and self._async_client_loop() is loop:
+            return self._async_client
+        
+        self._async_client = None
+        self._async_client_loop = weakref.ref(loop)
+        try:
+            if self.provider == ModelProvider.OPENAI:
+                import openai
+                self._async_client = openai.AsyncOpenAI(api_key=self.api_key)
+            
+            elif self.provider == ModelProvider.ANTHROPIC:
+                import anthropic
+                self._async_client = anthropic.AsyncAnthropic(api_key=self.api_key)
+            
+            elif self.provider == ModelProvider.HUGGINGFACE:
+                from huggingface_hub import AsyncInferenceClient
+                self._async_client = AsyncInferenceClient(token=self.api_key)
+            
+            return self._async_client
+            
+        except ImportError as e:
+            raise LLMError(f"Failed to import required library: {str(e)}")
+        except Exception as e:
+            raise LLMError(f"Failed to initialize async client: {str(e)}")
+    
+    def _request_kwargs(
+        self,
+        prompt: str,
+        cached_prefix: Optional[str],
+        json_mode: bool
+    ) -> Dict[str, Any]:
+        """Build the provider API arguments shared by the sync and async paths."""
+        if self.provider == ModelProvider.OPENAI:
+            if cached_prefix:
+                prompt = cached_prefix + prompt
+            kwargs = {
+                "model": self.model_name,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": self.temperature,
+                "max_tokens": self.max_tokens
+            }
+            if json_mode:
+                kwargs["response_format"] = {"type": "json_object"}
+            return kwargs
+        
+        elif self.provider == ModelProvider.ANTHROPIC:
+            content = prompt
+            if cached_prefix:
+                content = [
+                    {"type": "text", "text": cached_prefix, "cache_control": {"type": "ephemeral"}},
+                    {"type": "text", "text": prompt}
+                ]
+            messages = [{"role": "user", "content": content}]
+            if json_mode:
+                messages.append({"role": "assistant", "content": "{"})
+            return {
+                "model": self.model_name,
+                "max_tokens": self.max_tokens,
+                "temperature": self.temperature,
+                "messages": messages
+            }
+        
+        elif self.provider == ModelProvider.HUGGINGFACE:
+            if cached_prefix:
+                prompt = cached_prefix + prompt
+            return {
+                "prompt": prompt,
+                "max_new_tokens": self.max_tokens,
+                "temperature": self.temperature
+            }
+        
+        # Custom internal implementation could go here
+        raise NotImplementedError("Internal provider not implemented")
+    
+    def _response_text(self, response: Any, json_mode: bool) -> str:
+        """Extract the generated text from a provider response."""
+        if self.provider == ModelProvider.OPENAI:
+            return response.choices[0].message.content
+        elif self.provider == ModelProvider.ANTHROPIC:
+            text = response.content[0].text
+            return "{" + text if json_mode else text
+        return response
+    
+    def generate_response(
+        self,
+        prompt: str,
+        cached_prefix: Optional[str] = None,
+        json_mode: bool = False
+    ) -> str:
         """Generate a response from the LLM based on the prompt.
         
         Args:
             prompt: The prompt to send to the LLM
+            cached_prefix: Static instructions sent ahead of the prompt (optional).
+                Anthropic requests mark it as a prompt-cache breakpoint; OpenAI
+                caches repeated prefixes automatically as long as they are
+                byte-identical, so it is simply prepended there.
+            json_mode: Constrain the reply to a single JSON object. Uses the
+                OpenAI JSON response format, and prefills "{" as the start of
+                the assistant turn for Anthropic.
             
         Returns:
             Generated text response
         """
         try:
+            kwargs = self._request_kwargs(prompt, cached_prefix, json_mode)
             if self.provider == ModelProvider.OPENAI:
-                response = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=self.temperature,
-                    max_tokens=self.max_tokens
-                )
-                return response.choices[0].message.content
-                
+                response = self.client.chat.completions.create(**kwargs)
             elif self.provider == ModelProvider.ANTHROPIC:
-                response = self.client.messages.create(
-                    model=self.model_name,
-                    max_tokens=self.max_tokens,
-                    temperature=self.temperature,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                return response.content[0].text
+                response = self.client.messages.create(**kwargs)
+            else:
+                response = self.client.text_generation(**kwargs)
+            return self._response_text(response, json_mode)
                 
-            elif self.provider == ModelProvider.HUGGINGFACE:
-                response = self.client.text_generation(
-                    prompt,
-                    max_new_tokens=self.max_tokens,
-                    temperature=self.temperature
-                )
-                return response
+        except Exception as e:
+            logger.error(f"Error generating LLM response: {str(e)}")
+            raise LLMError(f"Failed to generate response: {str(e)}")
+    
+    def stream_response(
+        self,
+        prompt: str,
+        cached_prefix: Optional[str] = None,
+        json_mode: bool = False
+    ) -> Iterator[str]:
+        """Generate a response from the LLM, yielding text as it arrives.
+        
+        Closing the generator before it is exhausted closes the provider
+        stream, which stops generation, so callers that only need the start
+        of a response do not pay for the rest.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            cached_prefix: Static instructions sent ahead of the prompt (optional)
+            json_mode: Constrain the reply to a single JSON object
+            
+        Yields:
+            Chunks of generated text
+        """
+        try:
+            kwargs = self._request_kwargs(prompt, cached_prefix, json_mode)
+            if self.provider == ModelProvider.OPENAI:
+                stream = self.client.chat.completions.create(stream=True, **kwargs)
+                try:
+                    for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+                finally:
+                    stream.close()
+            elif self.provider == ModelProvider.ANTHROPIC:
+                with self.client.messages.stream(**kwargs) as stream:
+                    if json_mode:
+                        yield "{"
+                    yield from stream.text_stream
+            else:
+                yield from self.client.text_generation(stream=True, **kwargs)
                 
-            elif self.provider == ModelProvider.INTERNAL:
-                # Custom internal implementation could go here
-                raise NotImplementedError("Internal provider not implemented")
+        except Exception as e:
+            logger.error(f"Error streaming LLM response: {str(e)}")
+            raise LLMError(f"Failed to stream response: {str(e)}")
+    
+    async def agenerate_response(
+        self,
+        prompt: str,
+        cached_prefix: Optional[str] = None,
+        json_mode: bool = False
+    ) -> str:
+        """Asynchronous generate_response, for issuing several requests concurrently.
+        
+        Args:
+            prompt: The prompt to send to the LLM
+            cached_prefix: Static instructions sent ahead of the prompt (optional)
+            json_mode: Constrain the reply to a single JSON object
+            
+        Returns:
+            Generated text response
+        """
+        try:
+            kwargs = self._request_kwargs(prompt, cached_prefix, json_mode)
+            client = self._initialize_async_client()
+            if self.provider == ModelProvider.OPENAI:
+                response = await client.chat.completions.create(**kwargs)
+            elif self.provider == ModelProvider.ANTHROPIC:
+                response = await client.messages.create(**kwargs)
+            else:
+                response = await client.text_generation(**kwargs)
+            return self._response_text(response, json_mode)
                 
+        except LLMError:
+            raise
         except Exception as e:
             logger.error(f"Error generating LLM response: {str(e)}")
             raise LLMError(f"Failed to generate response: {str(e)}")
     
+    def batch_generate(
+        self,
+        prompts: List[str],
+        return_exceptions: bool = False
+    ) -> List[Union[str, LLMError]]:
+        """Generate responses for several independent prompts concurrently.
+        
+        The requests are sent together over the async client, so the batch
+        takes about as long as its slowest prompt rather than the sum of all
+        of them. When called from a running event loop (where blocking on
+        another loop is not possible), the prompts are sent one by one.
+        
+        Args:
+            prompts: Prompts to send to the LLM
+            return_exceptions: Return the LLMError of a failed prompt in its
+                place instead of raising it
+            
+        Returns:
+            Generated text responses, in prompt order
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._agenerate_batch(prompts, return_exceptions))
+        
+        responses = []
+        for prompt in prompts:
+            try:
+                responses.append(self.generate_response(prompt))
+            except LLMError as e:
+                if not return_exceptions:
+                    raise
+                responses.append(e)
+        return responses
+    
+    async def _agenerate_batch(
+        self,
+        prompts: List[str],
+        return_exceptions: bool
+    ) -> List[Union[str, LLMError]]:
+        """Run agenerate_response for all prompts on the batch's own event loop."""
+        try:
+            return await asyncio.gather(
+                *(self.agenerate_response(prompt) for prompt in prompts),
+                return_exceptions=return_exceptions
+            )
+        finally:
+            # asyncio.run closes this loop when the batch is done, so close
+            # the client created for it instead of leaving its pool open
+            client, self._async_client = self._async_client, None
+            if client is not None and hasattr(client, "close"):
+                await client.close()
+    
     def get_design_suggestions(
         self, 
         product_info: Dict[str, Any],
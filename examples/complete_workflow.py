@@ -206,7 +206,8 @@ def main():
             box_type=box_type.value,
             material=material.value,
             dimensions=package_dimensions,
-            output_path=output_dir / "design_spec.json"
+            output_path=output_dir / "design_spec.json",
+            pretty=True
         )
         
         # Generate 3D models